@@ -1,15 +1,22 @@
-import dash_bootstrap_components as dbc
-from dash import Dash, dcc, html, page_container
+from contextlib import ExitStack
 
-from core.config import (
-    PATH_TO_EXPENSE_FILES_CURRENT,
-)
-from core.utils import (
-    load_csvs_to_dict,
+import dash_bootstrap_components as dbc
+from dash import (
+    Dash,
+    Input,
+    Output,
+    State,
+    callback,
+    dcc,
+    html,
+    no_update,
+    page_container,
 )
+from flask import g, request
 
-dfs = load_csvs_to_dict(PATH_TO_EXPENSE_FILES_CURRENT)
-dates = sorted(list(dfs.keys()))
+from core.config import LIVE_RELOAD_INTERVAL_MS
+from core.instrumentation import is_profiling, profiled, timed
+from core.store import get_data_version
 
 app = Dash(
     __name__,
@@ -43,6 +50,16 @@ app.layout = dbc.Container(
                             href="/custom-range-spending",
                             active="exact",
                         ),
+                        dbc.NavLink(
+                            "Forecast",
+                            href="/forecast",
+                            active="exact",
+                        ),
+                        dbc.NavLink(
+                            "Search",
+                            href="/search",
+                            active="exact",
+                        ),
                     ],
                     horizontal=True,
                     pills=True,  # This enables the styling our CSS targets
@@ -51,10 +68,42 @@ app.layout = dbc.Container(
             ],
         ),
         dbc.Col(page_container),
+        # Polls the expense files so expenses added with `main.py` show up
+        # without restarting the dashboard.
+        dcc.Interval(id="live-reload-interval", interval=LIVE_RELOAD_INTERVAL_MS),
+        dcc.Store(id="data-version"),
     ],
     className="px-5 py-3 mb-5",
     fluid=True,
 )
 
+
+@callback(
+    Output("data-version", "data"),
+    Input("live-reload-interval", "n_intervals"),
+    State("data-version", "data"),
+)
+@timed
+def update_data_version(n_intervals, current_version):
+    version = list(get_data_version())
+    return no_update if version == current_version else version
+
+
+if is_profiling():
+    # One cProfile dump per request, named after the path and, for callbacks,
+    # the outputs they update.
+    @app.server.before_request
+    def start_request_profile():
+        body = request.get_json(silent=True)
+        output = body.get("output", "") if isinstance(body, dict) else ""
+        g.request_profile = ExitStack()
+        g.request_profile.enter_context(profiled(f"{request.path}_{output}"))
+
+    @app.server.teardown_request
+    def stop_request_profile(error):
+        if "request_profile" in g:
+            g.request_profile.close()
+
+
 if __name__ == "__main__":
     app.run(debug=True)
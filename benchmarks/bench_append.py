@@ -0,0 +1,68 @@
+import contextlib
+import io
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.common import get_months, temporary_workdir, time_call, write_results
+from core.config import EXPENSE_COLUMNS
+from core.expense import Expense
+from core.files import append_rows_to_csv
+from core.storage import CsvStorage, get_csv_storage
+
+MONTH_SIZES = [0, 1_000, 10_000, 100_000]
+
+
+def _fill_month(expense_filepath: Path, num_rows: int) -> None:
+    row = ["filler", "FOOD", 1.0, "BRL", "NO DESCRIPTION", "2000-01-01"]
+    append_rows_to_csv(expense_filepath, [row] * num_rows, EXPENSE_COLUMNS)
+
+
+def _append(expense: Expense, storage: CsvStorage, month: str) -> None:
+    storage.append_rows({month: expense.installment_rows()})
+
+
+def _add(expense: Expense, quiet: bool) -> None:
+    # What `main.py` does to add an expense, the month summary that reads the
+    # month back included unless `quiet`.
+    with contextlib.redirect_stdout(io.StringIO()):
+        expense.update_expense(quiet)
+
+
+def main():
+    results = []
+    with temporary_workdir():
+        storage = get_csv_storage()
+        for month, num_rows in zip(get_months(len(MONTH_SIZES)), MONTH_SIZES):
+            _fill_month(storage.get_filepath(month), num_rows)
+            expense = Expense(
+                name="bench",
+                amount=10.0,
+                installments=1,
+                category="FOOD",
+                description="NO DESCRIPTION",
+                currency="BRL",
+                date=datetime.strptime(f"{month}-15", "%Y-%m-%d"),
+            )
+            # The locked append on its own, and `main.py` without and with the
+            # summary. The first two should stay flat as the month grows; the
+            # summary reads the whole month back, so `add_ms` grows with it.
+            append_ms = time_call(_append, expense, storage, month, repeat=20)
+            quiet_add_ms = time_call(_add, expense, True, repeat=20)
+            add_ms = time_call(_add, expense, False, repeat=20)
+            results.append(
+                {
+                    "month_rows": num_rows,
+                    "append_ms": round(append_ms, 3),
+                    "quiet_add_ms": round(quiet_add_ms, 3),
+                    "add_ms": round(add_ms, 3),
+                }
+            )
+            print(
+                f"{num_rows:>8} rows in month -> append {append_ms:.3f} ms, "
+                f"quiet add {quiet_add_ms:.3f} ms, add with summary {add_ms:.3f} ms"
+            )
+    print(f"Results written to {write_results('append', results)}")
+
+
+if __name__ == "__main__":
+    main()
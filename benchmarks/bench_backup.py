@@ -0,0 +1,68 @@
+import os
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from benchmarks.common import temporary_workdir, write_results
+from core.backup import BackupPolicy
+from core.storage import CsvStorage
+
+NUM_ADDS = 20_000
+REPORT_EVERY = 2_000
+# Hours of snapshots squeezed into seconds, so that retention and compaction run
+# many times during the benchmark.
+POLICY = BackupPolicy(
+    snapshot_interval=timedelta(milliseconds=50), keep_last=5, keep_hourly=1, keep_daily=1
+)
+
+
+def _get_folder_bytes(folder_path: Path) -> int:
+    return sum(
+        os.path.getsize(os.path.join(directory, name))
+        for directory, _, names in os.walk(folder_path)
+        for name in names
+    )
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    return sorted(values)[int(fraction * (len(values) - 1))]
+
+
+def main():
+    results = []
+    with temporary_workdir() as workdir:
+        storage = CsvStorage(workdir, workdir / "backup", backup_policy=POLICY)
+        row = ["bench", "FOOD", 10.0, "BRL", "NO DESCRIPTION", "2000-01-01"]
+        # What one full copy of the month per add, the previous backups, would
+        # have taken.
+        full_copy_bytes = 0
+        add_ms = []
+        for num_adds in range(1, NUM_ADDS + 1):
+            start = time.perf_counter()
+            storage.append_rows({"2000-01": [row]})
+            add_ms.append((time.perf_counter() - start) * 1000)
+            full_copy_bytes += os.path.getsize(storage.get_filepath("2000-01"))
+            if num_adds % REPORT_EVERY:
+                continue
+            result = {
+                "adds": num_adds,
+                "month_bytes": os.path.getsize(storage.get_filepath("2000-01")),
+                "backup_bytes": _get_folder_bytes(storage.backup_path),
+                "full_copy_bytes": full_copy_bytes,
+                "add_p50_ms": round(_percentile(add_ms, 0.5), 3),
+                "add_p99_ms": round(_percentile(add_ms, 0.99), 3),
+                "add_max_ms": round(max(add_ms), 3),
+            }
+            results.append(result)
+            add_ms = []
+            print(
+                f"{num_adds:>6} adds -> backup {result['backup_bytes'] / 1024:8.0f} KiB "
+                f"(full copies {full_copy_bytes / 1024**2:8.0f} MiB), add p50 "
+                f"{result['add_p50_ms']:.3f} ms, p99 {result['add_p99_ms']:.3f} ms, "
+                f"max {result['add_max_ms']:.3f} ms"
+            )
+    print(f"Results written to {write_results('backup', results)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import csv
+import os
+import subprocess
+import sys
+import time
+from multiprocessing import Pool
+from pathlib import Path
+
+from benchmarks.common import temporary_workdir, write_results, write_synthetic_months
+from core.config import (
+    AMOUNT_COLUMN,
+    DATE_COLUMN,
+    DEFAULT_CURRENCY,
+    DEFAULT_DESCRIPTION,
+    NAME_COLUMN,
+    PATH_TO_EXPENSE_FILES_CURRENT,
+)
+from core.daemon_client import get_socket_filepath, send_to_daemon
+from core.storage import get_csv_storage
+
+MAIN_FILEPATH = Path(__file__).parent.parent / "main.py"
+NUM_MONTHS = 24
+ROWS_PER_MONTH = 2_000
+NUM_WRITERS = 8
+ADDS_PER_WRITER = 100
+NUM_CLI_RUNS = 5
+# Rows of the file added with `main.py --from-file`, many more than fit in one
+# request to the daemon.
+FILE_ROWS = 10_000
+MONTH = "2000-01"
+
+
+def get_rows(writer: int, add: int) -> dict[str, list[list]]:
+    row = [
+        f"writer {writer} add {add}",
+        "OTHERS",
+        1.0,
+        DEFAULT_CURRENCY,
+        DEFAULT_DESCRIPTION,
+        f"{MONTH}-01",
+    ]
+    return {MONTH: [row]}
+
+
+def write_directly(workdir: Path, writer: int) -> None:
+    os.chdir(workdir)
+    storage = get_csv_storage()
+    for add in range(ADDS_PER_WRITER):
+        storage.append_rows(get_rows(writer, add))
+
+
+def write_to_daemon(workdir: Path, writer: int) -> None:
+    os.chdir(workdir)
+    for add in range(ADDS_PER_WRITER):
+        request = {"command": "add", "rows_by_month": get_rows(writer, add)}
+        send_to_daemon({**request, "quiet": True})
+
+
+def time_writers(write, workdir: Path) -> float:
+    # Adds per second of `NUM_WRITERS` processes adding at the same time.
+    start = time.perf_counter()
+    with Pool(NUM_WRITERS) as pool:
+        pool.starmap(write, [(workdir, writer) for writer in range(NUM_WRITERS)])
+    return NUM_WRITERS * ADDS_PER_WRITER / (time.perf_counter() - start)
+
+
+def time_cli(args: list[str]) -> float:
+    # Best-of-N wall time in milliseconds of a whole `main.py` run.
+    best = float("inf")
+    for _ in range(NUM_CLI_RUNS):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, MAIN_FILEPATH, *args], capture_output=True, check=True
+        )
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def write_expenses_file(filepath: Path) -> None:
+    with open(filepath, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow([NAME_COLUMN, AMOUNT_COLUMN, DATE_COLUMN])
+        writer.writerows([f"file {row}", 1.0, f"{MONTH}-01"] for row in range(FILE_ROWS))
+
+
+def count_file_rows() -> int:
+    rows = get_csv_storage().read_month(MONTH)
+    return sum(name.startswith("file ") for name in rows[NAME_COLUMN])
+
+
+def time_all(workdir: Path) -> dict:
+    add_args = ["-n", "popcorn", "-a", "3.25"]
+    file_args = ["--from-file", str(workdir / "expenses.csv"), "--quiet"]
+    num_file_rows = count_file_rows()
+    result = {
+        "adds_per_second": round(time_writers(write_directly, workdir)),
+        "cli_quiet_ms": round(time_cli([*add_args, "--quiet"]), 3),
+        "cli_summary_ms": round(time_cli(add_args), 3),
+        "cli_file_ms": round(time_cli(file_args), 3),
+    }
+    # Every run added the whole file.
+    added = count_file_rows() - num_file_rows
+    assert added == NUM_CLI_RUNS * FILE_ROWS, f"{added} rows of the file were added"
+    return result
+
+
+def main():
+    with temporary_workdir() as workdir:
+        write_synthetic_months(PATH_TO_EXPENSE_FILES_CURRENT, NUM_MONTHS, ROWS_PER_MONTH)
+        write_expenses_file(workdir / "expenses.csv")
+        direct = time_all(workdir)
+
+        daemon = subprocess.Popen(
+            [sys.executable, MAIN_FILEPATH, "serve"], stdout=subprocess.DEVNULL
+        )
+        try:
+            while not os.path.exists(get_socket_filepath()):
+                time.sleep(0.05)
+            served = time_all(workdir)
+            served["adds_per_second"] = round(time_writers(write_to_daemon, workdir))
+            stats = send_to_daemon({"command": "stats"})
+        finally:
+            daemon.terminate()
+            daemon.wait()
+
+    served["adds_per_commit"] = round(stats["adds"] / stats["commits"], 2)
+    for name, result in [("direct", direct), ("daemon", served)]:
+        print(
+            f"{name}: {NUM_WRITERS} writers {result['adds_per_second']:6d} adds/s, "
+            f"main.py --quiet {result['cli_quiet_ms']:6.1f} ms, "
+            f"main.py with summary {result['cli_summary_ms']:6.1f} ms, "
+            f"main.py --from-file of {FILE_ROWS} rows {result['cli_file_ms']:6.1f} ms"
+        )
+    print(f"daemon: {served['adds_per_commit']} adds written per commit on average")
+    results = [{"mode": "direct", **direct}, {"mode": "daemon", **served}]
+    print(f"Results written to {write_results('daemon', results)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+from benchmarks.common import temporary_workdir, time_call, write_results
+from benchmarks.generate import HistoryConfig, generate_history
+from core.config import (
+    CURRENCY_COLUMN,
+    DEFAULT_CURRENCY,
+    PATH_TO_EXPENSE_FILES_CURRENT,
+    PATH_TO_INCOME_FILE,
+)
+from core.storage import CsvStorage, get_next_month
+from core.store import ExpenseStore
+
+NUM_MONTHS = [24, 120, 240]
+ROWS_PER_MONTH = 500
+WINDOW_MONTHS = 12
+
+
+def _amount_left_month_by_month(storage: CsvStorage, start_month: str) -> float:
+    # What answering "how much is left over the next months" took before: every
+    # month is read from its file and summarized on its own.
+    from core.utils import create_amount_left_df
+
+    amount_left = 0.0
+    month = start_month
+    for _ in range(WINDOW_MONTHS):
+        if month in storage.get_months():
+            df = storage.read_month(month)
+            df = df[df[CURRENCY_COLUMN] == DEFAULT_CURRENCY]
+            amount_left += create_amount_left_df(df, DEFAULT_CURRENCY).iloc[0, 2]
+        month = get_next_month(month)
+    return amount_left
+
+
+def main():
+    from core.forecast import build_forecast_table
+
+    results = []
+    for num_months in NUM_MONTHS:
+        with temporary_workdir():
+            config = HistoryConfig(num_months=num_months, rows_per_month=ROWS_PER_MONTH)
+            months = generate_history(
+                PATH_TO_EXPENSE_FILES_CURRENT, PATH_TO_INCOME_FILE, config
+            )
+            storage = CsvStorage(PATH_TO_EXPENSE_FILES_CURRENT, "backup")
+            store = ExpenseStore(PATH_TO_EXPENSE_FILES_CURRENT)
+            # The last purchases' installments make up the committed spend.
+            start_month = months[-1]
+            cube = store.get_cube(months[0])
+            table = build_forecast_table(cube, months[-1])
+
+            naive_ms = time_call(_amount_left_month_by_month, storage, start_month)
+            build_ms = time_call(build_forecast_table, cube, months[-1])
+            query_ms = time_call(
+                table.get_amount_left,
+                start_month,
+                WINDOW_MONTHS,
+                DEFAULT_CURRENCY,
+                repeat=50,
+            )
+            projection_ms = time_call(
+                table.get_projection,
+                start_month,
+                WINDOW_MONTHS,
+                DEFAULT_CURRENCY,
+                repeat=50,
+            )
+            expected = _amount_left_month_by_month(storage, start_month)
+            actual = table.get_amount_left(start_month, WINDOW_MONTHS, DEFAULT_CURRENCY)
+            assert abs(expected - actual) < 0.01, (expected, actual)
+        print(
+            f"{num_months:>4} months: month by month {naive_ms:8.2f} ms, table build "
+            f"{build_ms:7.2f} ms, amount left {query_ms * 1000:6.1f} us, projection "
+            f"{projection_ms:5.2f} ms"
+        )
+        results.append(
+            {
+                "months": num_months,
+                "rows_per_month": ROWS_PER_MONTH,
+                "window_months": WINDOW_MONTHS,
+                "month_by_month_ms": round(naive_ms, 3),
+                "table_build_ms": round(build_ms, 3),
+                "amount_left_ms": round(query_ms, 4),
+                "projection_ms": round(projection_ms, 3),
+            }
+        )
+    print(f"Results written to {write_results('forecast', results)}")
+
+
+if __name__ == "__main__":
+    main()
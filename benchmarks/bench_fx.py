@@ -0,0 +1,106 @@
+import csv
+from bisect import bisect_right
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import temporary_workdir, time_call, write_results
+from core.config import (
+    AMOUNT_COLUMN,
+    CURRENCY_COLUMN,
+    DATE_COLUMN,
+    FX_BASE_CURRENCY,
+    FX_RATES_FILENAME,
+    RATE_COLUMN,
+    REPORTING_CURRENCY,
+    SUPPORTED_CURRENCIES,
+)
+from core.fx import FxTable
+
+NUM_ROWS = [10_000, 100_000, 1_000_000]
+# Looking rates up row by row in Python is only timed up to this many rows.
+MAX_PYTHON_ROWS = 100_000
+# Daily rates of every currency over the whole history.
+FIRST_DAY = "2000-01-01"
+NUM_DAYS = 20 * 365
+
+
+def write_daily_rates(filepath, seed: int = 0) -> dict[str, tuple[list, list]]:
+    rng = np.random.default_rng(seed)
+    days = pd.date_range(FIRST_DAY, periods=NUM_DAYS, freq="D").strftime("%Y-%m-%d")
+    rates = {}
+    with open(filepath, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow([DATE_COLUMN, CURRENCY_COLUMN, RATE_COLUMN])
+        for currency in SUPPORTED_CURRENCIES:
+            if currency == FX_BASE_CURRENCY:
+                continue
+            values = np.round(5 + np.cumsum(rng.normal(0, 0.01, NUM_DAYS)), 4)
+            writer.writerows(zip(days, [currency] * NUM_DAYS, values))
+            rates[currency] = (list(days), list(values))
+    return rates
+
+
+def create_expenses(num_rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            AMOUNT_COLUMN: rng.uniform(1, 500, num_rows).round(2),
+            CURRENCY_COLUMN: pd.Categorical(
+                rng.choice(SUPPORTED_CURRENCIES, num_rows),
+                categories=SUPPORTED_CURRENCIES,
+            ),
+            DATE_COLUMN: pd.Timestamp(FIRST_DAY)
+            + pd.to_timedelta(rng.integers(0, NUM_DAYS, num_rows), unit="D"),
+        }
+    )
+
+
+def convert_row_by_row(df: pd.DataFrame, rates: dict) -> list[float]:
+    # One bisect per row, the way a Python loop over the expenses would do it.
+    amounts = []
+    dates = df[DATE_COLUMN].dt.strftime("%Y-%m-%d")
+    for amount, currency, date in zip(df[AMOUNT_COLUMN], df[CURRENCY_COLUMN], dates):
+        if currency == FX_BASE_CURRENCY:
+            amounts.append(amount)
+            continue
+        days, values = rates[currency]
+        amounts.append(amount * values[max(bisect_right(days, date) - 1, 0)])
+    return amounts
+
+
+def main():
+    results = []
+    with temporary_workdir() as workdir:
+        rates = write_daily_rates(workdir / FX_RATES_FILENAME)
+        fx_table = FxTable(workdir / FX_RATES_FILENAME)
+        load_ms = time_call(fx_table.get_version, repeat=1)
+        print(f"rate file with {NUM_DAYS} days per currency loaded in {load_ms:.1f} ms")
+        for num_rows in NUM_ROWS:
+            df = create_expenses(num_rows)
+            vectorized_ms = time_call(fx_table.convert, df, REPORTING_CURRENCY)
+            row_by_row_ms = None
+            if num_rows <= MAX_PYTHON_ROWS:
+                row_by_row_ms = time_call(convert_row_by_row, df, rates, repeat=1)
+                expected = convert_row_by_row(df, rates)
+                converted = fx_table.convert(df, REPORTING_CURRENCY)[AMOUNT_COLUMN]
+                assert np.allclose(converted, expected), "conversions differ"
+            row_by_row_str = (
+                "skipped" if row_by_row_ms is None else f"{row_by_row_ms:9.1f} ms"
+            )
+            print(
+                f"{num_rows:>9} rows: vectorized {vectorized_ms:8.2f} ms, "
+                f"row by row {row_by_row_str}"
+            )
+            results.append(
+                {
+                    "rows": num_rows,
+                    "vectorized_ms": round(vectorized_ms, 3),
+                    "row_by_row_ms": row_by_row_ms and round(row_by_row_ms, 3),
+                }
+            )
+    print(f"Results written to {write_results('fx', results)}")
+
+
+if __name__ == "__main__":
+    main()
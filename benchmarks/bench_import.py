@@ -0,0 +1,76 @@
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from benchmarks.common import temporary_workdir, write_results
+
+REPOSITORY_DIRECTORY = Path(__file__).parent.parent
+MAIN_FILEPATH = REPOSITORY_DIRECTORY / "main.py"
+# Modules that make the CLI slow to start when they are imported just to add
+# an expense.
+HEAVY_MODULES = ["pandas", "numpy", "dateutil", "pyarrow", "dash", "plotly"]
+NUM_RUNS = 5
+NUM_SLOWEST_IMPORTS = 10
+
+
+def get_import_times() -> dict[str, int]:
+    # Cumulative import time in microseconds of every module imported by
+    # `import main`, as reported by `python -X importtime`.
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=REPOSITORY_DIRECTORY,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    import_times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line.removeprefix("import time:").split("|")
+        import_times[module.strip()] = int(cumulative)
+    return import_times
+
+
+def time_cli(args: list[str]) -> float:
+    # Best-of-N wall time in milliseconds of a whole `main.py` run.
+    best = float("inf")
+    for _ in range(NUM_RUNS):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, MAIN_FILEPATH, *args], capture_output=True, check=True
+        )
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    import_times = get_import_times()
+    heavy_modules = [module for module in HEAVY_MODULES if module in import_times]
+    print(f"import main: {import_times['main'] / 1000:.1f} ms")
+    print(f"heavy modules imported: {', '.join(heavy_modules) or 'none'}")
+    print("slowest imports:")
+    slowest = sorted(import_times.items(), key=lambda item: item[1], reverse=True)
+    for module, cumulative in slowest[:NUM_SLOWEST_IMPORTS]:
+        print(f"  {cumulative / 1000:8.1f} ms  {module}")
+
+    with temporary_workdir():
+        add_args = ["-n", "popcorn", "-a", "3.25"]
+        quiet_ms = time_cli([*add_args, "--quiet"])
+        summary_ms = time_cli(add_args)
+    print(f"add an expense with --quiet: {quiet_ms:6.1f} ms")
+    print(f"add an expense with summary: {summary_ms:6.1f} ms")
+    results = [
+        {
+            "import_main_ms": round(import_times["main"] / 1000, 3),
+            "heavy_modules": heavy_modules,
+            "add_quiet_ms": round(quiet_ms, 3),
+            "add_with_summary_ms": round(summary_ms, 3),
+        }
+    ]
+    print(f"Results written to {write_results('import', results)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import csv
+import random
+import tracemalloc
+from pathlib import Path
+
+from benchmarks.common import temporary_workdir, time_call, write_results
+from benchmarks.generate import HistoryConfig, generate_history
+from core.config import (
+    AMOUNT_COLUMN,
+    DATE_COLUMN,
+    NAME_COLUMN,
+    PATH_TO_EXPENSE_FILES_CURRENT,
+    PATH_TO_INCOME_FILE,
+)
+from core.expense import to_cents
+from core.importer import (
+    get_expense_key,
+    import_statement,
+    load_category_rules,
+    read_statement,
+)
+from core.storage import CsvStorage
+
+HISTORY_MONTHS = 60
+HISTORY_ROWS_PER_MONTH = 1_000
+STATEMENT_ROWS = [10_000, 100_000]
+# Share of a statement's rows that are already in the month files, as when a
+# statement overlaps the previous one.
+OVERLAP = 0.5
+
+
+def _write_statement(filepath: Path, folder_path: Path, num_rows: int) -> None:
+    # A bank export: semicolons, day first dates, comma decimals and negative
+    # expenses. Part of it is copied from the month files.
+    rng = random.Random(num_rows)
+    existing = []
+    for month_filepath in sorted(folder_path.glob("expense_*.csv")):
+        with open(month_filepath, newline="") as file:
+            existing.extend(csv.DictReader(file))
+    with open(filepath, "w", newline="") as file:
+        writer = csv.writer(file, delimiter=";")
+        writer.writerow(["Data", "Descrição", "Valor"])
+        for number in range(num_rows):
+            if rng.random() < OVERLAP:
+                row = rng.choice(existing)
+                name, amount, date = (
+                    row[NAME_COLUMN],
+                    row[AMOUNT_COLUMN],
+                    row[DATE_COLUMN],
+                )
+            else:
+                name = f"statement purchase {number}"
+                amount = f"{rng.uniform(1, 500):.2f}"
+                date = rng.choice(existing)[DATE_COLUMN]
+            day = f"{date[8:10]}/{date[5:7]}/{date[:4]}"
+            writer.writerow([day, name, f"-{float(amount):.2f}".replace(".", ",")])
+
+
+def _import(storage: CsvStorage, filepath: Path, dry_run: bool = False) -> dict:
+    with open(filepath, newline="") as file:
+        report = import_statement(
+            read_statement(file, "csv", {}),
+            storage,
+            load_category_rules(),
+            negative_expenses=True,
+            dry_run=dry_run,
+        )
+    return {"added": report.added.total(), "duplicates": report.duplicates.total()}
+
+
+def _scan_history(folder_path: Path) -> set[int]:
+    # What finding duplicates without the hash index takes: every month file
+    # is read on every import.
+    keys = set()
+    for month_filepath in folder_path.glob("expense_*.csv"):
+        with open(month_filepath, newline="") as file:
+            for row in csv.DictReader(file):
+                cents = to_cents(float(row[AMOUNT_COLUMN]))
+                keys.add(get_expense_key(row[NAME_COLUMN], cents, row[DATE_COLUMN]))
+    return keys
+
+
+def _get_peak_mib(func, *args) -> float:
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024**2
+
+
+def main():
+    results = []
+    for num_rows in STATEMENT_ROWS:
+        with temporary_workdir() as directory:
+            config = HistoryConfig(
+                num_months=HISTORY_MONTHS, rows_per_month=HISTORY_ROWS_PER_MONTH
+            )
+            generate_history(PATH_TO_EXPENSE_FILES_CURRENT, PATH_TO_INCOME_FILE, config)
+            folder_path = Path(PATH_TO_EXPENSE_FILES_CURRENT)
+            storage = CsvStorage(folder_path, folder_path / "backup")
+            statement_filepath = directory / "statement.csv"
+            _write_statement(statement_filepath, folder_path, num_rows)
+
+            dry_run_peak_mib = _get_peak_mib(_import, storage, statement_filepath, True)
+            first_report = _import(storage, statement_filepath, True)
+            first_ms = time_call(_import, storage, statement_filepath, repeat=1)
+            # Importing it again finds every row already there; the first run
+            # after the import also reads the lines it added.
+            again_report = _import(storage, statement_filepath)
+            again_ms = time_call(_import, storage, statement_filepath, repeat=3)
+            scan_ms = time_call(_scan_history, folder_path, repeat=1)
+        print(
+            f"{num_rows:>7} statement rows: {first_report['added']} added and "
+            f"{first_report['duplicates']} already there in {first_ms:8.1f} ms "
+            f"({num_rows / first_ms * 1000:,.0f} rows/s, peak {dry_run_peak_mib:5.1f} "
+            f"MiB); again: {again_report['added']} added in {again_ms:8.1f} ms; "
+            f"scanning the history alone {scan_ms:8.1f} ms"
+        )
+        results.append(
+            {
+                "statement_rows": num_rows,
+                "history_rows": HISTORY_MONTHS * HISTORY_ROWS_PER_MONTH,
+                "added": first_report["added"],
+                "duplicates": first_report["duplicates"],
+                "import_ms": round(first_ms, 3),
+                "import_peak_mib": round(dry_run_peak_mib, 2),
+                "import_again_added": again_report["added"],
+                "import_again_ms": round(again_ms, 3),
+                "scan_history_ms": round(scan_ms, 3),
+            }
+        )
+    print(f"Results written to {write_results('importer', results)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import random
+from collections import defaultdict
+from datetime import datetime
+
+from benchmarks.common import time_call, write_results
+from core.config import DEFAULT_DESCRIPTION, EXPENSE_CATEGORIES
+from core.expense import Expense, _plan_installments_vectorized, to_cents
+
+NUM_EXPENSES = [10, 30, 100, 1_000, 10_000]
+
+
+def _make_statement(num_expenses: int, seed: int = 0) -> list[Expense]:
+    rng = random.Random(seed)
+    return [
+        Expense(
+            name=f"purchase {index}",
+            amount=round(rng.uniform(1, 5000), 2),
+            installments=rng.choice([1, 1, 2, 3, 6, 10, 12]),
+            category=rng.choice(EXPENSE_CATEGORIES),
+            description=DEFAULT_DESCRIPTION,
+            currency="BRL",
+            date=datetime(2024, rng.randint(1, 12), rng.randint(1, 31) % 28 + 1),
+        )
+        for index in range(num_expenses)
+    ]
+
+
+def _plan_one_by_one(expenses: list[Expense]) -> dict[str, list[list]]:
+    rows_by_month = defaultdict(list)
+    for expense in expenses:
+        for row in expense.installment_rows():
+            rows_by_month[row[-1][:7]].append(row)
+    return rows_by_month
+
+
+def _check(expenses: list[Expense], rows_by_month: dict[str, list[list]]) -> None:
+    cents = defaultdict(int)
+    for rows in rows_by_month.values():
+        for row in rows:
+            cents[row[0]] += to_cents(row[2])
+    for expense in expenses:
+        assert cents[expense.name] == to_cents(expense.amount), expense
+
+
+def main():
+    results = []
+    for num_expenses in NUM_EXPENSES:
+        expenses = _make_statement(num_expenses)
+        rows_by_month = _plan_installments_vectorized(expenses)
+        assert rows_by_month == _plan_one_by_one(expenses)
+        _check(expenses, rows_by_month)
+        one_by_one_ms = time_call(_plan_one_by_one, expenses)
+        vectorized_ms = time_call(_plan_installments_vectorized, expenses)
+        num_rows = sum(len(rows) for rows in rows_by_month.values())
+        results.append(
+            {
+                "expenses": num_expenses,
+                "installments": num_rows,
+                "one_by_one_ms": round(one_by_one_ms, 3),
+                "vectorized_ms": round(vectorized_ms, 3),
+            }
+        )
+        print(
+            f"{num_expenses:>6} expenses ({num_rows:>6} installments): one by one "
+            f"{one_by_one_ms:8.3f} ms, vectorized {vectorized_ms:8.3f} ms"
+        )
+    print(f"Results written to {write_results('installments', results)}")
+
+
+if __name__ == "__main__":
+    main()
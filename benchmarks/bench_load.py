@@ -0,0 +1,59 @@
+import shutil
+import time
+
+import pandas as pd
+
+from benchmarks.common import temporary_workdir, write_results, write_synthetic_months
+from core.config import CACHE_DIRECTORY_NAME, PATH_TO_EXPENSE_FILES_CURRENT
+from core.utils import load_csvs_to_dict
+
+NUM_MONTHS = 120
+ROWS_PER_MONTH = [100, 1_000, 5_000]
+
+
+def _load_raw_csvs() -> dict:
+    return {
+        p.stem: pd.read_csv(p)
+        for p in PATH_TO_EXPENSE_FILES_CURRENT.glob("expense_*.csv")
+    }
+
+
+def _load_with_cache() -> dict:
+    return load_csvs_to_dict(PATH_TO_EXPENSE_FILES_CURRENT)
+
+
+def _measure(label: str, load, rows_per_month: int) -> dict:
+    start = time.perf_counter()
+    dfs = load()
+    load_ms = (time.perf_counter() - start) * 1000
+    memory_mb = sum(df.memory_usage(deep=True).sum() for df in dfs.values()) / 2**20
+    print(
+        f"{rows_per_month:>6} rows/month, {label:<14} {load_ms:9.1f} ms {memory_mb:8.2f} MB"
+    )
+    return {
+        "rows_per_month": rows_per_month,
+        "source": label,
+        "load_ms": round(load_ms, 3),
+        "memory_mb": round(memory_mb, 3),
+    }
+
+
+def main():
+    results = []
+    with temporary_workdir():
+        for rows_per_month in ROWS_PER_MONTH:
+            shutil.rmtree(PATH_TO_EXPENSE_FILES_CURRENT, ignore_errors=True)
+            write_synthetic_months(
+                PATH_TO_EXPENSE_FILES_CURRENT, NUM_MONTHS, rows_per_month
+            )
+            # The untyped read is the old loader. The first cached load parses the
+            # CSVs and builds the sidecars, the second one reads the sidecars.
+            results.append(_measure("raw csv", _load_raw_csvs, rows_per_month))
+            results.append(_measure("csv + build", _load_with_cache, rows_per_month))
+            results.append(_measure("parquet cache", _load_with_cache, rows_per_month))
+            shutil.rmtree(PATH_TO_EXPENSE_FILES_CURRENT / CACHE_DIRECTORY_NAME)
+    print(f"Results written to {write_results('load', results)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import pandas as pd
+
+from benchmarks.common import (
+    temporary_workdir,
+    time_call,
+    write_results,
+    write_synthetic_months,
+)
+from core.config import (
+    AMOUNT_COLUMN,
+    CATEGORY_COLUMN,
+    CURRENCY_COLUMN,
+    DATE_COLUMN,
+    PATH_TO_EXPENSE_FILES_CURRENT,
+)
+from core.storage import get_csv_storage
+from core.utils import (
+    _parse_expense_csv,
+    create_expense_df,
+    create_memory_report_df,
+)
+
+NUM_MONTHS = 120
+ROWS_PER_MONTH = 5_000
+
+
+def parse_plain_csv(filepath) -> pd.DataFrame:
+    # The month files as pandas reads them by default: every text column is a
+    # column of strings.
+    df = pd.read_csv(filepath)
+    return df.assign(**{DATE_COLUMN: pd.to_datetime(df[DATE_COLUMN], format="%Y-%m-%d")})
+
+
+def group_by_category(df: pd.DataFrame) -> pd.DataFrame:
+    return df.groupby([CATEGORY_COLUMN, CURRENCY_COLUMN], observed=True)[
+        AMOUNT_COLUMN
+    ].sum()
+
+
+def main():
+    with temporary_workdir():
+        months = write_synthetic_months(
+            PATH_TO_EXPENSE_FILES_CURRENT, NUM_MONTHS, ROWS_PER_MONTH
+        )
+        storage = get_csv_storage()
+        parsers = {"plain": parse_plain_csv, "compact": _parse_expense_csv}
+        results = []
+        for name, parse in parsers.items():
+            dfs = {month: parse(storage.get_filepath(month)) for month in months}
+            report_df = create_memory_report_df(dfs)
+            df = pd.concat(dfs.values(), ignore_index=True)
+            if name == "compact":
+                df = create_expense_df(dfs, months)
+            groupby_ms = time_call(group_by_category, df)
+            total_mib = report_df["Total"].sum() / 1024**2
+            print(f"{name} months, first three:\n{report_df.head(3).to_string()}")
+            print(
+                f"{name}: {total_mib:7.2f} MiB for {NUM_MONTHS} months, "
+                f"groupby by category and currency {groupby_ms:6.2f} ms\n"
+            )
+            results.append(
+                {
+                    "schema": name,
+                    "months": NUM_MONTHS,
+                    "rows_per_month": ROWS_PER_MONTH,
+                    "memory_mib": round(total_mib, 3),
+                    "groupby_ms": round(groupby_ms, 3),
+                    "bytes_per_column": report_df.drop(columns="Rows")
+                    .sum()
+                    .astype(int)
+                    .to_dict(),
+                }
+            )
+    print(f"Results written to {write_results('memory', results)}")
+
+
+if __name__ == "__main__":
+    main()
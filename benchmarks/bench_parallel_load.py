@@ -0,0 +1,63 @@
+import os
+import statistics
+import time
+
+from benchmarks.common import temporary_workdir, write_results, write_synthetic_months
+from core.config import PATH_TO_EXPENSE_FILES_CURRENT
+from core.loader import load_files
+from core.utils import _parse_expense_csv, read_expense_csv
+
+NUM_MONTHS = 120
+ROWS_PER_MONTH = 5_000
+NUM_WORKERS = sorted({1, 2, 4, 8, os.cpu_count() or 1})
+# The CSV files are parsed every time; the Parquet sidecars are built on the
+# first load and read afterwards.
+LOADERS = {"csv": _parse_expense_csv, "parquet cache": read_expense_csv}
+
+
+def time_load(filepaths, load, pool: str, max_workers: int) -> tuple[float, dict]:
+    start = time.perf_counter()
+    _, timings = load_files(filepaths, load, pool, max_workers)
+    return (time.perf_counter() - start) * 1000, timings
+
+
+def main():
+    results = []
+    print(f"{NUM_MONTHS} months of {ROWS_PER_MONTH} rows, {os.cpu_count()} CPUs")
+    with temporary_workdir():
+        write_synthetic_months(PATH_TO_EXPENSE_FILES_CURRENT, NUM_MONTHS, ROWS_PER_MONTH)
+        filepaths = sorted(PATH_TO_EXPENSE_FILES_CURRENT.glob("expense_*.csv"))
+        # Builds the sidecars, so every measured load reads them.
+        load_files(filepaths, read_expense_csv, "serial")
+        for name, load in LOADERS.items():
+            serial_ms, timings = time_load(filepaths, load, "serial", 1)
+            file_ms = sorted(timings.values())
+            print(
+                f"\n{name}: serial {serial_ms:8.1f} ms, per file min {file_ms[0]:.2f} "
+                f"/ median {statistics.median(file_ms):.2f} / max {file_ms[-1]:.2f} ms"
+            )
+            for pool in ["thread", "process"]:
+                for max_workers in NUM_WORKERS:
+                    if max_workers == 1:
+                        continue
+                    load_ms, _ = time_load(filepaths, load, pool, max_workers)
+                    speedup = serial_ms / load_ms
+                    print(
+                        f"{name}: {pool:<7} pool, {max_workers} workers "
+                        f"{load_ms:8.1f} ms, speedup {speedup:4.2f}x"
+                    )
+                    results.append(
+                        {
+                            "source": name,
+                            "pool": pool,
+                            "workers": max_workers,
+                            "load_ms": round(load_ms, 3),
+                            "serial_ms": round(serial_ms, 3),
+                            "speedup": round(speedup, 3),
+                        }
+                    )
+    print(f"\nResults written to {write_results('parallel_load', results)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import shutil
+
+import pandas as pd
+
+from benchmarks.common import (
+    temporary_workdir,
+    time_call,
+    write_results,
+    write_synthetic_months,
+)
+from core.config import PATH_TO_EXPENSE_FILES_CURRENT
+from core.store import ExpenseStore
+
+LATENCY_BUDGET_MS = 5.0
+NUM_MONTHS = [24, 120, 240]
+ROWS_PER_MONTH = 1_000
+
+
+def _concat_per_month(dfs: dict[str, pd.DataFrame], dates: list[str]) -> pd.DataFrame:
+    # The previous create_expense_df, kept here as the baseline.
+    df = pd.DataFrame()
+    for date in dates:
+        df = pd.concat([df, dfs[date]], ignore_index=True)
+    return df
+
+
+def main():
+    results = []
+    with temporary_workdir():
+        for num_months in NUM_MONTHS:
+            shutil.rmtree(PATH_TO_EXPENSE_FILES_CURRENT, ignore_errors=True)
+            months = write_synthetic_months(
+                PATH_TO_EXPENSE_FILES_CURRENT, num_months, ROWS_PER_MONTH
+            )
+            store = ExpenseStore(PATH_TO_EXPENSE_FILES_CURRENT)
+            dfs = store.get_dfs()
+            store.get_range(months[0])
+            # A slider selection covering the whole history but the last month.
+            concat_ms = time_call(_concat_per_month, dfs, months[:-1])
+            slice_ms = time_call(store.get_range, months[0], months[-1])
+            print(
+                f"{num_months:>4} months: concat loop {concat_ms:9.2f} ms, "
+                f"consolidated slice {slice_ms:7.3f} ms "
+                f"({'within' if slice_ms <= LATENCY_BUDGET_MS else 'over'} "
+                f"the {LATENCY_BUDGET_MS} ms budget)"
+            )
+            results.append(
+                {
+                    "months": num_months,
+                    "rows_per_month": ROWS_PER_MONTH,
+                    "concat_loop_ms": round(concat_ms, 3),
+                    "slice_ms": round(slice_ms, 3),
+                    "budget_ms": LATENCY_BUDGET_MS,
+                }
+            )
+    print(f"Results written to {write_results('range', results)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import csv
+import os
+from pathlib import Path
+
+from benchmarks.common import temporary_workdir, time_call, write_results
+from benchmarks.generate import HistoryConfig, generate_history
+from core.config import (
+    DEFAULT_DESCRIPTION,
+    DESCRIPTION_COLUMN,
+    EXPENSE_COLUMNS,
+    NAME_COLUMN,
+    PATH_TO_EXPENSE_FILES_CURRENT,
+    PATH_TO_INCOME_FILE,
+)
+from core.files import append_rows_to_csv
+from core.search import SearchIndex
+
+SCALES = [(24, 1_000), (120, 1_000)]
+QUERIES = ["food 12", "clothes 7 gift", "sav", "trip"]
+
+
+def _scan_month_files(folder_path: Path, query: str) -> list[list[str]]:
+    # What a search took before the index: every month file is read and every
+    # name and description checked for the words.
+    words = query.lower().split()
+    matches = []
+    for filepath in folder_path.glob("expense_*.csv"):
+        with open(filepath, newline="") as file:
+            for row in csv.DictReader(file):
+                text = f"{row[NAME_COLUMN]} {row[DESCRIPTION_COLUMN]}".lower()
+                if all(word in text for word in words):
+                    matches.append(row)
+    return matches
+
+
+def _build(folder_path: Path, from_files: bool = False) -> SearchIndex:
+    # Without `from_files`, the index saved by the previous build is loaded.
+    index = SearchIndex(folder_path)
+    if from_files and os.path.exists(index.filepath):
+        os.remove(index.filepath)
+    index.refresh()
+    return index
+
+
+def _look_up(folder_path: Path, query: str) -> dict | None:
+    return SearchIndex(folder_path).get_most_recent(query)
+
+
+def _append_and_refresh(index: SearchIndex, filepath: Path) -> None:
+    row = ["bench", "FOOD", 1.0, "BRL", DEFAULT_DESCRIPTION, "2000-01-01"]
+    append_rows_to_csv(filepath, [row], EXPENSE_COLUMNS)
+    index.refresh()
+
+
+def main():
+    results = []
+    for num_months, rows_per_month in SCALES:
+        with temporary_workdir():
+            config = HistoryConfig(num_months=num_months, rows_per_month=rows_per_month)
+            months = generate_history(
+                PATH_TO_EXPENSE_FILES_CURRENT, PATH_TO_INCOME_FILE, config
+            )
+            folder_path = Path(PATH_TO_EXPENSE_FILES_CURRENT)
+            index = _build(folder_path)
+            num_rows = index.get_num_rows()
+            build_ms = time_call(_build, folder_path, True, repeat=1)
+            load_ms = time_call(_build, folder_path, repeat=3)
+            # What `main.py --like` does: load the saved index and look it up.
+            like_ms = time_call(_look_up, folder_path, QUERIES[0], repeat=3)
+            append_ms = time_call(
+                _append_and_refresh,
+                index,
+                folder_path / f"expense_{months[-1]}.csv",
+                repeat=5,
+            )
+            # Lookups alone, as the dashboard checks the files at most once per
+            # `EXPENSE_STORE_REFRESH_SECONDS`.
+            index.refresh_seconds = float("inf")
+            for query in QUERIES:
+                search_ms = time_call(index.search, query, repeat=200)
+                scan_ms = time_call(_scan_month_files, folder_path, query, repeat=1)
+                _, num_matches = index.search(query)
+                print(
+                    f"{num_rows:>7} rows, {query!r:<18} {num_matches:>6} matches: "
+                    f"index {search_ms * 1000:7.1f} us, file scan {scan_ms:8.1f} ms"
+                )
+                results.append(
+                    {
+                        "months": num_months,
+                        "rows": num_rows,
+                        "query": query,
+                        "matches": num_matches,
+                        "search_ms": round(search_ms, 4),
+                        "scan_ms": round(scan_ms, 3),
+                        "build_ms": round(build_ms, 3),
+                        "load_ms": round(load_ms, 3),
+                        "like_ms": round(like_ms, 3),
+                        "append_refresh_ms": round(append_ms, 3),
+                    }
+                )
+        print(
+            f"{num_rows:>7} rows: build {build_ms:8.1f} ms, load {load_ms:7.1f} ms, "
+            f"load and look up {like_ms:7.1f} ms, "
+            f"append + refresh {append_ms:6.2f} ms"
+        )
+    print(f"Results written to {write_results('search', results)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import shutil
+
+from benchmarks.common import (
+    temporary_workdir,
+    time_call,
+    write_results,
+    write_synthetic_months,
+)
+from core.config import PATH_TO_EXPENSE_FILES_CURRENT, SQLITE_FILENAME
+from core.storage import CsvStorage, SqliteStorage, import_csv_storage
+
+NUM_MONTHS = [24, 120, 240]
+ROWS_PER_MONTH = 1_000
+# Every query covers the same three months whatever the size of the history.
+RANGE_MONTHS = 3
+
+
+def main():
+    results = []
+    with temporary_workdir() as workdir:
+        for num_months in NUM_MONTHS:
+            shutil.rmtree(PATH_TO_EXPENSE_FILES_CURRENT, ignore_errors=True)
+            months = write_synthetic_months(
+                PATH_TO_EXPENSE_FILES_CURRENT, num_months, ROWS_PER_MONTH
+            )
+            storage = SqliteStorage(workdir / f"{num_months}_{SQLITE_FILENAME}")
+            csv_storage = CsvStorage(PATH_TO_EXPENSE_FILES_CURRENT, workdir / "backup")
+            migrate_ms = time_call(import_csv_storage, csv_storage, storage, repeat=1)
+            start_month = months[len(months) // 2]
+            end_month = months[len(months) // 2 + RANGE_MONTHS]
+            read_ms = time_call(storage.read_range, start_month, end_month)
+            aggregate_ms = time_call(storage.aggregate_range, start_month, end_month)
+            print(
+                f"{num_months:>4} months: migrate {migrate_ms:8.1f} ms, "
+                f"read {RANGE_MONTHS} months {read_ms:6.2f} ms, "
+                f"aggregate {RANGE_MONTHS} months {aggregate_ms:6.2f} ms"
+            )
+            results.append(
+                {
+                    "months": num_months,
+                    "rows_per_month": ROWS_PER_MONTH,
+                    "migrate_ms": round(migrate_ms, 3),
+                    "read_range_ms": round(read_ms, 3),
+                    "aggregate_range_ms": round(aggregate_ms, 3),
+                }
+            )
+    print(f"Results written to {write_results('sqlite', results)}")
+
+
+if __name__ == "__main__":
+    main()
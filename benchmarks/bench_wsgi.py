@@ -0,0 +1,211 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from itertools import combinations, cycle, islice, product
+from pathlib import Path
+
+from benchmarks.common import temporary_workdir, write_results
+from benchmarks.generate import HistoryConfig, generate_history
+from core.config import (
+    PATH_TO_EXPENSE_FILES_CURRENT,
+    PATH_TO_INCOME_FILE,
+    SUPPORTED_CURRENCIES,
+)
+
+NUM_MONTHS = 60
+ROWS_PER_MONTH = 500
+WORKERS = [1, 2, 4]
+CLIENTS_PER_WORKER = 2
+NUM_REQUESTS = 150
+STARTUP_TIMEOUT_SECONDS = 120
+PROJECT_PATH = Path(__file__).parent.parent
+
+
+def _get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _get_callback_body(outputs: list[str], inputs: dict[str, object]) -> bytes:
+    # What the browser posts to run a callback.
+    body = {
+        "output": f"..{'...'.join(outputs)}..",
+        "outputs": [
+            {"id": output.split(".")[0], "property": output.split(".")[1]}
+            for output in outputs
+        ],
+        "inputs": [
+            {"id": input.split(".")[0], "property": input.split(".")[1], "value": value}
+            for input, value in inputs.items()
+        ],
+        "changedPropIds": list(inputs)[:1],
+    }
+    return json.dumps(body).encode()
+
+
+def _get_month_bodies(months: list[str]) -> list[bytes]:
+    outputs = [
+        "line-chart-month.figure",
+        "bar-chart-month.figure",
+        "pie-chart-month.figure",
+        "amount-left-display.children",
+    ]
+    return [
+        _get_callback_body(
+            outputs,
+            {
+                "dropdown-selection-date.value": month,
+                "dropdown-selection-currency-month.value": currency,
+                "data-version.data": None,
+            },
+        )
+        for month, currency in product(reversed(months), SUPPORTED_CURRENCIES)
+    ]
+
+
+def _get_range_bodies(months: list[str]) -> list[bytes]:
+    outputs = [
+        "line-chart-range.figure",
+        "bar-chart-range.figure",
+        "pie-chart-range.figure",
+    ]
+    return [
+        _get_callback_body(
+            outputs,
+            {
+                "date-range-slider.value": [start, end],
+                "dropdown-selection-currency-range.value": currency,
+                "data-version.data": None,
+            },
+        )
+        for (start, end), currency in product(
+            combinations(range(len(months)), 2), SUPPORTED_CURRENCIES
+        )
+    ]
+
+
+def _post(url: str, body: bytes) -> None:
+    request = urllib.request.Request(
+        url, data=body, headers={"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(request) as response:
+        response.read()
+
+
+def _get_requests_per_second(url: str, bodies: list[bytes], num_clients: int) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(num_clients) as executor:
+        list(executor.map(_post, [url] * len(bodies), bodies))
+    return len(bodies) / (time.perf_counter() - start)
+
+
+def _start_server(num_workers: int, port: int) -> tuple[subprocess.Popen, float]:
+    # Runs the production configuration from the scratch directory, where the
+    # relative paths of `core/config.py` point to the synthetic history.
+    env = {**os.environ, "PYTHONPATH": str(PROJECT_PATH)}
+    command = [
+        sys.executable,
+        "-m",
+        "gunicorn",
+        "--config",
+        str(PROJECT_PATH / "gunicorn.conf.py"),
+        "--workers",
+        str(num_workers),
+        "--bind",
+        f"127.0.0.1:{port}",
+        "--log-level",
+        "warning",
+    ]
+    start = time.perf_counter()
+    process = subprocess.Popen(command, env=env)
+    while time.perf_counter() - start < STARTUP_TIMEOUT_SECONDS:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with code {process.returncode}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/"):
+                return process, time.perf_counter() - start
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("gunicorn did not start in time")
+
+
+def _get_memory_mib(pid: int) -> tuple[float, float] | None:
+    # Proportional set size of the server, where memory shared by several
+    # processes is split among them, and the memory only the workers wrote to.
+    # Linux only.
+    children_path = Path(f"/proc/{pid}/task/{pid}/children")
+    if not children_path.exists():
+        return None
+    worker_pids = [int(child) for child in children_path.read_text().split()]
+    totals = {"Pss": 0, "Private_Dirty": 0}
+    for process_id in [pid, *worker_pids]:
+        for line in Path(f"/proc/{process_id}/smaps_rollup").read_text().splitlines():
+            key, _, value = line.partition(":")
+            if key == "Pss" or (key == "Private_Dirty" and process_id != pid):
+                totals[key] += int(value.split()[0])
+    return totals["Pss"] / 1024, totals["Private_Dirty"] / 1024
+
+
+def main():
+    results = []
+    with temporary_workdir():
+        config = HistoryConfig(num_months=NUM_MONTHS, rows_per_month=ROWS_PER_MONTH)
+        months = generate_history(
+            PATH_TO_EXPENSE_FILES_CURRENT, PATH_TO_INCOME_FILE, config
+        )
+        callbacks = {
+            "monthly": _get_month_bodies(months),
+            "range": _get_range_bodies(months),
+        }
+        for num_workers in WORKERS:
+            port = _get_free_port()
+            process, startup_seconds = _start_server(num_workers, port)
+            url = f"http://127.0.0.1:{port}/_dash-update-component"
+            num_clients = num_workers * CLIENTS_PER_WORKER
+            try:
+                # Right after the start, the workers still share what was
+                # preloaded; the figures they compute later are their own.
+                server_mib, private_mib = _get_memory_mib(process.pid) or (0.0, 0.0)
+                print(
+                    f"{num_workers} workers: started in {startup_seconds:5.2f} s, "
+                    f"{server_mib:6.1f} MiB in total, {private_mib:5.1f} MiB private "
+                    "to the workers"
+                )
+                result = {
+                    "months": NUM_MONTHS,
+                    "rows_per_month": ROWS_PER_MONTH,
+                    "workers": num_workers,
+                    "clients": num_clients,
+                    "startup_seconds": round(startup_seconds, 3),
+                    "server_mib": round(server_mib, 1),
+                    "workers_private_mib": round(private_mib, 1),
+                }
+                for name, bodies in callbacks.items():
+                    # New inputs first, which the callback computes, then the
+                    # same ones again, answered from the figure cache when they
+                    # reach the worker that computed them.
+                    bodies = list(islice(cycle(bodies), NUM_REQUESTS))
+                    computed = _get_requests_per_second(url, bodies, num_clients)
+                    repeated = _get_requests_per_second(url, bodies, num_clients)
+                    print(
+                        f"{num_workers} workers, {name:>7}: {computed:7.1f} requests/s "
+                        f"computed, {repeated:7.1f} requests/s repeated"
+                    )
+                    result[f"{name}_computed_requests_per_second"] = round(computed, 1)
+                    result[f"{name}_repeated_requests_per_second"] = round(repeated, 1)
+                results.append(result)
+            finally:
+                process.terminate()
+                process.wait()
+    print(f"Results written to {write_results('wsgi', results)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import json
+import os
+import random
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from core.config import (
+    DEFAULT_DESCRIPTION,
+    EXPENSE_CATEGORIES,
+    EXPENSE_COLUMNS,
+    INCOME_FILENAME,
+    SUPPORTED_CURRENCIES,
+)
+from core.files import append_rows_to_csv
+
+RESULTS_DIRECTORY = Path(__file__).parent / "results"
+
+
+@contextmanager
+def temporary_workdir():
+    # Every path in `core/config.py` is relative, so running inside a scratch
+    # directory keeps the benchmarks away from the real expense files.
+    previous_directory = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="monkey-bench-") as directory:
+        os.chdir(directory)
+        income = {"2000-01": {currency: 1000 for currency in SUPPORTED_CURRENCIES}}
+        with open(INCOME_FILENAME, "w") as file:
+            json.dump(income, file)
+        try:
+            yield Path(directory)
+        finally:
+            os.chdir(previous_directory)
+
+
+def get_months(num_months: int, first_year: int = 2000) -> list[str]:
+    return [
+        f"{first_year + month // 12}-{month % 12 + 1:02d}" for month in range(num_months)
+    ]
+
+
+def write_synthetic_months(
+    folder_path: Path, num_months: int, rows_per_month: int, seed: int = 0
+) -> list[str]:
+    rng = random.Random(seed)
+    months = get_months(num_months)
+    for month in months:
+        rows = [
+            [
+                f"expense {rng.randrange(500)}",
+                rng.choice(EXPENSE_CATEGORIES),
+                round(rng.uniform(1, 500), 2),
+                rng.choice(SUPPORTED_CURRENCIES),
+                DEFAULT_DESCRIPTION,
+                f"{month}-{rng.randint(1, 28):02d}",
+            ]
+            for _ in range(rows_per_month)
+        ]
+        append_rows_to_csv(folder_path / f"expense_{month}.csv", rows, EXPENSE_COLUMNS)
+    return months
+
+
+def time_call(func, *args, repeat: int = 5, **kwargs) -> float:
+    # Best-of-N wall time in milliseconds.
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def write_results(name: str, results: list[dict]) -> Path:
+    os.makedirs(RESULTS_DIRECTORY, exist_ok=True)
+    filepath = RESULTS_DIRECTORY / f"{name}.json"
+    with open(filepath, "w") as file:
+        json.dump(results, file, indent=4)
+    return filepath
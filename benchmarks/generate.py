@@ -0,0 +1,165 @@
+import argparse
+import json
+import os
+import random
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.common import get_months
+from core.config import (
+    DEFAULT_DESCRIPTION,
+    EXPENSE_CATEGORIES,
+    EXPENSE_COLUMNS,
+    PATH_TO_EXPENSE_FILES_CURRENT,
+    PATH_TO_INCOME_FILE,
+)
+from core.expense import Expense, plan_installments
+from core.files import append_rows_to_csv
+
+# Purchases are drawn from a few hundred recurring names, like a real card
+# statement, with amounts that depend on the category.
+NUM_NAMES = 300
+CATEGORY_AMOUNTS = {
+    "SPORTS": (20, 300),
+    "HEALTH": (20, 800),
+    "STUDY": (30, 1500),
+    "FOOD": (5, 150),
+    "LEISURE": (10, 400),
+    "CLOTHES": (40, 900),
+    "OTHERS": (5, 600),
+    "SAVINGS": (100, 3000),
+}
+DESCRIPTIONS = [DEFAULT_DESCRIPTION] * 8 + ["gift", "work", "trip"]
+
+
+@dataclass
+class HistoryConfig:
+    num_months: int = 24
+    # Purchases made in each month; purchases in installments also add rows to
+    # the following months.
+    rows_per_month: int = 500
+    # Share of the purchases made in each currency.
+    currencies: dict[str, float] = field(
+        default_factory=lambda: {"BRL": 0.85, "US": 0.1, "EUR": 0.05}
+    )
+    # Share of the purchases paid in each number of installments.
+    installment_mix: dict[int, float] = field(
+        default_factory=lambda: {1: 0.8, 2: 0.05, 3: 0.07, 6: 0.04, 10: 0.02, 12: 0.02}
+    )
+    first_year: int = 2000
+    seed: int = 0
+
+
+def _make_expenses(
+    month: str, config: HistoryConfig, rng: random.Random
+) -> list[Expense]:
+    year, month_number = int(month[:4]), int(month[5:7])
+    currencies = rng.choices(
+        list(config.currencies), list(config.currencies.values()), k=config.rows_per_month
+    )
+    installments = rng.choices(
+        list(config.installment_mix),
+        list(config.installment_mix.values()),
+        k=config.rows_per_month,
+    )
+    expenses = []
+    for currency, num_installments in zip(currencies, installments):
+        category = rng.choice(EXPENSE_CATEGORIES)
+        low, high = CATEGORY_AMOUNTS.get(category, (5, 500))
+        expenses.append(
+            Expense(
+                name=f"{category.lower()} {rng.randrange(NUM_NAMES)}",
+                amount=round(rng.uniform(low, high) * num_installments**0.5, 2),
+                installments=num_installments,
+                category=category,
+                description=rng.choice(DESCRIPTIONS),
+                currency=currency,
+                date=datetime(year, month_number, rng.randint(1, 28)),
+            )
+        )
+    return expenses
+
+
+def write_income_file(filepath: Path, months: list[str], config: HistoryConfig) -> None:
+    # A raise every year or so, in every currency of the history.
+    rng = random.Random(config.seed)
+    incomes = {}
+    income = 5000
+    for month in months[:: rng.randint(10, 14)]:
+        incomes[month] = {
+            currency: round(income * share)
+            for currency, share in config.currencies.items()
+        }
+        income = round(income * rng.uniform(1.0, 1.1))
+    with open(filepath, "w") as file:
+        json.dump(incomes, file, indent=4)
+
+
+def generate_history(
+    folder_path: Path, income_filepath: Path, config: HistoryConfig
+) -> list[str]:
+    # Writes `expense_YYYY-MM.csv` files to `folder_path` and the income file,
+    # and returns the months purchases were made in.
+    rng = random.Random(config.seed)
+    months = get_months(config.num_months, config.first_year)
+    expenses = [
+        expense for month in months for expense in _make_expenses(month, config, rng)
+    ]
+    for month, rows in sorted(plan_installments(expenses).items()):
+        append_rows_to_csv(
+            Path(folder_path) / f"expense_{month}.csv", rows, EXPENSE_COLUMNS
+        )
+    write_income_file(income_filepath, months, config)
+    return months
+
+
+def _parse_shares(value: str, key_type: type) -> dict:
+    shares = {}
+    for item in value.split(","):
+        key, share = item.split("=")
+        shares[key_type(key)] = float(share)
+    return shares
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.generate",
+        description="Write a synthetic expense history to OUTPUT, laid out like the \
+                     project folder: `cd OUTPUT && uv run ../app.py` shows it.",
+    )
+    parser.add_argument("output", type=Path)
+    parser.add_argument("--months", type=int, default=HistoryConfig.num_months)
+    parser.add_argument("--rows", type=int, default=HistoryConfig.rows_per_month)
+    parser.add_argument(
+        "--currencies",
+        type=lambda value: _parse_shares(value, str),
+        help="Share of each currency, such as BRL=0.9,US=0.1.",
+    )
+    parser.add_argument(
+        "--installments",
+        type=lambda value: _parse_shares(value, int),
+        help="Share of each number of installments, such as 1=0.9,12=0.1.",
+    )
+    parser.add_argument("--seed", type=int, default=HistoryConfig.seed)
+    args = parser.parse_args()
+
+    config = HistoryConfig(
+        num_months=args.months, rows_per_month=args.rows, seed=args.seed
+    )
+    if args.currencies:
+        config.currencies = args.currencies
+    if args.installments:
+        config.installment_mix = args.installments
+    os.makedirs(args.output, exist_ok=True)
+    # The paths of `core/config.py` are relative to the working directory.
+    os.chdir(args.output)
+    months = generate_history(PATH_TO_EXPENSE_FILES_CURRENT, PATH_TO_INCOME_FILE, config)
+    print(
+        f"==> {len(months)} months of {config.rows_per_month} purchases written to "
+        f"{args.output / PATH_TO_EXPENSE_FILES_CURRENT}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import csv
+import os
+import time
+from datetime import datetime
+from multiprocessing import Pool
+from pathlib import Path
+
+from benchmarks.common import temporary_workdir, write_results
+from core.backup import restore_month_rows
+from core.config import (
+    DEFAULT_CATEGORY,
+    DEFAULT_CURRENCY,
+    DEFAULT_DESCRIPTION,
+    EXPENSE_COLUMNS,
+    NAME_COLUMN,
+    PATH_TO_EXPENSE_FILES_CURRENT,
+    PATH_TO_EXPENSE_FILES_CURRENT_BACKUP,
+    SQLITE_FILENAME,
+)
+from core.storage import CsvStorage, SqliteStorage
+
+NUM_WRITERS = [1, 2, 4, 8]
+APPENDS_PER_WRITER = 200
+# Every writer appends to the same month, which is the worst case.
+MONTH = "2000-01"
+
+
+def get_storage(backend: str, workdir: Path):
+    if backend == "sqlite":
+        return SqliteStorage(workdir / SQLITE_FILENAME)
+    return CsvStorage(
+        workdir / PATH_TO_EXPENSE_FILES_CURRENT,
+        workdir / PATH_TO_EXPENSE_FILES_CURRENT_BACKUP,
+    )
+
+
+def write(backend: str, workdir: Path, writer: int) -> None:
+    storage = get_storage(backend, workdir)
+    for append in range(APPENDS_PER_WRITER):
+        row = [
+            f"writer {writer} append {append}",
+            DEFAULT_CATEGORY,
+            1.0,
+            DEFAULT_CURRENCY,
+            DEFAULT_DESCRIPTION,
+            f"{MONTH}-01",
+        ]
+        storage.append_rows({MONTH: [row]})
+
+
+def read_csv_names(filepath: Path, header: list[str]) -> list[str]:
+    with open(filepath, newline="") as file:
+        rows = list(csv.reader(file))
+    assert rows[0] == header, f"{filepath} does not start with its header"
+    assert header not in rows[1:], f"{filepath} has more than one header"
+    name_index = header.index(NAME_COLUMN)
+    return [row[name_index] for row in rows[1:]]
+
+
+def check(backend: str, storage, num_writers: int) -> None:
+    expected = {
+        f"writer {writer} append {append}"
+        for writer in range(num_writers)
+        for append in range(APPENDS_PER_WRITER)
+    }
+    if backend == "sqlite":
+        names = storage.read_month(MONTH)[NAME_COLUMN].tolist()
+    else:
+        names = read_csv_names(storage.get_filepath(MONTH), EXPENSE_COLUMNS)
+        # The snapshots and the journal must rebuild the month file exactly.
+        backup_rows = restore_month_rows(storage.backup_path / MONTH, datetime.now())
+        backup_names = [row[EXPENSE_COLUMNS.index(NAME_COLUMN)] for row in backup_rows]
+        assert backup_names == names, "backups and month file differ"
+    assert len(names) == len(expected), f"{len(expected) - len(names)} rows were lost"
+    assert set(names) == expected, "rows were corrupted"
+
+
+def main():
+    results = []
+    with temporary_workdir() as workdir:
+        for backend in ["csv", "sqlite"]:
+            for num_writers in NUM_WRITERS:
+                run_workdir = workdir / f"{backend}_{num_writers}"
+                os.makedirs(run_workdir)
+                storage = get_storage(backend, run_workdir)
+                start = time.perf_counter()
+                with Pool(num_writers) as pool:
+                    pool.starmap(
+                        write,
+                        [(backend, run_workdir, writer) for writer in range(num_writers)],
+                    )
+                seconds = time.perf_counter() - start
+                check(backend, storage, num_writers)
+                appends = num_writers * APPENDS_PER_WRITER
+                print(
+                    f"{backend:>6}, {num_writers} writers: {appends} appends, "
+                    f"none lost, {appends / seconds:8.0f} appends/s"
+                )
+                results.append(
+                    {
+                        "backend": backend,
+                        "writers": num_writers,
+                        "appends": appends,
+                        "appends_per_second": round(appends / seconds),
+                    }
+                )
+    print(f"Results written to {write_results('stress_writers', results)}")
+
+
+if __name__ == "__main__":
+    main()
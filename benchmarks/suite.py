@@ -0,0 +1,193 @@
+import argparse
+import contextlib
+import io
+import json
+import platform
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.common import temporary_workdir, time_call, write_results
+from benchmarks.generate import HistoryConfig, generate_history
+from core.config import (
+    DEFAULT_CURRENCY,
+    DEFAULT_DESCRIPTION,
+    PATH_TO_EXPENSE_FILES_CURRENT,
+    PATH_TO_INCOME_FILE,
+    SUPPORTED_CURRENCIES,
+)
+from core.expense import Expense
+
+# (months, purchases per month) of each history the entry points are timed on.
+SCALES = [(12, 100), (60, 500), (120, 2_000)]
+QUICK_SCALES = SCALES[:1]
+# Entry points more than this many times slower than in the compared run, and
+# by at least `MIN_REGRESSION_MS`, are reported as regressions.
+DEFAULT_TOLERANCE = 1.25
+MIN_REGRESSION_MS = 0.5
+
+
+def _get_commit() -> str | None:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            check=False,
+            capture_output=True,
+            text=True,
+            cwd=Path(__file__).parent,
+        )
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+def _add_expense(quiet: bool, month: str) -> None:
+    expense = Expense(
+        name="bench",
+        amount=100.0,
+        installments=3,
+        category="FOOD",
+        description=DEFAULT_DESCRIPTION,
+        currency=DEFAULT_CURRENCY,
+        date=datetime.strptime(f"{month}-15", "%Y-%m-%d"),
+    )
+    with contextlib.redirect_stdout(io.StringIO()):
+        expense.update_expense(quiet)
+
+
+def _uncached(func, *args) -> None:
+    # Dashboard callbacks keep their results in the figure cache, so it is
+    # emptied to time them building the figures.
+    from core.figure_cache import figure_cache
+
+    figure_cache.clear()
+    func(*args)
+
+
+def _time_scale(num_months: int, rows_per_month: int, repeat: int) -> dict[str, float]:
+    config = HistoryConfig(num_months=num_months, rows_per_month=rows_per_month)
+    months = generate_history(PATH_TO_EXPENSE_FILES_CURRENT, PATH_TO_INCOME_FILE, config)
+    # Imported once there is data, as the dashboard pages read it when imported.
+    import app  # noqa: F401
+    from core.income import get_income
+    from core.store import expense_store
+    from core.utils import create_amount_left_df, create_expense_df, load_csvs_to_dict
+    from pages.custom_range_spending import update_graphs_range
+    from pages.monthly_spending import update_graphs_month
+
+    expense_store.refresh()
+    dfs = load_csvs_to_dict(PATH_TO_EXPENSE_FILES_CURRENT)
+    dates = sorted(dfs)
+    month = months[-1]
+    month_df = dfs[month]
+    full_range = [0, len(dates) - 1]
+
+    def get_every_income() -> None:
+        for date in dates:
+            for currency in SUPPORTED_CURRENCIES:
+                get_income(date, currency)
+
+    timings = {
+        "update_expense_quiet": lambda: _add_expense(True, month),
+        "update_expense": lambda: _add_expense(False, month),
+        "get_income_every_month": get_every_income,
+        "load_csvs_to_dict": lambda: load_csvs_to_dict(PATH_TO_EXPENSE_FILES_CURRENT),
+        "create_expense_df": lambda: create_expense_df(dfs, dates),
+        "create_amount_left_df": lambda: create_amount_left_df(
+            month_df, DEFAULT_CURRENCY
+        ),
+        "update_graphs_month": lambda: _uncached(
+            update_graphs_month, month, DEFAULT_CURRENCY, None
+        ),
+        "update_graphs_month_cached": lambda: update_graphs_month(
+            month, DEFAULT_CURRENCY, None
+        ),
+        "update_graphs_range": lambda: _uncached(
+            update_graphs_range, full_range, DEFAULT_CURRENCY, None
+        ),
+        "update_graphs_range_cached": lambda: update_graphs_range(
+            full_range, DEFAULT_CURRENCY, None
+        ),
+    }
+    results = {}
+    for name, func in timings.items():
+        results[name] = time_call(func, repeat=repeat)
+    return results
+
+
+def _compare(results: list[dict], previous_filepath: Path, tolerance: float) -> bool:
+    # Prints how every timing changed since the compared run. Returns whether
+    # none of them got slower than `tolerance` allows.
+    with open(previous_filepath) as file:
+        previous = {
+            (result["months"], result["rows_per_month"], result["entry_point"]): result
+            for result in json.load(file)
+        }
+    ok = True
+    print(f"\nCompared with {previous_filepath}:")
+    for result in results:
+        key = (result["months"], result["rows_per_month"], result["entry_point"])
+        if key not in previous:
+            continue
+        ratio = result["ms"] / max(previous[key]["ms"], 1e-6)
+        regressed = (
+            ratio > tolerance and result["ms"] - previous[key]["ms"] >= MIN_REGRESSION_MS
+        )
+        ok = ok and not regressed
+        print(
+            f"{key[0]:>4}x{key[1]:<5} {key[2]:<28} {previous[key]['ms']:9.3f} ms -> "
+            f"{result['ms']:9.3f} ms ({ratio:5.2f}x){'  REGRESSION' if regressed else ''}"
+        )
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.suite",
+        description="Time the main entry points of the CLI, the loaders and the \
+                     dashboard callbacks on synthetic histories of several sizes.",
+    )
+    parser.add_argument(
+        "--quick", action="store_true", help="Only run the smallest history."
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Best of this many runs.")
+    parser.add_argument(
+        "--name",
+        default="suite",
+        help="Results are written to benchmarks/results/NAME.json.",
+    )
+    parser.add_argument(
+        "--compare", type=Path, help="A results file of a previous run to compare with."
+    )
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    run = {
+        "commit": _get_commit(),
+        "python": platform.python_version(),
+        "started": datetime.now().isoformat(timespec="seconds"),
+    }
+    results = []
+    for num_months, rows_per_month in QUICK_SCALES if args.quick else SCALES:
+        with temporary_workdir():
+            timings = _time_scale(num_months, rows_per_month, args.repeat)
+        print(f"{num_months} months x {rows_per_month} purchases:")
+        for entry_point, ms in timings.items():
+            print(f"    {entry_point:<28} {ms:9.3f} ms")
+            results.append(
+                {
+                    **run,
+                    "months": num_months,
+                    "rows_per_month": rows_per_month,
+                    "entry_point": entry_point,
+                    "ms": round(ms, 3),
+                }
+            )
+    print(f"Results written to {write_results(args.name, results)}")
+    if args.compare is not None and not _compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import pandas as pd
+
+from core.config import (
+    AMOUNT_COLUMN,
+    CATEGORY_COLUMN,
+    COUNT_COLUMN,
+    CURRENCY_COLUMN,
+    DATE_COLUMN,
+    MONTH_COLUMN,
+)
+
+CUBE_KEYS = [MONTH_COLUMN, DATE_COLUMN, CATEGORY_COLUMN, CURRENCY_COLUMN]
+
+
+def build_aggregate_cube(df: pd.DataFrame) -> pd.DataFrame:
+    # Totals and counts per (month, day, category, currency). The charts only
+    # need these cells, so they never have to group the raw expenses again.
+    df = df.assign(**{MONTH_COLUMN: df[DATE_COLUMN].dt.strftime("%Y-%m")})
+    return (
+        df.groupby(CUBE_KEYS, as_index=False, observed=True)
+        .agg(
+            **{
+                AMOUNT_COLUMN: (AMOUNT_COLUMN, "sum"),
+                COUNT_COLUMN: (AMOUNT_COLUMN, "size"),
+            }
+        )
+        .sort_values([DATE_COLUMN, CATEGORY_COLUMN], ignore_index=True)
+    )
+
+
+def sum_cube(cube: pd.DataFrame, keys: list[str]) -> pd.DataFrame:
+    return cube.groupby(keys, as_index=False, observed=True)[
+        [AMOUNT_COLUMN, COUNT_COLUMN]
+    ].sum()
@@ -0,0 +1,266 @@
+import csv
+import gzip
+import os
+import shutil
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from core.config import (
+    BACKUP_KEEP_DAILY,
+    BACKUP_KEEP_HOURLY,
+    BACKUP_KEEP_LAST,
+    BACKUP_SNAPSHOT_INTERVAL_SECONDS,
+    EXPENSE_COLUMNS,
+    JOURNAL_COLUMNS,
+    JOURNAL_FILENAME,
+)
+from core.files import atomic_write, locked_append, write_rows_to_csv
+from core.instrumentation import timed
+
+if TYPE_CHECKING:
+    from core.storage import CsvStorage
+
+_SNAPSHOT_PREFIX = "snapshot_"
+_SNAPSHOT_SUFFIX = ".csv.gz"
+_SNAPSHOT_TIME_FORMAT = "%Y%m%dT%H%M%S%f"
+# Written once journal lines were dropped: the time of the first line the
+# journal ever had, then the time of the oldest kept snapshot.
+_COMPACTION_FILENAME = "compaction"
+
+
+@dataclass
+class BackupPolicy:
+    snapshot_interval: timedelta = field(
+        default_factory=lambda: timedelta(seconds=BACKUP_SNAPSHOT_INTERVAL_SECONDS)
+    )
+    keep_last: int = BACKUP_KEEP_LAST
+    keep_hourly: int = BACKUP_KEEP_HOURLY
+    keep_daily: int = BACKUP_KEEP_DAILY
+
+
+def format_journal_timestamp(timestamp: datetime) -> str:
+    return timestamp.isoformat(timespec="microseconds")
+
+
+def get_snapshot_filepath(month_backup_path: Path, timestamp: datetime) -> Path:
+    name = f"{_SNAPSHOT_PREFIX}{timestamp:{_SNAPSHOT_TIME_FORMAT}}{_SNAPSHOT_SUFFIX}"
+    return Path(month_backup_path) / name
+
+
+# The snapshots of a month, oldest first.
+def list_snapshots(month_backup_path: Path) -> list[tuple[datetime, Path]]:
+    if not os.path.isdir(month_backup_path):
+        return []
+    snapshots = []
+    for name in os.listdir(month_backup_path):
+        if name.startswith(_SNAPSHOT_PREFIX) and name.endswith(_SNAPSHOT_SUFFIX):
+            timestamp = name[len(_SNAPSHOT_PREFIX) : -len(_SNAPSHOT_SUFFIX)]
+            snapshots.append(
+                (
+                    datetime.strptime(timestamp, _SNAPSHOT_TIME_FORMAT),
+                    Path(month_backup_path) / name,
+                )
+            )
+    return sorted(snapshots)
+
+
+def select_snapshots_to_keep(
+    timestamps: list[datetime], policy: BackupPolicy
+) -> set[datetime]:
+    timestamps = sorted(timestamps, reverse=True)
+    keep = set(timestamps[: policy.keep_last])
+    periods = [
+        (
+            lambda timestamp: timestamp.replace(minute=0, second=0, microsecond=0),
+            policy.keep_hourly,
+        ),
+        (lambda timestamp: timestamp.date(), policy.keep_daily),
+    ]
+    for get_period, num_periods in periods:
+        # Newest snapshot of each period, newest period first.
+        newest = {}
+        for timestamp in timestamps:
+            newest.setdefault(get_period(timestamp), timestamp)
+        keep.update(list(newest.values())[:num_periods])
+    return keep
+
+
+@timed
+def take_snapshot(
+    month_filepath: Path, month_backup_path: Path, timestamp: datetime
+) -> None:
+    snapshot_filepath = get_snapshot_filepath(month_backup_path, timestamp)
+    with (
+        open(month_filepath, "rb") as source,
+        atomic_write(snapshot_filepath, "wb") as target,
+        gzip.GzipFile(filename="", mode="wb", fileobj=target, mtime=0) as compressed,
+    ):
+        shutil.copyfileobj(source, compressed)
+
+
+def _read_compaction(month_backup_path: Path) -> tuple[datetime, datetime] | None:
+    filepath = Path(month_backup_path) / _COMPACTION_FILENAME
+    if not os.path.exists(filepath):
+        return None
+    with open(filepath) as file:
+        first_added, compacted_until = file.read().split()
+    return datetime.fromisoformat(first_added), datetime.fromisoformat(compacted_until)
+
+
+def _compact_journal(month_backup_path: Path, until: datetime) -> None:
+    # Drops the journal lines that the snapshot taken at `until` already holds.
+    journal_filepath = Path(month_backup_path) / JOURNAL_FILENAME
+    compaction = _read_compaction(month_backup_path)
+    first_added = None if compaction is None else compaction[0]
+    if os.path.exists(journal_filepath):
+        with (
+            open(journal_filepath, newline="") as source,
+            atomic_write(journal_filepath, newline="") as target,
+        ):
+            reader = csv.reader(source)
+            writer = csv.writer(target)
+            writer.writerow(next(reader, JOURNAL_COLUMNS))
+            for row in reader:
+                timestamp = datetime.fromisoformat(row[0])
+                first_added = first_added or timestamp
+                if timestamp > until:
+                    writer.writerow(row)
+    first_added = first_added or until
+    with atomic_write(Path(month_backup_path) / _COMPACTION_FILENAME) as file:
+        file.write(
+            f"{format_journal_timestamp(first_added)}\n{format_journal_timestamp(until)}\n"
+        )
+
+
+def apply_retention(month_backup_path: Path, policy: BackupPolicy) -> None:
+    snapshots = list_snapshots(month_backup_path)
+    if not snapshots:
+        return
+    keep = select_snapshots_to_keep([timestamp for timestamp, _ in snapshots], policy)
+    if len(keep) == len(snapshots):
+        return
+    for timestamp, snapshot_filepath in snapshots:
+        if timestamp not in keep:
+            os.remove(snapshot_filepath)
+    oldest = min(keep)
+    compaction = _read_compaction(month_backup_path)
+    if compaction is None or compaction[1] < oldest:
+        _compact_journal(month_backup_path, oldest)
+
+
+@timed
+def save_snapshot_if_due(
+    month_filepath: Path,
+    month_backup_path: Path,
+    timestamp: datetime,
+    policy: BackupPolicy,
+) -> None:
+    # Called with the month file locked, right after the rows added at
+    # `timestamp` were journaled, so the snapshot holds exactly the journal
+    # lines up to `timestamp`. Taking one costs a copy of the month, so it only
+    # happens once per `policy.snapshot_interval`.
+    snapshots = list_snapshots(month_backup_path)
+    if snapshots and timestamp - snapshots[-1][0] < policy.snapshot_interval:
+        return
+    take_snapshot(month_filepath, month_backup_path, timestamp)
+    apply_retention(month_backup_path, policy)
+
+
+def restore_month_rows(month_backup_path: Path, at: datetime) -> list[list[str]] | None:
+    # The rows of the month at `at`: the newest snapshot taken until then plus
+    # the journal lines added after it. `None` when the month has no backup.
+    month_backup_path = Path(month_backup_path)
+    journal_filepath = month_backup_path / JOURNAL_FILENAME
+    snapshots = list_snapshots(month_backup_path)
+    if not snapshots and not os.path.exists(journal_filepath):
+        return None
+
+    rows = []
+    since = None
+    earlier_snapshots = [snapshot for snapshot in snapshots if snapshot[0] <= at]
+    if earlier_snapshots:
+        since, snapshot_filepath = earlier_snapshots[-1]
+        with gzip.open(snapshot_filepath, "rt", newline="") as file:
+            reader = csv.reader(file)
+            next(reader, None)
+            rows.extend(reader)
+    else:
+        compaction = _read_compaction(month_backup_path)
+        if compaction is not None:
+            first_added, compacted_until = compaction
+            if at < first_added:
+                return rows
+            raise ValueError(
+                f"The backups of {month_backup_path.name} older than "
+                f"{compacted_until:%Y-%m-%d %H:%M:%S} were removed by the retention "
+                f"policy."
+            )
+
+    if os.path.exists(journal_filepath):
+        with open(journal_filepath, newline="") as file:
+            reader = csv.reader(file)
+            next(reader, None)
+            for row in reader:
+                timestamp = datetime.fromisoformat(row[0])
+                if timestamp > at:
+                    break
+                if since is None or timestamp > since:
+                    rows.append(row[1:])
+    return rows
+
+
+def write_month_file(filepath: Path, rows: list[list[str]]) -> None:
+    with atomic_write(filepath, newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(EXPENSE_COLUMNS)
+        writer.writerows(rows)
+
+
+def restore_csv_storage(
+    storage: "CsvStorage",
+    at: datetime,
+    months: list[str] | None = None,
+    output_path: Path | None = None,
+    policy: BackupPolicy | None = None,
+) -> dict[str, int | None]:
+    # Rebuilds every month (or `months`) as it was at `at`, into new month files
+    # in `output_path`, or over the current ones when it is `None`. Returns the
+    # number of rows of each month, `None` for the months without a backup,
+    # which are left alone.
+    policy = policy or BackupPolicy()
+    if months is None:
+        backed_up_months = (
+            os.listdir(storage.backup_path) if os.path.isdir(storage.backup_path) else []
+        )
+        months = sorted(set(storage.get_months()) | set(backed_up_months))
+    rows_by_month = {
+        month: restore_month_rows(storage.backup_path / month, at) for month in months
+    }
+
+    num_rows = {}
+    for month, rows in rows_by_month.items():
+        num_rows[month] = None if rows is None else len(rows)
+        if rows is None:
+            continue
+        if output_path is not None:
+            if rows:
+                write_month_file(
+                    Path(output_path) / storage.get_filepath(month).name, rows
+                )
+            continue
+        filepath = storage.get_filepath(month)
+        month_backup_path = storage.backup_path / month
+        # Rewritten in place under the lock that adds take, so no add is lost to
+        # a replaced file. The current rows are snapshotted first, so the
+        # restore can itself be undone, and the restored ones after.
+        with locked_append(filepath) as file:
+            if file.tell() > 0:
+                take_snapshot(filepath, month_backup_path, datetime.now())
+            file.truncate(0)
+            file.seek(0)
+            write_rows_to_csv(file, rows, EXPENSE_COLUMNS)
+            take_snapshot(filepath, month_backup_path, datetime.now())
+            apply_retention(month_backup_path, policy)
+    return num_rows
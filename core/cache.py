@@ -0,0 +1,65 @@
+import os
+from collections.abc import Callable
+from pathlib import Path
+
+import pandas as pd
+
+from core.config import CACHE_DIRECTORY_NAME, USE_COLUMNAR_CACHE
+from core.files import atomic_write
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+_SOURCE_KEY = b"source_csv"
+# Part of the key of every sidecar, so sidecars written before a change to the
+# dtypes the CSV files are parsed to are built again.
+_SCHEMA_VERSION = 2
+
+
+def is_cache_enabled() -> bool:
+    return USE_COLUMNAR_CACHE and pq is not None
+
+
+def get_sidecar_filepath(csv_filepath: Path) -> Path:
+    csv_filepath = Path(csv_filepath)
+    return csv_filepath.parent / CACHE_DIRECTORY_NAME / f"{csv_filepath.stem}.parquet"
+
+
+def _get_source_key(csv_filepath: Path) -> bytes:
+    # The sidecar records the mtime and size of the CSV it was built from, so
+    # any change to the CSV, even within the same mtime tick, invalidates it.
+    stat = os.stat(csv_filepath)
+    return f"{_SCHEMA_VERSION}:{stat.st_mtime_ns}:{stat.st_size}".encode()
+
+
+def _read_sidecar(csv_filepath: Path) -> pd.DataFrame | None:
+    sidecar_filepath = get_sidecar_filepath(csv_filepath)
+    if not os.path.exists(sidecar_filepath):
+        return None
+    table = pq.read_table(sidecar_filepath)
+    metadata = table.schema.metadata or {}
+    if metadata.get(_SOURCE_KEY) != _get_source_key(csv_filepath):
+        return None
+    return table.to_pandas()
+
+
+def _write_sidecar(csv_filepath: Path, df: pd.DataFrame, source_key: bytes) -> None:
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = {**(table.schema.metadata or {}), _SOURCE_KEY: source_key}
+    with atomic_write(get_sidecar_filepath(csv_filepath), "wb") as file:
+        pq.write_table(table.replace_schema_metadata(metadata), file)
+
+
+def read_through_sidecar(
+    csv_filepath: Path, parse_csv: Callable[[Path], pd.DataFrame]
+) -> pd.DataFrame:
+    df = _read_sidecar(csv_filepath)
+    if df is None:
+        source_key = _get_source_key(csv_filepath)
+        df = parse_csv(csv_filepath)
+        _write_sidecar(csv_filepath, df, source_key)
+    return df
@@ -22,26 +22,185 @@ SUPPORTED_CURRENCIES = [
 CURRENT_DIRECTORY_NAME = "current"
 BACKUP_DIRECTORY_NAME = "backup"
 DEV_DIRECTORY_NAME = "dev"
+CACHE_DIRECTORY_NAME = ".cache"
+
+# Where expenses are stored: "csv" keeps one CSV file per month, "sqlite" keeps
+# them all in a SQLite database next to the month files.
+STORAGE_BACKEND = "csv"
+SQLITE_FILENAME = "expenses.db"
+# How long a writer waits for another one to finish before giving up.
+SQLITE_BUSY_TIMEOUT_SECONDS = 30.0
+
+# Keeps a Parquet copy of every month file next to it (requires `pyarrow`).
+# The CSV files remain the source of truth.
+USE_COLUMNAR_CACHE = True
 
 DEFAULT_CURRENCY = "BRL"
 DEFAULT_DESCRIPTION = "NO DESCRIPTION"
 DEFAULT_CATEGORY = "OTHERS"
+# Money put aside rather than spent, so it does not reduce the amount left.
+SAVINGS_CATEGORY = "SAVINGS"
 
 INCOME_FILENAME = ".income.json"
 
+# Exchange rates, one `Date,Currency,Rate` line per rate. A rate is the value of
+# one unit of `Currency` in `FX_BASE_CURRENCY` from `Date` (`YYYY-MM` or
+# `YYYY-MM-DD`) on.
+FX_RATES_FILENAME = ".fx_rates.csv"
+FX_BASE_CURRENCY = DEFAULT_CURRENCY
+# The dashboard's "ALL" currency option converts every expense to this one.
+REPORTING_CURRENCY = DEFAULT_CURRENCY
+ALL_CURRENCIES = "ALL"
+
+# How month files are loaded when many have to be parsed at once, such as when
+# the dashboard starts: on a "thread" pool, a "process" pool or "serial"ly.
+# `None` workers means one per CPU.
+LOADER_POOL = "thread"
+LOADER_MAX_WORKERS = None
+
+# Minimum time between two checks of the month files for changes by the
+# dashboard's expense store.
+EXPENSE_STORE_REFRESH_SECONDS = 1.0
+
+# How often the dashboard checks for new expenses.
+LIVE_RELOAD_INTERVAL_MS = 5000
+
+# Months the forecast page projects by default, and at most.
+FORECAST_MONTHS = 12
+FORECAST_MAX_MONTHS = 36
+
+# The search index of the expense names and descriptions is saved to this file
+# of the cache folder, and the search page shows this many of the most recent
+# matches.
+SEARCH_INDEX_FILENAME = "search_index.pickle"
+SEARCH_MAX_RESULTS = 50
+
+# Bounds of the dashboard's cache of computed figures and table pages.
+FIGURE_CACHE_MAX_ENTRIES = 256
+FIGURE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Address and worker processes of the production server (`gunicorn.conf.py`).
+# `None` workers means one per CPU. Each worker keeps its own figure cache.
+WSGI_BIND = "127.0.0.1:8050"
+WSGI_WORKERS = None
+WSGI_TIMEOUT_SECONDS = 60
+
+# `main.py serve` listens on this socket, next to the month files, and
+# `main.py` hands its expenses to it when it is running.
+DAEMON_SOCKET_FILENAME = ".expense.sock"
+# How long a client waits for the daemon to answer.
+DAEMON_TIMEOUT_SECONDS = 30.0
+# Longest request line the daemon reads. Clients send at most
+# `DAEMON_MAX_REQUEST_ROWS` expenses per request, far below it, and send larger
+# batches in several requests.
+DAEMON_MAX_REQUEST_BYTES = 64 * 1024 * 1024
+DAEMON_MAX_REQUEST_ROWS = 500
+
 NAME_COLUMN = "Name"
 CATEGORY_COLUMN = "Category"
 AMOUNT_COLUMN = "Amount"
 CURRENCY_COLUMN = "Currency"
 DESCRIPTION_COLUMN = "Description"
 DATE_COLUMN = "Date"
+INSTALLMENTS_COLUMN = "Installments"
+TIMESTAMP_COLUMN = "Timestamp"
+MONTH_COLUMN = "Month"
+COUNT_COLUMN = "Count"
+RATE_COLUMN = "Rate"
+INCOME_COLUMN = "Income"
+COMMITTED_COLUMN = "Committed"
+AMOUNT_LEFT_COLUMN = "Amount left"
+CUMULATIVE_LEFT_COLUMN = "Cumulative left"
+
+EXPENSE_COLUMNS = [
+    NAME_COLUMN,
+    CATEGORY_COLUMN,
+    AMOUNT_COLUMN,
+    CURRENCY_COLUMN,
+    DESCRIPTION_COLUMN,
+    DATE_COLUMN,
+]
+JOURNAL_COLUMNS = [TIMESTAMP_COLUMN, *EXPENSE_COLUMNS]
+
+JOURNAL_FILENAME = "journal.csv"
+
+# Besides the journal, the backup folder of every month keeps gzip'd snapshots
+# of the month file, at most one per interval. The newest `BACKUP_KEEP_LAST`
+# snapshots are kept, plus the newest one of each of the last
+# `BACKUP_KEEP_HOURLY` hours and `BACKUP_KEEP_DAILY` days. Journal lines older
+# than the oldest kept snapshot are dropped, so that is as far back as
+# `main.py restore` can go.
+BACKUP_SNAPSHOT_INTERVAL_SECONDS = 3600
+BACKUP_KEEP_LAST = 5
+BACKUP_KEEP_HOURLY = 24
+BACKUP_KEEP_DAILY = 30
+
+# `main.py import` reads statements this many rows at a time, so memory stays
+# bounded however long they are.
+IMPORT_CHUNK_ROWS = 5_000
+# Statement columns are found under any of these names, case ignored, unless
+# given with `--column`.
+IMPORT_COLUMN_NAMES = {
+    NAME_COLUMN: [
+        "name",
+        "description",
+        "descrição",
+        "descricao",
+        "memo",
+        "payee",
+        "title",
+        "título",
+        "titulo",
+        "estabelecimento",
+        "lançamento",
+        "lancamento",
+        "histórico",
+        "historico",
+    ],
+    AMOUNT_COLUMN: ["amount", "valor", "value", "quantia"],
+    DATE_COLUMN: ["date", "data", "posted", "transaction date", "data da compra"],
+    CATEGORY_COLUMN: ["category", "categoria"],
+    CURRENCY_COLUMN: ["currency", "moeda"],
+}
+# Tried in order on every date of a statement.
+IMPORT_DATE_FORMATS = ["%Y-%m-%d", "%d/%m/%Y", "%d/%m/%y", "%Y%m%d", "%d.%m.%Y"]
+# An imported expense goes to the category of the first pattern found in its
+# name, case ignored, or to `DEFAULT_CATEGORY`. `main.py import --rules` adds
+# rules of its own before these.
+IMPORT_CATEGORY_RULES = [
+    (
+        r"ifood|rappi|restaurant|padaria|bakery|mercado|market|caf[eé]|coffee|burger|pizza",
+        "FOOD",
+    ),
+    (r"farm[aá]cia|drogaria|pharmacy|hospital|cl[ií]nica|clinic|laborat", "HEALTH"),
+    (r"academia|gym|smart ?fit|decathlon|centauro", "SPORTS"),
+    (r"udemy|coursera|alura|livraria|bookstore|escola|school|faculdade", "STUDY"),
+    (r"netflix|spotify|disney|hbo|cinema|steam|ingresso|ticket", "LEISURE"),
+    (r"renner|riachuelo|zara|c&a|hering|nike|adidas", "CLOTHES"),
+]
+# How many expenses of every month have each date, amount and name, kept in
+# the cache folder so importing an overlapping statement again adds nothing.
+IMPORT_HASHES_DIRECTORY_NAME = "import_hashes"
+# Held by an import while it runs, in the cache folder.
+IMPORT_LOCK_FILENAME = "import.lock"
+
+# Set this environment variable to "1" to time the hot paths of `main.py` and
+# of the dashboard, shown by `main.py --profile` and the dashboard's
+# /diagnostics page, or to "cprofile" to also write a cProfile dump of every
+# `main.py` run and dashboard request to `PATH_TO_PROFILES`.
+PROFILE_ENV_VAR = "MONKEY_PROFILE"
+PROFILE_DIRECTORY_NAME = "profiles"
 
 
 PATH_TO_EXPENSE_FILES = Path("./expense_files")
 PATH_TO_EXPENSE_FILES_CURRENT = PATH_TO_EXPENSE_FILES / CURRENT_DIRECTORY_NAME
-PATH_TO_EXPENSE_FILES_CURRENT_BACKUP = PATH_TO_EXPENSE_FILES_CURRENT / BACKUP_DIRECTORY_NAME
+PATH_TO_EXPENSE_FILES_CURRENT_BACKUP = (
+    PATH_TO_EXPENSE_FILES_CURRENT / BACKUP_DIRECTORY_NAME
+)
 PATH_TO_EXPENSE_FILES_DEV = PATH_TO_EXPENSE_FILES / DEV_DIRECTORY_NAME
 PATH_TO_EXPENSE_FILES_DEV_BACKUP = PATH_TO_EXPENSE_FILES_DEV / BACKUP_DIRECTORY_NAME
+PATH_TO_PROFILES = PATH_TO_EXPENSE_FILES / PROFILE_DIRECTORY_NAME
 
 PATH_TO_INCOME = Path("./")
 PATH_TO_INCOME_FILE = PATH_TO_INCOME / INCOME_FILENAME
+PATH_TO_FX_RATES_FILE = PATH_TO_INCOME / FX_RATES_FILENAME
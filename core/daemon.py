@@ -0,0 +1,209 @@
+import asyncio
+import json
+import os
+import signal
+import socket
+from collections import defaultdict
+from pathlib import Path
+
+from core.config import DAEMON_MAX_REQUEST_BYTES, EXPENSE_COLUMNS
+from core.daemon_client import get_socket_filepath
+from core.expense import format_summary, get_month_incomes
+from core.storage import ExpenseStorage, get_storage
+from core.store import create_expense_store
+
+
+def _validate_rows_by_month(rows_by_month) -> None:
+    # Checked before a request joins a batch, so a malformed one only fails
+    # its own client instead of every add written with it.
+    if not isinstance(rows_by_month, dict) or not rows_by_month:
+        raise TypeError("rows_by_month must map months to rows.")
+    for month, rows in rows_by_month.items():
+        if not isinstance(month, str) or not isinstance(rows, list):
+            raise TypeError(f"Bad rows for month {month!r}.")
+        for row in rows:
+            if not isinstance(row, list) or len(row) != len(EXPENSE_COLUMNS):
+                raise ValueError(
+                    f"Rows must have the {len(EXPENSE_COLUMNS)} expense columns, "
+                    f"got {row!r}."
+                )
+
+
+async def _skip_line(reader: asyncio.StreamReader) -> bool:
+    # Drops the rest of a request longer than the limit, so the connection goes
+    # on with the next one. False when the client closed it first.
+    while True:
+        try:
+            await reader.readuntil(b"\n")
+            return True
+        except asyncio.LimitOverrunError as error:
+            consumed = error.consumed
+        except asyncio.IncompleteReadError:
+            return False
+        await reader.read(consumed)
+
+
+class ExpenseDaemon:
+    # Long-running process behind `main.py serve`. It keeps the month frames,
+    # their aggregates and the income index in memory and answers requests of
+    # one JSON object per line on a Unix socket:
+    #
+    #   {"command": "add", "rows_by_month": {...}, "quiet": false}
+    #   {"command": "summary", "months": ["YYYY-MM", ...]}
+    #   {"command": "stats"}
+    #
+    # Adds are queued and written by a single task. Every add that arrives while
+    # a batch is being written joins the next batch, so under load many adds
+    # share one lock and fsync per month file (group commit).
+    def __init__(self, storage: ExpenseStorage, socket_filepath: Path):
+        self.storage = storage
+        self.store = create_expense_store(storage)
+        self.socket_filepath = Path(socket_filepath)
+        self.num_adds = 0
+        self.num_commits = 0
+        self._queue = None
+        self._stale = False
+
+    def _summarize(self, months: list[str]) -> dict[str, str]:
+        # The store is only brought up to date when a summary needs it, so quiet
+        # adds cost no more than the write itself.
+        if self._stale:
+            self._stale = False
+            self.store.refresh()
+        incomes = get_month_incomes(months)
+        return {
+            month: format_summary(self.store.get_month(month), incomes[month])
+            for month in months
+        }
+
+    def _commit(self, requests: list[dict]) -> list[dict]:
+        rows_by_month = defaultdict(list)
+        for request in requests:
+            for month, rows in request["rows_by_month"].items():
+                rows_by_month[month].extend(rows)
+        locations = self.storage.append_rows(rows_by_month)
+        self._stale = True
+        self.num_adds += len(requests)
+        self.num_commits += 1
+        responses = []
+        for request in requests:
+            months = sorted(request["rows_by_month"])
+            response = {"locations": {month: locations[month] for month in months}}
+            # The rows are written by now, so a summary that fails must not
+            # read as a failed add, or the client would add them again.
+            try:
+                response["summaries"] = (
+                    {} if request.get("quiet") else self._summarize(months)
+                )
+            except Exception as error:  # noqa: BLE001
+                response["summaries"] = {}
+                response["summary_error"] = str(error)
+            responses.append(response)
+        return responses
+
+    async def _commit_loop(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            responses = [{"error": "The daemon stopped before writing."}] * len(batch)
+            try:
+                responses = await asyncio.to_thread(
+                    self._commit, [request for request, _ in batch]
+                )
+            except Exception as error:  # noqa: BLE001
+                responses = [{"error": str(error)}] * len(batch)
+            finally:
+                # Every client gets an answer and `_serve` can finish draining
+                # the queue, whatever went wrong.
+                for (_, future), response in zip(batch, responses):
+                    if not future.done():
+                        future.set_result(response)
+                    self._queue.task_done()
+
+    async def _handle_request(self, request: dict) -> dict:
+        command = request.get("command")
+        if command == "add":
+            _validate_rows_by_month(request.get("rows_by_month"))
+            future = asyncio.get_running_loop().create_future()
+            await self._queue.put((request, future))
+            return await future
+        if command == "summary":
+            summaries = await asyncio.to_thread(self._summarize, request["months"])
+            return {"summaries": summaries}
+        if command == "stats":
+            return {"adds": self.num_adds, "commits": self.num_commits}
+        return {"error": f"Unknown command {command!r}."}
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                try:
+                    line = await reader.readuntil(b"\n")
+                except asyncio.IncompleteReadError:
+                    break
+                except asyncio.LimitOverrunError:
+                    if not await _skip_line(reader):
+                        break
+                    response = {
+                        "error": f"Requests are limited to {DAEMON_MAX_REQUEST_BYTES} "
+                        "bytes; send fewer rows per request."
+                    }
+                else:
+                    try:
+                        response = await self._handle_request(json.loads(line))
+                    except (OSError, KeyError, TypeError, ValueError) as error:
+                        response = {"error": str(error)}
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def _serve(self) -> None:
+        self._queue = asyncio.Queue()
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signal_number, stop.set)
+        server = await asyncio.start_unix_server(
+            self._handle_connection,
+            path=str(self.socket_filepath),
+            limit=DAEMON_MAX_REQUEST_BYTES,
+        )
+        commit_task = asyncio.create_task(self._commit_loop())
+        print(f"==> Listening on {self.socket_filepath}")
+        await stop.wait()
+        # Stop accepting requests, but write every add that was already queued.
+        server.close()
+        await self._queue.join()
+        commit_task.cancel()
+
+    def _remove_stale_socket(self) -> None:
+        if not os.path.exists(self.socket_filepath):
+            return
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            client.connect(str(self.socket_filepath))
+        except ConnectionRefusedError:
+            os.remove(self.socket_filepath)
+            return
+        finally:
+            client.close()
+        raise RuntimeError(f"A daemon is already listening on {self.socket_filepath}.")
+
+    def run(self) -> None:
+        self._remove_stale_socket()
+        os.makedirs(self.socket_filepath.parent, exist_ok=True)
+        # Load every month before accepting requests.
+        self.store.get_version()
+        try:
+            asyncio.run(self._serve())
+        finally:
+            if os.path.exists(self.socket_filepath):
+                os.remove(self.socket_filepath)
+
+
+def serve() -> None:
+    ExpenseDaemon(get_storage(), get_socket_filepath()).run()
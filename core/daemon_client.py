@@ -0,0 +1,114 @@
+import json
+import os
+import socket
+from pathlib import Path
+
+from core.config import (
+    DAEMON_MAX_REQUEST_ROWS,
+    DAEMON_SOCKET_FILENAME,
+    DAEMON_TIMEOUT_SECONDS,
+    DEVELOPING,
+    PATH_TO_EXPENSE_FILES_CURRENT,
+    PATH_TO_EXPENSE_FILES_DEV,
+)
+from core.instrumentation import timed
+
+
+def get_socket_filepath() -> Path:
+    folder_path = (
+        PATH_TO_EXPENSE_FILES_DEV if DEVELOPING else PATH_TO_EXPENSE_FILES_CURRENT
+    )
+    return folder_path / DAEMON_SOCKET_FILENAME
+
+
+@timed
+def send_to_daemon(request: dict) -> dict | None:
+    # Sends one JSON request to `main.py serve` and returns its answer, or None
+    # when no daemon is listening, so the caller can do the work itself. Only
+    # the standard library is used, so talking to the daemon stays cheap.
+    filepath = get_socket_filepath()
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(filepath):
+        return None
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(DAEMON_TIMEOUT_SECONDS)
+    try:
+        try:
+            client.connect(str(filepath))
+        except (ConnectionRefusedError, FileNotFoundError):
+            # A socket left behind by a daemon that is no longer running.
+            return None
+        client.sendall(json.dumps(request).encode() + b"\n")
+        with client.makefile("rb") as file:
+            line = file.readline()
+    finally:
+        client.close()
+    if not line:
+        raise ConnectionError(f"The daemon at {filepath} closed the connection.")
+    response = json.loads(line)
+    if "error" in response:
+        raise RuntimeError(response["error"])
+    return response
+
+
+def split_rows_by_month(
+    rows_by_month: dict[str, list[list]], max_rows: int
+) -> list[dict[str, list[list]]]:
+    # Batches of at most `max_rows` rows, in the order of `rows_by_month`.
+    batches = []
+    num_rows = max_rows
+    for month, rows in rows_by_month.items():
+        start = 0
+        while start < len(rows):
+            if num_rows == max_rows:
+                batches.append({})
+                num_rows = 0
+            chunk = rows[start : start + max_rows - num_rows]
+            batches[-1].setdefault(month, []).extend(chunk)
+            num_rows += len(chunk)
+            start += len(chunk)
+    return batches
+
+
+def _send_add(
+    rows_by_month: dict[str, list[list]], quiet: bool, is_first: bool
+) -> dict | None:
+    response = send_to_daemon(
+        {"command": "add", "rows_by_month": rows_by_month, "quiet": quiet}
+    )
+    if response is None and not is_first:
+        raise ConnectionError("The daemon stopped before every expense was added.")
+    return response
+
+
+def add_to_daemon(rows_by_month: dict[str, list[list]], quiet: bool) -> dict | None:
+    # Adds the rows through `main.py serve` in requests of at most
+    # `DAEMON_MAX_REQUEST_ROWS` rows, so a large file stays far below the line
+    # length the daemon reads. With several requests, the summaries of every
+    # month are asked for once all of them are written. Returns the answer
+    # with the locations of every month, or None when no daemon is listening.
+    if not rows_by_month:
+        return {"locations": {}, "summaries": {}}
+    *batches, last = split_rows_by_month(rows_by_month, DAEMON_MAX_REQUEST_ROWS)
+    locations = {}
+    for index, batch in enumerate(batches):
+        response = _send_add(batch, True, index == 0)
+        if response is None:
+            return None
+        locations.update(response["locations"])
+    response = _send_add(last, quiet or bool(batches), not batches)
+    if response is None:
+        return None
+    response["locations"] = {**locations, **response["locations"]}
+    if batches and not quiet:
+        # The rows are written by now, so a summary that fails is reported as
+        # such, not as a failed add.
+        try:
+            summary = send_to_daemon(
+                {"command": "summary", "months": sorted(rows_by_month)}
+            )
+            if summary is None:
+                raise ConnectionError("The daemon stopped before the summary.")
+            response["summaries"] = summary["summaries"]
+        except (OSError, RuntimeError) as error:
+            response["summary_error"] = str(error)
+    return response
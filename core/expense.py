@@ -1,132 +1,210 @@
-import os
+import sys
+from collections import defaultdict
 from dataclasses import dataclass, field
 from datetime import datetime
-from pathlib import Path
-
-import pandas as pd
-from dateutil.relativedelta import relativedelta
+from typing import TYPE_CHECKING
 
 from core.config import (
     AMOUNT_COLUMN,
-    CATEGORY_COLUMN,
     CURRENCY_COLUMN,
-    DATE_COLUMN,
-    DESCRIPTION_COLUMN,
-    DEVELOPING,
-    NAME_COLUMN,
-    PATH_TO_EXPENSE_FILES,
-    PATH_TO_EXPENSE_FILES_CURRENT_BACKUP,
-    PATH_TO_EXPENSE_FILES_DEV_BACKUP,
     SUPPORTED_CURRENCIES,
 )
-from core.utils import get_income
+from core.daemon_client import add_to_daemon
+from core.income import get_incomes
+from core.instrumentation import timed
+from core.storage import get_storage
+
+# Planning installments with numpy saves a few microseconds per expense, which
+# pays for importing it (about 35 ms) from about this many expenses on.
+_VECTORIZE_MIN_EXPENSES = 1_000
+
+# Only used in annotations, so that adding an expense does not import pandas.
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 @dataclass
 class Expense:
     name: str
-    amount: str
-    installments: str
+    amount: float
+    installments: int
     category: str
     description: str
     currency: str
-    date: list[datetime] = field(init=False, default_factory=lambda: [datetime.now()])
-    new_row_expense_df: pd.DataFrame = field(init=False)
-    expense_df: pd.DataFrame = field(init=False)
-    installment_count: int = field(init=False, default=0)
+    date: datetime = field(default_factory=datetime.now)
 
     def __post_init__(self):
-        self.new_row_expense_df = pd.DataFrame(
-            {
-                NAME_COLUMN: [self.name],
-                CATEGORY_COLUMN: [self.category],
-                AMOUNT_COLUMN: [self.amount / self.installments],
-                CURRENCY_COLUMN: [self.currency],
-                DESCRIPTION_COLUMN: [self.description],
-                DATE_COLUMN: [self.date[self.installment_count].strftime("%Y-%m-%d")],
-            }
-        )
-
-    def _calculate_amount_left(self):
-        for currency in SUPPORTED_CURRENCIES:
-            date_curr = self.date[self.installment_count].strftime("%Y-%m")
-            income = get_income(date=date_curr, currency=currency)
-            if income == 0:
-                continue
-            total_amount_expended = (
-                self.expense_df.loc[
-                    self.expense_df[CURRENCY_COLUMN] == currency, AMOUNT_COLUMN
-                ]
-                .astype(float)
-                .sum()
+        if self.installments != int(self.installments) or self.installments < 1:
+            raise ValueError(
+                f"The number of installments must be a positive whole number, not "
+                f"{self.installments}."
             )
-            amount_left = income - total_amount_expended
-            print(f"\n==> You have {currency} {amount_left:.2f} left.")
-
-    def _update_date_for_installments(self):
-        new_date = datetime.now() + relativedelta(months=self.installment_count)
-        new_date = new_date.replace(day=1, hour=0, minute=0, second=0)
-        self.date.append(new_date)
-        new_date_formated = self.date[self.installment_count].strftime("%Y-%m-%d")
-        self.new_row_expense_df[DATE_COLUMN] = new_date_formated
-
-    def _save_expense_df(self, expense_filepath: Path) -> None:
-        os.makedirs(os.path.dirname(expense_filepath), exist_ok=True)
-        if not os.path.exists(expense_filepath):
-            self.expense_df = self.new_row_expense_df
-        else:
-            old_expense_df = pd.read_csv(expense_filepath)
-            self.expense_df = pd.concat(
-                [old_expense_df, self.new_row_expense_df], ignore_index=True
-            )
-        self.expense_df.to_csv(expense_filepath, index=False)
-
-    def _save_backup(self, backup_directory: str) -> None:
-        os.makedirs(backup_directory, exist_ok=True)
-        backup_expense_filename = (
-            f"backup_{datetime.now().strftime('%Y-%m-%d_%H:%M:%S')}.csv"
-        )
-        backup_expense_filepath = backup_directory / backup_expense_filename
-        self.expense_df.to_csv(backup_expense_filepath, index=False)
-
-    def _print_info(self, expense_filepath: Path) -> None:
-        print(
-            "\n=================================================================================================================="
+        self.installments = int(self.installments)
+
+    def installment_dates(self) -> list[datetime]:
+        # The first installment is due on the purchase date, the following ones
+        # on the first day of each subsequent month.
+        dates = [self.date]
+        for installment in range(1, self.installments):
+            month_index = self.date.month - 1 + installment
+            year = self.date.year + month_index // 12
+            dates.append(datetime(year, month_index % 12 + 1, 1))
+        return dates
+
+    def installment_rows(self) -> list[list]:
+        cents = split_cents(to_cents(self.amount), self.installments)
+        return [
+            [
+                self.name,
+                self.category,
+                installment_cents / 100,
+                self.currency,
+                self.description,
+                date.strftime("%Y-%m-%d"),
+            ]
+            for installment_cents, date in zip(cents, self.installment_dates())
+        ]
+
+    def update_expense(self, quiet: bool = False) -> dict[str, str]:
+        return add_expenses([self], quiet)
+
+
+def to_cents(amount: float) -> int:
+    return round(amount * 100)
+
+
+def split_cents(cents: int, installments: int) -> list[int]:
+    # Installments that differ by at most one cent and add up to exactly
+    # `cents`, the first ones taking the remainder.
+    base, remainder = divmod(cents, installments)
+    return [base + 1] * remainder + [base] * (installments - remainder)
+
+
+def _plan_installments_vectorized(expenses: list[Expense]) -> dict[str, list[list]]:
+    import numpy as np
+
+    counts = np.array([expense.installments for expense in expenses], dtype=np.int64)
+    cents = np.array([to_cents(expense.amount) for expense in expenses], dtype=np.int64)
+    days = np.array([expense.date.date() for expense in expenses], dtype="datetime64[D]")
+    # One element per installment: its expense and how many months it comes
+    # after the purchase.
+    expense_indexes = np.repeat(np.arange(len(expenses)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    months = days.astype("datetime64[M]")[expense_indexes] + offsets
+    dates = np.where(
+        offsets == 0, days[expense_indexes], months.astype("datetime64[D]")
+    ).astype(str)
+    base, remainder = np.divmod(cents, counts)
+    amounts = (base[expense_indexes] + (offsets < remainder[expense_indexes])) / 100
+
+    rows_by_month = defaultdict(list)
+    for index, amount, date in zip(
+        expense_indexes.tolist(), amounts.tolist(), dates.tolist()
+    ):
+        expense = expenses[index]
+        rows_by_month[date[:7]].append(
+            [
+                expense.name,
+                expense.category,
+                amount,
+                expense.currency,
+                expense.description,
+                date,
+            ]
         )
-        print(f"==> Expense added successfully to {expense_filepath}")
-        print(self.expense_df)
-        self._calculate_amount_left()
-        print(
-            "==================================================================================================================\n"
-        )
-
-    def update_expense(self) -> pd.DataFrame:
-        backup_subdir = self.date[self.installment_count].strftime("%Y-%m")
-        if DEVELOPING is False:
-            expense_filename = (
-                f"expense_{self.date[self.installment_count].strftime('%Y-%m')}.csv"
+    return rows_by_month
+
+
+@timed
+def plan_installments(expenses: list[Expense]) -> dict[str, list[list]]:
+    # The rows of every installment of `expenses`, grouped by month. Large
+    # batches, such as card statements, are planned with numpy month
+    # arithmetic, and so is any batch once numpy is loaded; otherwise expenses
+    # are planned one by one, so that adding a single expense does not import
+    # numpy. Both give the same rows.
+    if len(expenses) >= _VECTORIZE_MIN_EXPENSES or "numpy" in sys.modules:
+        return _plan_installments_vectorized(expenses)
+    rows_by_month = defaultdict(list)
+    for expense in expenses:
+        for row in expense.installment_rows():
+            rows_by_month[row[-1][:7]].append(row)
+    return rows_by_month
+
+
+def _print_added(location: str, num_rows: int) -> None:
+    if num_rows == 1:
+        print(f"==> Expense added successfully to {location}")
+    else:
+        print(f"==> {num_rows} expenses added successfully to {location}")
+
+
+def get_month_incomes(months: list[str]) -> dict[str, dict[str, int]]:
+    incomes = get_incomes(months, SUPPORTED_CURRENCIES)
+    return {
+        month: {currency: incomes[(month, currency)] for currency in SUPPORTED_CURRENCIES}
+        for month in months
+    }
+
+
+@timed
+def format_summary(expense_df: "pd.DataFrame", incomes: dict[str, int]) -> str:
+    # The month's expenses followed by the amount left of each currency.
+    lines = [str(expense_df)]
+    amounts_expended = expense_df.groupby(CURRENCY_COLUMN)[AMOUNT_COLUMN].sum()
+    for currency, income in incomes.items():
+        if income == 0:
+            continue
+        amount_left = income - amounts_expended.get(currency, 0)
+        lines.append(f"\n==> You have {currency} {amount_left:.2f} left.")
+    return "\n".join(lines)
+
+
+def _print_info(location: str, summary: str, num_rows: int) -> None:
+    print(
+        "\n=================================================================================================================="
+    )
+    _print_added(location, num_rows)
+    print(summary)
+    print(
+        "==================================================================================================================\n"
+    )
+
+
+@timed
+def add_expenses(expenses: list[Expense], quiet: bool = False) -> dict[str, str]:
+    # Expands every installment up front and groups the rows by month, so each
+    # month is written once however many expenses or installments land in it,
+    # and the income file is read once for the whole batch. With `quiet` only
+    # the written locations are printed, so neither the month nor pandas is
+    # loaded. When `main.py serve` is running, the daemon writes the rows and
+    # builds the summaries from the months it keeps in memory. Returns where
+    # the rows of every month were written.
+    rows_by_month = plan_installments(expenses)
+    months = sorted(rows_by_month)
+
+    response = add_to_daemon(rows_by_month, quiet)
+    if response is not None:
+        locations, summaries = response["locations"], response["summaries"]
+        if "summary_error" in response:
+            # The rows were written; only the summary is missing.
+            print(
+                f"==> The daemon could not build the summary: {response['summary_error']}"
             )
-            expense_subdir = "current"
-            backup_directory = PATH_TO_EXPENSE_FILES_CURRENT_BACKUP / backup_subdir
+            quiet = True
+    else:
+        storage = get_storage()
+        locations = storage.append_rows(rows_by_month)
+        summaries = {}
+        if not quiet:
+            incomes = get_month_incomes(months)
+            for month in months:
+                summaries[month] = format_summary(
+                    storage.read_month(month), incomes[month]
+                )
+
+    for month in months:
+        if quiet:
+            _print_added(locations[month], len(rows_by_month[month]))
         else:
-            expense_filename = (
-                f"dev_{self.date[self.installment_count].strftime('%Y-%m')}.csv"
-            )
-            expense_subdir = "dev"
-            backup_directory = PATH_TO_EXPENSE_FILES_DEV_BACKUP / backup_subdir
-
-        expense_filepath = PATH_TO_EXPENSE_FILES / expense_subdir / expense_filename
-
-        self._save_expense_df(expense_filepath)
-
-        self._save_backup(backup_directory)
-
-        self._print_info(expense_filepath)
-
-        # Recursively update installments
-        if self.installment_count < self.installments - 1:
-            self.installment_count += 1
-            self._update_date_for_installments()
-            self.update_expense()
-
-        return self.expense_df
+            _print_info(locations[month], summaries[month], len(rows_by_month[month]))
+    return locations
@@ -0,0 +1,67 @@
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+
+from plotly.io.json import to_json_plotly
+
+from core.config import FIGURE_CACHE_MAX_BYTES, FIGURE_CACHE_MAX_ENTRIES
+
+
+def _estimate_size(value) -> int:
+    # Figures and Dash components are measured by the size of the JSON the
+    # browser would receive for them.
+    return len(to_json_plotly(value))
+
+
+class FigureCache:
+    # Least recently used cache of callback results, bounded both by number of
+    # entries and by their estimated size. Keys should contain the version of
+    # the data a result was computed from, so that stale entries are never hit
+    # again and simply age out.
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], object]) -> object:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+        value = compute()
+        size = _estimate_size(value)
+        with self._lock:
+            if key in self._entries or size > self.max_bytes:
+                return value
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            while (
+                len(self._entries) > self.max_entries
+                or self.current_bytes > self.max_bytes
+            ):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+figure_cache = FigureCache(FIGURE_CACHE_MAX_ENTRIES, FIGURE_CACHE_MAX_BYTES)
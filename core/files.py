@@ -0,0 +1,127 @@
+import csv
+import os
+import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Bytes kept from before the read offset of a file to tell an append apart from
+# a rewrite.
+TAIL_SIZE = 64
+
+
+@contextmanager
+def locked(file: IO) -> IO:
+    # Holds an exclusive advisory lock on the open file until the block exits,
+    # so concurrent `main.py` runs take turns. Platforms without `fcntl` run the
+    # block unlocked.
+    if fcntl is None:
+        yield file
+        return
+    fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+    try:
+        yield file
+    finally:
+        fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def atomic_write(filepath: Path, mode: str = "w", **kwargs) -> IO:
+    # Writes to a temporary file next to `filepath` that only replaces it once
+    # complete, so readers see either the old or the new file, never half of it.
+    filepath = Path(filepath)
+    os.makedirs(filepath.parent, exist_ok=True)
+    fd, temporary_filepath = tempfile.mkstemp(
+        dir=filepath.parent, prefix=f".{filepath.name}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, mode, **kwargs) as file:
+            yield file
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_filepath, filepath)
+    except BaseException:
+        if os.path.exists(temporary_filepath):
+            os.remove(temporary_filepath)
+        raise
+
+
+@contextmanager
+def locked_append(filepath: Path) -> IO:
+    # Opens `filepath` for appending and keeps it locked until the block exits.
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    with open(filepath, "a", newline="") as file, locked(file):
+        file.seek(0, os.SEEK_END)
+        yield file
+
+
+def write_rows_to_csv(file: IO, rows: list[list], header: list[str]) -> None:
+    # The header is only written when the file is empty, so appending a row
+    # costs the same no matter how large the file already is.
+    writer = csv.writer(file)
+    if file.tell() == 0:
+        writer.writerow(header)
+    writer.writerows(rows)
+    file.flush()
+    os.fsync(file.fileno())
+
+
+def append_rows_to_csv(filepath: Path, rows: list[list], header: list[str]) -> None:
+    # The lock covers the header check and the write, so parallel writers
+    # neither interleave their lines nor both write a header.
+    with locked_append(filepath) as file:
+        write_rows_to_csv(file, rows, header)
+
+
+def get_stat_key(filepath: Path) -> tuple[int, int, int]:
+    stat = os.stat(filepath)
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+@dataclass
+class ReadPosition:
+    # How far a file that is only ever appended to was read, with its last
+    # bytes to tell whether it was rewritten since.
+    stat_key: tuple[int, int, int]
+    offset: int = 0
+    tail: bytes = b""
+
+
+def _read_tail(file: IO, offset: int) -> bytes:
+    file.seek(max(0, offset - TAIL_SIZE))
+    return file.read(min(offset, TAIL_SIZE))
+
+
+def get_end_position(filepath: Path, stat_key: tuple[int, int, int]) -> ReadPosition:
+    # Position after the first `stat_key[2]` bytes of `filepath`, for a file
+    # that was read whole by other means, such as pandas.
+    with open(filepath, "rb") as file:
+        return ReadPosition(stat_key, stat_key[2], _read_tail(file, stat_key[2]))
+
+
+def read_appended(
+    filepath: Path, position: ReadPosition | None
+) -> tuple[bytes, ReadPosition, bool]:
+    # The whole lines added to `filepath` after `position`, the position after
+    # them and whether they follow `position`. When the file was replaced or
+    # rewritten since, every line is returned instead, the header included. A
+    # line still being written is left for the next read.
+    stat_key = get_stat_key(filepath)
+    with open(filepath, "rb") as file:
+        if position is not None:
+            tail = _read_tail(file, position.offset)
+            if stat_key[0] != position.stat_key[0] or tail != position.tail:
+                position = None
+        offset = 0 if position is None else position.offset
+        file.seek(offset)
+        data = file.read()
+    data = data[: data.rfind(b"\n") + 1]
+    tail = b"" if position is None else position.tail
+    new_position = ReadPosition(stat_key, offset + len(data), (tail + data)[-TAIL_SIZE:])
+    return data, new_position, position is not None
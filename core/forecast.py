@@ -0,0 +1,185 @@
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from core.config import (
+    ALL_CURRENCIES,
+    AMOUNT_COLUMN,
+    AMOUNT_LEFT_COLUMN,
+    CATEGORY_COLUMN,
+    COMMITTED_COLUMN,
+    CUMULATIVE_LEFT_COLUMN,
+    CURRENCY_COLUMN,
+    DEFAULT_CURRENCY,
+    FORECAST_MAX_MONTHS,
+    INCOME_COLUMN,
+    MONTH_COLUMN,
+    REPORTING_CURRENCY,
+    SAVINGS_CATEGORY,
+    SUPPORTED_CURRENCIES,
+)
+from core.fx import fx_table, get_converted_incomes
+from core.income import income_index
+from core.instrumentation import timed
+from core.store import expense_store, get_data_version
+
+
+def _get_month_number(month: str) -> int:
+    return int(month[:4]) * 12 + int(month[5:7]) - 1
+
+
+def _get_month(month_number: int) -> str:
+    return f"{month_number // 12}-{month_number % 12 + 1:02d}"
+
+
+def get_current_month() -> str:
+    return datetime.now().strftime("%Y-%m")
+
+
+class ForecastTable:
+    # Running totals of the committed spend (every expense but savings,
+    # installments included) and of the income of consecutive months, one
+    # column per currency. The total of any window of months is the difference
+    # of two rows, so every query costs the same however long the history or
+    # the window is. Months outside the table count as zero.
+    def __init__(self, first_month: str, spend: pd.DataFrame, income: pd.DataFrame):
+        self.first_month_number = _get_month_number(first_month)
+        self.num_months = len(spend)
+        self.currencies = list(spend.columns)
+        zeros = np.zeros((1, len(self.currencies)))
+        self._spend_totals = np.vstack([zeros, spend.to_numpy().cumsum(axis=0)])
+        self._income_totals = np.vstack([zeros, income.to_numpy().cumsum(axis=0)])
+
+    def _get_positions(self, start_month: str, num_months: int) -> np.ndarray:
+        # Rows of the totals that bound each month of the window.
+        start = _get_month_number(start_month) - self.first_month_number
+        return np.clip(np.arange(start, start + num_months + 1), 0, self.num_months)
+
+    def _get_column(self, currency: str) -> int:
+        # `ALL_CURRENCIES` only has a column while there are exchange rates, so
+        # a page still showing it after the rates are removed gets the default
+        # currency instead.
+        if currency not in self.currencies:
+            currency = DEFAULT_CURRENCY
+        return self.currencies.index(currency)
+
+    def _get_window_total(
+        self, totals: np.ndarray, start_month: str, num_months: int, currency: str
+    ) -> float:
+        start = _get_month_number(start_month) - self.first_month_number
+        first, last = np.clip([start, start + num_months], 0, self.num_months)
+        column = self._get_column(currency)
+        return float(totals[last, column] - totals[first, column])
+
+    def get_committed(self, start_month: str, num_months: int, currency: str) -> float:
+        return self._get_window_total(
+            self._spend_totals, start_month, num_months, currency
+        )
+
+    def get_income(self, start_month: str, num_months: int, currency: str) -> float:
+        return self._get_window_total(
+            self._income_totals, start_month, num_months, currency
+        )
+
+    def get_amount_left(self, start_month: str, num_months: int, currency: str) -> float:
+        return self.get_income(start_month, num_months, currency) - self.get_committed(
+            start_month, num_months, currency
+        )
+
+    def get_projection(
+        self, start_month: str, num_months: int, currency: str
+    ) -> pd.DataFrame:
+        # One row per month of the window with its income, committed spend and
+        # amount left, and the amount left accumulated since `start_month`.
+        positions = self._get_positions(start_month, num_months)
+        column = self._get_column(currency)
+        income = np.diff(self._income_totals[positions, column])
+        committed = np.diff(self._spend_totals[positions, column])
+        start = _get_month_number(start_month)
+        return pd.DataFrame(
+            {
+                MONTH_COLUMN: [_get_month(start + month) for month in range(num_months)],
+                INCOME_COLUMN: income,
+                COMMITTED_COLUMN: committed,
+                AMOUNT_LEFT_COLUMN: income - committed,
+                CUMULATIVE_LEFT_COLUMN: np.cumsum(income - committed),
+            }
+        )
+
+
+@timed
+def build_forecast_table(cube: pd.DataFrame, last_month: str) -> ForecastTable:
+    # Spans the months of `cube` (an aggregate cube of the whole history)
+    # through `last_month`. With exchange rates, the `ALL_CURRENCIES` column
+    # holds every currency converted to `REPORTING_CURRENCY`.
+    months_in_cube = cube[MONTH_COLUMN].unique()
+    first_number = _get_month_number(min([*months_in_cube, last_month]))
+    last_number = _get_month_number(max([*months_in_cube, last_month]))
+    months = [_get_month(number) for number in range(first_number, last_number + 1)]
+
+    cube = cube[cube[CATEGORY_COLUMN] != SAVINGS_CATEGORY]
+    spend = (
+        cube.groupby([MONTH_COLUMN, CURRENCY_COLUMN], observed=True)[AMOUNT_COLUMN]
+        .sum()
+        .unstack(fill_value=0)
+        .reindex(index=months, columns=SUPPORTED_CURRENCIES, fill_value=0)
+    )
+    income = pd.DataFrame(
+        {
+            currency: income_index.get_many(months, currency)
+            for currency in SUPPORTED_CURRENCIES
+        },
+        index=months,
+        dtype=np.float64,
+    )
+    if fx_table.has_rates():
+        converted = fx_table.convert(cube, REPORTING_CURRENCY)
+        spend[ALL_CURRENCIES] = (
+            converted.groupby(MONTH_COLUMN)[AMOUNT_COLUMN]
+            .sum()
+            .reindex(months, fill_value=0)
+        )
+        income[ALL_CURRENCIES] = get_converted_incomes(months)
+    return ForecastTable(months[0], spend.fillna(0), income)
+
+
+class ForecastIndex:
+    # Keeps the forecast table of the dashboard's expense store, rebuilt when
+    # the expenses, incomes or exchange rates change. The table reaches
+    # `FORECAST_MAX_MONTHS` past the current month.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._table = None
+
+    def get_table(self) -> ForecastTable:
+        with self._lock:
+            return self._get_table()
+
+    def _get_table(self) -> ForecastTable:
+        version = get_data_version()
+        if version != self._version:
+            dates = expense_store.get_dates()
+            cube = (
+                expense_store.get_cube(dates[0])
+                if dates
+                else pd.DataFrame(
+                    columns=[
+                        MONTH_COLUMN,
+                        CATEGORY_COLUMN,
+                        CURRENCY_COLUMN,
+                        AMOUNT_COLUMN,
+                    ]
+                )
+            )
+            current_number = _get_month_number(get_current_month())
+            self._table = build_forecast_table(
+                cube, _get_month(current_number + FORECAST_MAX_MONTHS - 1)
+            )
+            self._version = version
+        return self._table
+
+
+forecast_index = ForecastIndex()
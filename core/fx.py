@@ -0,0 +1,182 @@
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from core.aggregates import CUBE_KEYS, sum_cube
+from core.config import (
+    ALL_CURRENCIES,
+    AMOUNT_COLUMN,
+    CURRENCY_COLUMN,
+    DATE_COLUMN,
+    FX_BASE_CURRENCY,
+    PATH_TO_FX_RATES_FILE,
+    RATE_COLUMN,
+    REPORTING_CURRENCY,
+    SUPPORTED_CURRENCIES,
+)
+from core.income import income_index
+
+# Rates are looked up by a single int64 key per row: the index of the currency
+# times `_CURRENCY_SPAN`, plus the day, shifted to be positive.
+_CURRENCY_SPAN = 2**32
+_DAY_OFFSET = 2**31
+
+
+def _get_keys(codes: np.ndarray, dates: pd.Series) -> np.ndarray:
+    days = dates.to_numpy().astype("datetime64[D]").astype(np.int64)
+    return codes.astype(np.int64) * _CURRENCY_SPAN + days + _DAY_OFFSET
+
+
+class FxTable:
+    # Keeps the rate file as numpy arrays sorted by (currency, date), so the
+    # rates of any number of rows are found with one `searchsorted`. A rate
+    # applies from its date until the next rate of the same currency, and rows
+    # older than the first rate of their currency use that first rate. The
+    # base currency always has a rate of 1. The file is only parsed again when
+    # its mtime changes.
+    def __init__(self, filepath: Path):
+        self.filepath = filepath
+        self._mtime_ns = -1
+        self._currencies = []
+        self._keys = np.empty(0, dtype=np.int64)
+        self._rates = np.empty(0)
+        self._first_positions = np.empty(0, dtype=np.int64)
+
+    def _refresh(self) -> None:
+        mtime_ns = (
+            os.stat(self.filepath).st_mtime_ns if os.path.exists(self.filepath) else 0
+        )
+        if mtime_ns == self._mtime_ns:
+            return
+        rates_df = pd.DataFrame(
+            {
+                DATE_COLUMN: [pd.Timestamp(0)],
+                CURRENCY_COLUMN: [FX_BASE_CURRENCY],
+                RATE_COLUMN: [1.0],
+            }
+        )
+        if mtime_ns:
+            file_df = pd.read_csv(self.filepath)
+            file_df[DATE_COLUMN] = pd.to_datetime(file_df[DATE_COLUMN], format="ISO8601")
+            file_df = file_df[file_df[CURRENCY_COLUMN] != FX_BASE_CURRENCY]
+            rates_df = pd.concat([rates_df, file_df], ignore_index=True)
+        self._currencies = sorted(rates_df[CURRENCY_COLUMN].unique())
+        codes = pd.Categorical(
+            rates_df[CURRENCY_COLUMN], categories=self._currencies
+        ).codes
+        keys = _get_keys(codes, rates_df[DATE_COLUMN])
+        order = np.argsort(keys, kind="stable")
+        self._keys = keys[order]
+        self._rates = rates_df[RATE_COLUMN].to_numpy(dtype=np.float64)[order]
+        self._first_positions = np.searchsorted(
+            self._keys, np.arange(len(self._currencies), dtype=np.int64) * _CURRENCY_SPAN
+        )
+        self._mtime_ns = mtime_ns
+
+    def get_version(self) -> int:
+        self._refresh()
+        return self._mtime_ns
+
+    def has_rates(self) -> bool:
+        self._refresh()
+        return len(self._currencies) > 1
+
+    def get_missing_currencies(self, currencies: list[str]) -> list[str]:
+        # Currencies without rates, whose amounts are NaN once converted.
+        self._refresh()
+        return sorted(set(currencies) - set(self._currencies))
+
+    def get_rates(self, currencies: pd.Series, dates: pd.Series) -> np.ndarray:
+        # Value of one unit of each row's currency in `FX_BASE_CURRENCY` on the
+        # row's date, NaN for currencies without rates.
+        self._refresh()
+        codes = pd.Categorical(currencies, categories=self._currencies).codes
+        positions = np.searchsorted(self._keys, _get_keys(codes, dates), side="right")
+        positions = np.maximum(positions - 1, self._first_positions[codes])
+        rates = self._rates[positions]
+        rates[codes < 0] = np.nan
+        return rates
+
+    def convert(self, df: pd.DataFrame, currency: str) -> pd.DataFrame:
+        # The rows of `df` with their amounts in `currency`.
+        if df.empty:
+            return df.assign(**{CURRENCY_COLUMN: currency})
+        rates = self.get_rates(df[CURRENCY_COLUMN], df[DATE_COLUMN])
+        target_rates = self.get_rates(
+            pd.Series(currency, index=df.index), df[DATE_COLUMN]
+        )
+        amounts = df[AMOUNT_COLUMN].to_numpy() * rates / target_rates
+        currencies = pd.Series(currency, index=df.index, dtype=df[CURRENCY_COLUMN].dtype)
+        return df.assign(**{AMOUNT_COLUMN: amounts, CURRENCY_COLUMN: currencies})
+
+
+fx_table = FxTable(PATH_TO_FX_RATES_FILE)
+
+
+def get_currency_options() -> list[dict]:
+    options = [
+        {"label": currency, "value": currency} for currency in SUPPORTED_CURRENCIES
+    ]
+    if fx_table.has_rates():
+        options.append(
+            {
+                "label": f"ALL (converted to {REPORTING_CURRENCY})",
+                "value": ALL_CURRENCIES,
+            }
+        )
+    return options
+
+
+def get_conversion_warning(currency: str, currencies: list[str]) -> str:
+    # Converted totals skip what cannot be converted, so the currencies they
+    # leave out are spelled out next to them.
+    if currency != ALL_CURRENCIES:
+        return ""
+    missing = fx_table.get_missing_currencies(currencies)
+    if not missing:
+        return ""
+    return (
+        f"No exchange rate for {', '.join(missing)}: their expenses and incomes are "
+        f"left out of the totals in {REPORTING_CURRENCY}."
+    )
+
+
+def get_display_currency(currency: str) -> str:
+    return REPORTING_CURRENCY if currency == ALL_CURRENCIES else currency
+
+
+def select_currency(df: pd.DataFrame, currency: str) -> pd.DataFrame:
+    # The rows in `currency`, or with `ALL_CURRENCIES` every row converted to
+    # `REPORTING_CURRENCY`.
+    if currency == ALL_CURRENCIES:
+        return fx_table.convert(df, REPORTING_CURRENCY)
+    return df[df[CURRENCY_COLUMN] == currency]
+
+
+def select_cube_currency(cube: pd.DataFrame, currency: str) -> pd.DataFrame:
+    # Same as `select_currency` for aggregate cubes, whose cells of different
+    # currencies are merged once converted.
+    if currency == ALL_CURRENCIES:
+        return sum_cube(fx_table.convert(cube, REPORTING_CURRENCY), CUBE_KEYS)
+    return cube[cube[CURRENCY_COLUMN] == currency]
+
+
+def get_converted_incomes(months: list[str]) -> np.ndarray:
+    # Income of every currency in each of `months`, converted to
+    # `REPORTING_CURRENCY` with the rates of the first day of the month.
+    incomes_df = pd.DataFrame(
+        [
+            (pd.Timestamp(f"{month}-01"), currency, income)
+            for currency in SUPPORTED_CURRENCIES
+            for month, income in zip(months, income_index.get_many(months, currency))
+        ],
+        columns=[DATE_COLUMN, CURRENCY_COLUMN, AMOUNT_COLUMN],
+    )
+    amounts = fx_table.convert(incomes_df, REPORTING_CURRENCY)[AMOUNT_COLUMN].to_numpy()
+    return np.nansum(amounts.reshape(len(SUPPORTED_CURRENCIES), len(months)), axis=0)
+
+
+def get_converted_income(months: list[str]) -> float:
+    return float(get_converted_incomes(months).sum())
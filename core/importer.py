@@ -0,0 +1,375 @@
+import csv
+import hashlib
+import io
+import os
+import pickle
+import re
+from collections import Counter, defaultdict
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from datetime import datetime
+from itertools import batched
+from pathlib import Path
+from typing import IO
+
+from core.config import (
+    AMOUNT_COLUMN,
+    CACHE_DIRECTORY_NAME,
+    CATEGORY_COLUMN,
+    CURRENCY_COLUMN,
+    DATE_COLUMN,
+    DEFAULT_CATEGORY,
+    DEFAULT_CURRENCY,
+    DEFAULT_DESCRIPTION,
+    DESCRIPTION_COLUMN,
+    EXPENSE_CATEGORIES,
+    IMPORT_CATEGORY_RULES,
+    IMPORT_CHUNK_ROWS,
+    IMPORT_COLUMN_NAMES,
+    IMPORT_DATE_FORMATS,
+    IMPORT_HASHES_DIRECTORY_NAME,
+    IMPORT_LOCK_FILENAME,
+    NAME_COLUMN,
+    SUPPORTED_CURRENCIES,
+)
+from core.daemon_client import add_to_daemon
+from core.expense import Expense, to_cents
+from core.files import (
+    ReadPosition,
+    atomic_write,
+    get_stat_key,
+    locked,
+    read_appended,
+)
+from core.instrumentation import timed
+from core.storage import CsvStorage
+
+# Statement columns an expense cannot do without.
+REQUIRED_COLUMNS = [NAME_COLUMN, AMOUNT_COLUMN, DATE_COLUMN]
+# OFX tags read from every transaction, with the column each one fills.
+OFX_TAGS = {"DTPOSTED": DATE_COLUMN, "TRNAMT": AMOUNT_COLUMN, "NAME": NAME_COLUMN}
+_OFX_TAG_PATTERN = re.compile(r"<(/?\w+)>([^<\r\n]*)")
+
+
+def parse_amount(text: str) -> float:
+    # Reads "1,234.56", "1.234,56", "R$ -12,50" and "(12.50)" alike: the last
+    # dot or comma followed by one or two digits is the decimal separator.
+    digits = re.sub(r"[^\d.,]", "", text)
+    if not digits:
+        raise ValueError(f"{text!r} is not an amount.")
+    separator_index = max(digits.rfind("."), digits.rfind(","))
+    whole, decimals = digits, "0"
+    if separator_index != -1 and len(digits) - separator_index - 1 in (1, 2):
+        whole, decimals = digits[:separator_index], digits[separator_index + 1 :]
+    amount = float(f"{re.sub(r'[.,]', '', whole) or 0}.{decimals}")
+    text = text.strip()
+    return -amount if "-" in text or text.startswith("(") else amount
+
+
+def parse_date(text: str, date_formats: list[str]) -> datetime:
+    # Times are dropped, as in "2026-10-18 12:30" or OFX's
+    # "20261018120000[-3:BRT]".
+    text = text.strip().split(" ")[0].split("T")[0]
+    if text[:8].isdigit():
+        text = text[:8]
+    for date_format in date_formats:
+        try:
+            return datetime.strptime(text, date_format)
+        except ValueError:
+            continue
+    raise ValueError(f"{text!r} does not match any of the formats {date_formats}.")
+
+
+def load_category_rules(filepath: Path | None = None) -> list[tuple[re.Pattern, str]]:
+    # The rules of `filepath`, a CSV file with `Pattern` and `Category` columns,
+    # followed by `IMPORT_CATEGORY_RULES`.
+    rules = []
+    if filepath is not None:
+        with open(filepath, newline="") as file:
+            rules = [(row["Pattern"], row["Category"]) for row in csv.DictReader(file)]
+    compiled_rules = []
+    for pattern, category in [*rules, *IMPORT_CATEGORY_RULES]:
+        if category not in EXPENSE_CATEGORIES:
+            raise ValueError(f"{category!r} of the rule {pattern!r} is not a category.")
+        compiled_rules.append((re.compile(pattern, re.IGNORECASE), category))
+    return compiled_rules
+
+
+def classify(name: str, rules: list[tuple[re.Pattern, str]]) -> str:
+    for pattern, category in rules:
+        if pattern.search(name):
+            return category
+    return DEFAULT_CATEGORY
+
+
+def get_expense_key(name: str, cents: int, date: str) -> int:
+    # The same for the same date, amount and name, whatever the case or spacing
+    # of the name and in every process, unlike `hash`.
+    name = " ".join(name.casefold().split())
+    digest = hashlib.blake2b(f"{date}\x1f{cents}\x1f{name}".encode(), digest_size=8)
+    return int.from_bytes(digest.digest())
+
+
+def get_column_names(header: list[str], columns: dict[str, str]) -> dict[str, str]:
+    # The statement column of every expense column, from `columns` (expense
+    # column to statement column) or else from `IMPORT_COLUMN_NAMES`.
+    names = {name.strip().casefold(): name for name in header}
+    column_names = {}
+    for column, name in columns.items():
+        if name not in header:
+            raise ValueError(f"The statement has no {name!r} column.")
+        column_names[column] = name
+    for column, aliases in IMPORT_COLUMN_NAMES.items():
+        if column in column_names:
+            continue
+        for alias in [column.casefold(), *aliases]:
+            if alias in names:
+                column_names[column] = names[alias]
+                break
+    missing = [column for column in REQUIRED_COLUMNS if column not in column_names]
+    if missing:
+        raise ValueError(
+            f"The statement has no column for {', '.join(missing)}; name it with "
+            f"--column, such as --column {missing[0]}=<statement column>."
+        )
+    return column_names
+
+
+def read_csv_statement(file: IO, columns: dict[str, str]) -> Iterator[dict[str, str]]:
+    # Rows of a CSV statement with expense columns as keys, one at a time.
+    # Commas, semicolons and tabs are told apart from the first lines.
+    sample = file.read(64 * 1024)
+    file.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.reader(file, dialect)
+    header = next(reader, [])
+    column_names = get_column_names(header, columns)
+    indexes = {column: header.index(name) for column, name in column_names.items()}
+    for row in reader:
+        if any(row):
+            yield {column: row[index] for column, index in indexes.items()}
+
+
+def read_ofx_statement(file: IO) -> Iterator[dict[str, str]]:
+    # Transactions of an OFX statement, SGML or XML, one at a time.
+    transaction = None
+    for line in file:
+        for tag, value in _OFX_TAG_PATTERN.findall(line):
+            tag = tag.upper()
+            if tag == "STMTTRN":
+                transaction = {}
+            elif tag == "/STMTTRN" and transaction is not None:
+                if NAME_COLUMN not in transaction:
+                    transaction[NAME_COLUMN] = transaction.get("MEMO", "")
+                yield transaction
+                transaction = None
+            elif transaction is not None and tag in OFX_TAGS:
+                transaction[OFX_TAGS[tag]] = value.strip()
+            elif transaction is not None and tag == "MEMO":
+                transaction["MEMO"] = value.strip()
+
+
+@dataclass
+class _MonthHashes:
+    position: ReadPosition | None = None
+    column_indexes: list[int] = field(default_factory=list)
+    counts: Counter = field(default_factory=Counter)
+
+
+class ImportHashIndex:
+    # How many expenses of every month have each date, amount and name. The
+    # counts of a month are saved to the cache folder with how far its file was
+    # read, so the next import only reads the lines appended since, such as the
+    # ones it wrote itself, and reads the file again when it was rewritten.
+    def __init__(self, storage: CsvStorage):
+        self.storage = storage
+        self.folder_path = (
+            storage.folder_path / CACHE_DIRECTORY_NAME / IMPORT_HASHES_DIRECTORY_NAME
+        )
+        self._months = {}
+        self._changed_months = set()
+
+    def _get_filepath(self, month: str) -> Path:
+        return self.folder_path / f"{self.storage.prefix}_{month}.pickle"
+
+    def _load(self, month: str) -> _MonthHashes:
+        try:
+            with open(self._get_filepath(month), "rb") as file:
+                return pickle.load(file)
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+            return _MonthHashes()
+
+    def get_counts(self, month: str) -> Counter:
+        month_hashes = self._months.get(month)
+        if month_hashes is None:
+            month_hashes = self._months[month] = self._load(month)
+        expense_filepath = self.storage.get_filepath(month)
+        if not os.path.exists(expense_filepath):
+            if month_hashes.position is not None:
+                month_hashes = self._months[month] = _MonthHashes()
+                self._changed_months.add(month)
+            return month_hashes.counts
+        position = month_hashes.position
+        if position is not None and position.stat_key == get_stat_key(expense_filepath):
+            return month_hashes.counts
+
+        data, position, appended = read_appended(expense_filepath, position)
+        rows = csv.reader(io.StringIO(data.decode()))
+        if not appended:
+            header = next(rows, [])
+            month_hashes.column_indexes = [
+                header.index(column) for column in REQUIRED_COLUMNS
+            ]
+            month_hashes.counts.clear()
+        name_index, amount_index, date_index = month_hashes.column_indexes
+        for row in rows:
+            if row:
+                cents = to_cents(float(row[amount_index]))
+                month_hashes.counts[
+                    get_expense_key(row[name_index], cents, row[date_index])
+                ] += 1
+        month_hashes.position = position
+        self._changed_months.add(month)
+        return month_hashes.counts
+
+    def save(self) -> None:
+        for month in self._changed_months:
+            with atomic_write(self._get_filepath(month), "wb") as file:
+                pickle.dump(self._months[month], file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._changed_months.clear()
+
+
+@dataclass
+class ImportReport:
+    added: Counter = field(default_factory=Counter)
+    duplicates: Counter = field(default_factory=Counter)
+    # Rows that are not expenses, such as payments and refunds.
+    skipped: int = 0
+    locations: dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class _StatementParser:
+    rules: list[tuple[re.Pattern, str]]
+    currency: str
+    date_formats: list[str]
+    negative_expenses: bool
+    # Statements repeat the same days and shops over and over, so dates and
+    # categories are only worked out once per chunk.
+    dates: dict[str, datetime] = field(default_factory=dict)
+    categories: dict[str, str] = field(default_factory=dict)
+
+    def clear(self) -> None:
+        self.dates.clear()
+        self.categories.clear()
+
+    def to_expense(self, record: dict[str, str]) -> Expense | None:
+        amount = parse_amount(record[AMOUNT_COLUMN])
+        if self.negative_expenses:
+            amount = -amount
+        if amount <= 0:
+            return None
+        name = record[NAME_COLUMN].strip()
+        category = record.get(CATEGORY_COLUMN, "").strip().upper()
+        if category not in EXPENSE_CATEGORIES:
+            category = self.categories.get(name)
+            if category is None:
+                category = self.categories[name] = classify(name, self.rules)
+        date = self.dates.get(record[DATE_COLUMN])
+        if date is None:
+            date = self.dates[record[DATE_COLUMN]] = parse_date(
+                record[DATE_COLUMN], self.date_formats
+            )
+        currency = record.get(CURRENCY_COLUMN, "").strip().upper()
+        return Expense(
+            name=name,
+            amount=amount,
+            installments=1,
+            category=category,
+            description=record.get(DESCRIPTION_COLUMN, "").strip() or DEFAULT_DESCRIPTION,
+            currency=currency if currency in SUPPORTED_CURRENCIES else self.currency,
+            date=date,
+        )
+
+
+def _append_rows(storage: CsvStorage, rows_by_month: dict[str, list[list]]) -> dict:
+    # Through `main.py serve` when it is running, as `add_expenses` does, a
+    # few hundred rows per request, as a chunk is too large for one.
+    response = add_to_daemon(rows_by_month, quiet=True)
+    if response is not None:
+        return response["locations"]
+    return storage.append_rows(rows_by_month)
+
+
+@timed
+def import_statement(
+    records: Iterable[dict[str, str]],
+    storage: CsvStorage,
+    rules: list[tuple[re.Pattern, str]],
+    currency: str = DEFAULT_CURRENCY,
+    date_formats: list[str] = IMPORT_DATE_FORMATS,
+    negative_expenses: bool = False,
+    dry_run: bool = False,
+) -> ImportReport:
+    # Adds the expenses of `records` that are not in their month yet, written
+    # `IMPORT_CHUNK_ROWS` at a time. Every expense of a month already there
+    # with the same date, amount and name stands for one expense of the
+    # statement, so importing the same statement twice adds nothing, and two
+    # identical purchases on one day are both kept. Besides a chunk, only the
+    # counts of the months the statement falls in are kept in memory. With
+    # `negative_expenses`, expenses are the negative amounts, as in bank
+    # exports. Rows that are not expenses are skipped.
+    # Imports take turns, from reading the counts of a month until their rows
+    # are written, so two overlapping statements imported at once cannot both
+    # add the same expenses.
+    lock_filepath = storage.folder_path / CACHE_DIRECTORY_NAME / IMPORT_LOCK_FILENAME
+    os.makedirs(lock_filepath.parent, exist_ok=True)
+    with open(lock_filepath, "a") as lock_file, locked(lock_file):
+        report = ImportReport()
+        hash_index = ImportHashIndex(storage)
+        # Counts as they were before the import, so the expenses it adds are not
+        # taken for ones already there.
+        counts = {}
+        matched = defaultdict(Counter)
+        parser = _StatementParser(rules, currency, date_formats, negative_expenses)
+        for chunk_number, chunk in enumerate(batched(records, IMPORT_CHUNK_ROWS)):
+            parser.clear()
+            rows_by_month = defaultdict(list)
+            for row_number, record in enumerate(
+                chunk, chunk_number * IMPORT_CHUNK_ROWS + 1
+            ):
+                try:
+                    expense = parser.to_expense(record)
+                except (KeyError, ValueError) as error:
+                    raise ValueError(f"row {row_number}: {error}") from error
+                if expense is None:
+                    report.skipped += 1
+                    continue
+                row = expense.installment_rows()[0]
+                month = row[-1][:7]
+                if month not in counts:
+                    counts[month] = hash_index.get_counts(month)
+                key = get_expense_key(expense.name, to_cents(expense.amount), row[-1])
+                if matched[month][key] < counts[month][key]:
+                    matched[month][key] += 1
+                    report.duplicates[month] += 1
+                else:
+                    rows_by_month[month].append(row)
+            for month, rows in rows_by_month.items():
+                report.added[month] += len(rows)
+            if rows_by_month and not dry_run:
+                report.locations.update(_append_rows(storage, rows_by_month))
+        if not dry_run:
+            hash_index.save()
+        return report
+
+
+def read_statement(
+    file: IO, statement_format: str, columns: dict[str, str]
+) -> Iterator[dict[str, str]]:
+    if statement_format == "ofx":
+        return read_ofx_statement(file)
+    return read_csv_statement(file, columns)
@@ -0,0 +1,69 @@
+import json
+import os
+from bisect import bisect_right
+from pathlib import Path
+
+from core.config import DEFAULT_CURRENCY, PATH_TO_INCOME_FILE
+from core.instrumentation import timed
+
+
+class IncomeIndex:
+    # Keeps the income file parsed in memory as a sorted list of months. A
+    # month without its own entry uses the nearest earlier month, found with a
+    # binary search. The file is only parsed again when its mtime changes and
+    # is never written to.
+    def __init__(self, filepath: Path):
+        self.filepath = filepath
+        self._mtime_ns = None
+        self._months = []
+        self._incomes = {}
+
+    @timed
+    def _refresh(self) -> None:
+        mtime_ns = os.stat(self.filepath).st_mtime_ns
+        if mtime_ns == self._mtime_ns:
+            return
+        with open(self.filepath, "r") as file:
+            self._incomes = json.load(file)
+        self._months = sorted(self._incomes)
+        self._mtime_ns = mtime_ns
+
+    def get_version(self) -> int:
+        self._refresh()
+        return self._mtime_ns
+
+    def _lookup(self, date: str | None, currency: str) -> int:
+        if not self._months:
+            return 0
+        if date is None:
+            month = self._months[-1]
+        else:
+            position = bisect_right(self._months, date[:7]) - 1
+            if position < 0:
+                return 0
+            month = self._months[position]
+        return self._incomes[month].get(currency, 0)
+
+    def get(self, date: str | None = None, currency: str = DEFAULT_CURRENCY) -> int:
+        self._refresh()
+        return self._lookup(date, currency)
+
+    def get_many(self, dates: list[str], currency: str = DEFAULT_CURRENCY) -> list[int]:
+        self._refresh()
+        return [self._lookup(date, currency) for date in dates]
+
+
+income_index = IncomeIndex(PATH_TO_INCOME_FILE)
+
+
+@timed
+def get_income(date: str | None = None, currency: str = DEFAULT_CURRENCY) -> int:
+    return income_index.get(date, currency)
+
+
+def get_incomes(dates: list[str], currencies: list[str]) -> dict[tuple[str, str], int]:
+    incomes = {}
+    for currency in currencies:
+        for date, income in zip(dates, income_index.get_many(dates, currency)):
+            incomes[(date, currency)] = income
+    return incomes
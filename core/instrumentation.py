@@ -0,0 +1,136 @@
+import cProfile
+import functools
+import os
+import threading
+import time
+from collections.abc import Callable
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from core.config import PATH_TO_PROFILES, PROFILE_ENV_VAR
+
+# "1" times the functions marked with `timed`, "cprofile" also dumps profiles.
+_mode = os.environ.get(PROFILE_ENV_VAR, "").strip().lower()
+_enabled = _mode not in ("", "0", "false", "no", "off")
+_lock = threading.Lock()
+_profile_lock = threading.Lock()
+# Name to [calls, total seconds, slowest call in seconds].
+_timings = {}
+_counts = {}
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def is_profiling() -> bool:
+    return _mode == "cprofile"
+
+
+def enable() -> None:
+    global _enabled
+    _enabled = True
+
+
+def reset() -> None:
+    with _lock:
+        _timings.clear()
+        _counts.clear()
+
+
+def _record(name: str, seconds: float) -> None:
+    with _lock:
+        timing = _timings.get(name)
+        if timing is None:
+            _timings[name] = [1, seconds, seconds]
+        else:
+            timing[0] += 1
+            timing[1] += seconds
+            timing[2] = max(timing[2], seconds)
+
+
+def timed[F: Callable](func: F) -> F:
+    # Times every call of `func` while instrumentation is enabled. When it is
+    # not, a call costs one flag check more.
+    name = f"{func.__module__.removeprefix('core.')}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return func(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _record(name, time.perf_counter() - start)
+
+    return wrapper
+
+
+def count(name: str, amount: int = 1) -> None:
+    if not _enabled:
+        return
+    with _lock:
+        _counts[name] = _counts.get(name, 0) + amount
+
+
+def get_timings() -> list[dict]:
+    # Slowest in total first.
+    with _lock:
+        timings = [
+            {
+                "Name": name,
+                "Calls": calls,
+                "Total ms": round(total * 1000, 3),
+                "Mean ms": round(total / calls * 1000, 3),
+                "Max ms": round(slowest * 1000, 3),
+            }
+            for name, (calls, total, slowest) in _timings.items()
+        ]
+    return sorted(timings, key=lambda timing: timing["Total ms"], reverse=True)
+
+
+def get_counts() -> dict[str, int]:
+    with _lock:
+        return dict(sorted(_counts.items()))
+
+
+def format_summary() -> str:
+    timings, counts = get_timings(), get_counts()
+    if not timings and not counts:
+        return "==> Nothing was timed"
+    width = max([len(timing["Name"]) for timing in timings] + [4])
+    lines = [
+        f"{'Name':<{width}} {'Calls':>6} {'Total ms':>10} {'Mean ms':>9} {'Max ms':>9}"
+    ]
+    for timing in timings:
+        lines.append(
+            f"{timing['Name']:<{width}} {timing['Calls']:>6} {timing['Total ms']:>10.3f} "
+            f"{timing['Mean ms']:>9.3f} {timing['Max ms']:>9.3f}"
+        )
+    for name, amount in counts.items():
+        lines.append(f"{name:<{width}} {amount:>6}")
+    return "\n".join(lines)
+
+
+@contextmanager
+def profiled(label: str):
+    # Writes a cProfile dump of the block to `PATH_TO_PROFILES` when profiling
+    # is on; open it with `python -m pstats` or snakeviz. One profiler runs at
+    # a time, so a request made while another one is profiled is not.
+    if not is_profiling() or not _profile_lock.acquire(blocking=False):
+        yield
+        return
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        _profile_lock.release()
+        os.makedirs(PATH_TO_PROFILES, exist_ok=True)
+        safe_label = "".join(char if char.isalnum() else "_" for char in label[:80])
+        profile.dump_stats(
+            Path(PATH_TO_PROFILES) / f"{datetime.now():%Y%m%dT%H%M%S%f}_{safe_label}.prof"
+        )
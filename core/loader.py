@@ -0,0 +1,35 @@
+import os
+import time
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+from core.config import LOADER_MAX_WORKERS, LOADER_POOL
+
+_EXECUTORS = {"thread": ThreadPoolExecutor, "process": ProcessPoolExecutor}
+
+
+def _load_timed[T](load: Callable[[Path], T], filepath: Path) -> tuple[T, float]:
+    start = time.perf_counter()
+    result = load(filepath)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def load_files[T](
+    filepaths: list[Path],
+    load: Callable[[Path], T],
+    pool: str = LOADER_POOL,
+    max_workers: int | None = LOADER_MAX_WORKERS,
+) -> tuple[dict[Path, T], dict[Path, float]]:
+    # Loads every file with `load` concurrently and returns the results along
+    # with how long each file took, in milliseconds. On a "process" pool `load`
+    # and its result are pickled, so `load` has to be a module-level function.
+    max_workers = max_workers or os.cpu_count() or 1
+    if pool == "serial" or len(filepaths) < 2 or max_workers == 1:
+        timed = [_load_timed(load, filepath) for filepath in filepaths]
+    else:
+        with _EXECUTORS[pool](max_workers=max_workers) as executor:
+            timed = list(executor.map(_load_timed, [load] * len(filepaths), filepaths))
+    results = {filepath: result for filepath, (result, _) in zip(filepaths, timed)}
+    timings = {filepath: ms for filepath, (_, ms) in zip(filepaths, timed)}
+    return results, timings
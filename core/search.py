@@ -0,0 +1,354 @@
+import csv
+import io
+import os
+import pickle
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from heapq import nlargest
+from pathlib import Path
+
+from core.config import (
+    AMOUNT_COLUMN,
+    CACHE_DIRECTORY_NAME,
+    DATE_COLUMN,
+    DESCRIPTION_COLUMN,
+    EXPENSE_COLUMNS,
+    EXPENSE_STORE_REFRESH_SECONDS,
+    INSTALLMENTS_COLUMN,
+    NAME_COLUMN,
+    PATH_TO_EXPENSE_FILES_CURRENT,
+    SEARCH_INDEX_FILENAME,
+)
+from core.files import ReadPosition, atomic_write, get_stat_key, read_appended
+from core.instrumentation import timed
+
+# Bumped whenever the saved layout changes, so older files are rebuilt.
+_INDEX_VERSION = 2
+# Rows indexed or removed since the index was last saved before it is saved
+# again. Fewer are indexed again from the month files by the next process.
+_SAVE_MIN_ROWS = 1_000
+# Rows of rewritten files left in the index before it is built again.
+_MIN_REMOVED_ROWS = 1_000
+# Rows are kept as their fields joined by this character, which month files do
+# not contain, as a string per row loads many times faster than a tuple.
+_FIELD_SEPARATOR = "\x1f"
+_TOKEN_PATTERN = re.compile(r"\w+")
+_DATE_INDEX = EXPENSE_COLUMNS.index(DATE_COLUMN)
+_AMOUNT_INDEX = EXPENSE_COLUMNS.index(AMOUNT_COLUMN)
+_TEXT_INDEXES = [
+    EXPENSE_COLUMNS.index(NAME_COLUMN),
+    EXPENSE_COLUMNS.index(DESCRIPTION_COLUMN),
+]
+
+
+def tokenize(text: str) -> list[str]:
+    # Lowercase words without accents, so "Açaí" is found as "acai".
+    text = text.lower()
+    if not text.isascii():
+        text = "".join(
+            char
+            for char in unicodedata.normalize("NFKD", text)
+            if not unicodedata.combining(char)
+        )
+    return _TOKEN_PATTERN.findall(text)
+
+
+def _get_previous_month(date: str) -> str:
+    year, month = int(date[:4]), int(date[5:7])
+    return f"{year - (month == 1)}-{(month - 2) % 12 + 1:02d}"
+
+
+def _get_cents(row: list[str]) -> int:
+    return round(float(row[_AMOUNT_INDEX]) * 100)
+
+
+def _get_recency(date: str, row_id: int) -> int:
+    # Orders rows by date, then by when they were indexed.
+    try:
+        day = int(date[:4] + date[5:7] + date[8:10])
+    except ValueError:
+        day = 0
+    return day << 32 | row_id
+
+
+@dataclass
+class _IndexedFile:
+    position: ReadPosition
+    # Position of every expense column in the file, from its header.
+    column_indexes: list[int] = field(default_factory=list)
+    row_ids: array = field(default_factory=lambda: array("I"))
+
+
+class SearchIndex:
+    # Inverted index from the words of the name and description of every
+    # expense, in every month file, to the expenses. Like the expense store, it
+    # remembers how far each file was read: lines appended since are the only
+    # ones indexed on the next refresh, and a file that changed otherwise is
+    # indexed again. The index is saved to the cache folder, so a new process
+    # starts from it instead of reading every month.
+    def __init__(
+        self, folder_path: Path, refresh_seconds: float = 0.0, prefix: str = "expense"
+    ):
+        self.folder_path = Path(folder_path)
+        self.refresh_seconds = refresh_seconds
+        self.prefix = prefix
+        self.filepath = self.folder_path / CACHE_DIRECTORY_NAME / SEARCH_INDEX_FILENAME
+        self._lock = threading.Lock()
+        self._refreshed_at = None
+        self._loaded = False
+        self._num_unsaved = 0
+        self._clear()
+
+    def _clear(self) -> None:
+        self._files = {}
+        # Rows of files indexed again are set to None.
+        self._rows = []
+        self._recency = array("q")
+        # Row ids of every word, in increasing order. They are saved as arrays
+        # and turned into sets when a query first needs them.
+        self._postings = {}
+        self._posting_sets = {}
+        self._sorted_tokens = None
+
+    def _load(self) -> None:
+        self._loaded = True
+        if not os.path.exists(self.filepath):
+            return
+        try:
+            with open(self.filepath, "rb") as file:
+                version, files, rows, recency, postings = pickle.load(file)
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+            return
+        if version == _INDEX_VERSION:
+            self._files, self._rows, self._recency = files, rows, recency
+            self._postings = postings
+
+    def _save(self) -> None:
+        with atomic_write(self.filepath, "wb") as file:
+            pickle.dump(
+                (_INDEX_VERSION, self._files, self._rows, self._recency, self._postings),
+                file,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        self._num_unsaved = 0
+
+    def _add_rows(self, indexed_file: _IndexedFile, data: bytes) -> None:
+        lines = csv.reader(io.StringIO(data.decode()))
+        if not indexed_file.column_indexes:
+            header = next(lines, [])
+            indexed_file.column_indexes = [
+                header.index(column) for column in EXPENSE_COLUMNS
+            ]
+        for line in lines:
+            if not line:
+                continue
+            row = [line[index] for index in indexed_file.column_indexes]
+            row_id = len(self._rows)
+            self._rows.append(_FIELD_SEPARATOR.join(row))
+            self._recency.append(_get_recency(row[_DATE_INDEX], row_id))
+            indexed_file.row_ids.append(row_id)
+            tokens = {token for index in _TEXT_INDEXES for token in tokenize(row[index])}
+            for token in tokens:
+                postings = self._postings.get(token)
+                if postings is None:
+                    self._postings[token] = array("I", [row_id])
+                    self._sorted_tokens = None
+                    continue
+                postings.append(row_id)
+                if token in self._posting_sets:
+                    self._posting_sets[token].add(row_id)
+            self._num_unsaved += 1
+
+    def _remove_rows(self, indexed_file: _IndexedFile) -> None:
+        removed_ids = set(indexed_file.row_ids)
+        tokens = set()
+        for row_id in indexed_file.row_ids:
+            row = self._rows[row_id].split(_FIELD_SEPARATOR)
+            self._rows[row_id] = None
+            for index in _TEXT_INDEXES:
+                tokens.update(tokenize(row[index]))
+        for token in tokens:
+            self._postings[token] = array(
+                "I",
+                [row_id for row_id in self._postings[token] if row_id not in removed_ids],
+            )
+            self._posting_sets.pop(token, None)
+        self._num_unsaved += len(removed_ids)
+
+    def _index_file(
+        self, filepath: Path, indexed_file: _IndexedFile | None
+    ) -> _IndexedFile:
+        # Indexes the lines added after what `indexed_file` covers, or the whole
+        # file when it was rewritten.
+        position = None if indexed_file is None else indexed_file.position
+        data, position, appended = read_appended(filepath, position)
+        if not appended:
+            if indexed_file is not None:
+                self._remove_rows(indexed_file)
+            indexed_file = _IndexedFile(position)
+        self._add_rows(indexed_file, data)
+        indexed_file.position = position
+        return indexed_file
+
+    @timed
+    def _refresh(self, force: bool = False) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if (
+                not force
+                and self._refreshed_at is not None
+                and now - self._refreshed_at < self.refresh_seconds
+            ):
+                return
+            self._refreshed_at = now
+            if not self._loaded:
+                self._load()
+            filepaths = {
+                filepath.name: filepath
+                for filepath in self.folder_path.glob(f"{self.prefix}_*.csv")
+            }
+            for name in set(self._files) - set(filepaths):
+                self._remove_rows(self._files.pop(name))
+            # Rows of rewritten files are left behind as None; once they
+            # outnumber the others, the index is built again without them.
+            num_rows = sum(
+                len(indexed_file.row_ids) for indexed_file in self._files.values()
+            )
+            if len(self._rows) > 2 * num_rows + _MIN_REMOVED_ROWS:
+                self._clear()
+            for name, filepath in filepaths.items():
+                indexed_file = self._files.get(name)
+                if indexed_file is None or indexed_file.position.stat_key != get_stat_key(
+                    filepath
+                ):
+                    self._files[name] = self._index_file(filepath, indexed_file)
+            if self._num_unsaved >= _SAVE_MIN_ROWS:
+                self._save()
+
+    def refresh(self) -> None:
+        self._refresh(force=True)
+
+    def _get_postings(self, token: str) -> set[int]:
+        postings = self._posting_sets.get(token)
+        if postings is None:
+            postings = set(self._postings.get(token, ()))
+            self._posting_sets[token] = postings
+        return postings
+
+    def _get_prefix_tokens(self, prefix: str) -> list[str]:
+        # Words starting with `prefix`, found by a binary search over the
+        # sorted words.
+        if self._sorted_tokens is None:
+            self._sorted_tokens = sorted(self._postings)
+        start = bisect_left(self._sorted_tokens, prefix)
+        tokens = []
+        for token in self._sorted_tokens[start:]:
+            if not token.startswith(prefix):
+                break
+            tokens.append(token)
+        return tokens
+
+    def _match(self, query: str) -> set[int]:
+        # Rows having every word of `query`. The last word may be unfinished, so
+        # it matches every word it starts.
+        tokens = tokenize(query)
+        if not tokens:
+            return set()
+        *words, prefix = tokens
+        prefix_postings = [
+            self._get_postings(token) for token in self._get_prefix_tokens(prefix)
+        ]
+        if not words:
+            if len(prefix_postings) == 1:
+                return prefix_postings[0]
+            return set().union(*prefix_postings)
+        # The rarest words are intersected first, and only what is left of
+        # them is looked up in the postings of the unfinished word.
+        rarest, *others = sorted((self._get_postings(word) for word in words), key=len)
+        matches = rarest.intersection(*others) if others else rarest
+        return set().union(*(matches & postings for postings in prefix_postings))
+
+    def _get_most_recent(self, matches: set[int], limit: int) -> list[int]:
+        recency = self._recency.__getitem__
+        # Rows of a month file are dated in its month, so with many matches it
+        # is faster to go through the newest files until `limit` of them are
+        # found than to rank every match.
+        if len(matches) ** 2 <= limit * len(self._rows):
+            return nlargest(limit, matches, key=recency)
+        found = []
+        for name in sorted(self._files, reverse=True):
+            found.extend(
+                row_id for row_id in self._files[name].row_ids if row_id in matches
+            )
+            if len(found) >= limit:
+                break
+        return nlargest(limit, found, key=recency)
+
+    def _get_record(self, row_id: int) -> dict:
+        record = dict(zip(EXPENSE_COLUMNS, self._rows[row_id].split(_FIELD_SEPARATOR)))
+        record[AMOUNT_COLUMN] = float(record[AMOUNT_COLUMN])
+        return record
+
+    @timed
+    def search(self, query: str, limit: int = 20) -> tuple[list[dict], int]:
+        # The `limit` most recent expenses having every word of `query` in
+        # their name or description, and how many there are in total.
+        self._refresh()
+        with self._lock:
+            matches = self._match(query)
+            row_ids = self._get_most_recent(matches, limit)
+            return [self._get_record(row_id) for row_id in row_ids], len(matches)
+
+    def get_most_recent(self, query: str) -> dict | None:
+        records, _ = self.search(query, limit=1)
+        return records[0] if records else None
+
+    def get_most_recent_purchase(self, query: str) -> dict | None:
+        # Like `get_most_recent`, but an installment is given as its purchase:
+        # the installments added back together, dated on the first one, with
+        # their number under `INSTALLMENTS_COLUMN`. Month files do not mark
+        # installments, so they are told by how they are written (see
+        # `Expense.installment_rows`): the same expense in consecutive months,
+        # all but the first dated on the 1st, the first ones a cent larger.
+        self._refresh()
+        with self._lock:
+            matches = self._match(query)
+            row_ids = self._get_most_recent(matches, 1)
+            if not row_ids:
+                return None
+            row = self._rows[row_ids[0]].split(_FIELD_SEPARATOR)
+            key = row[:_AMOUNT_INDEX] + row[_AMOUNT_INDEX + 1 : _DATE_INDEX]
+            rows_by_month = {}
+            for row_id in matches:
+                other = self._rows[row_id].split(_FIELD_SEPARATOR)
+                if other[:_AMOUNT_INDEX] + other[_AMOUNT_INDEX + 1 : _DATE_INDEX] == key:
+                    rows_by_month.setdefault(other[_DATE_INDEX][:7], []).append(other)
+        installments = [row]
+        max_cents = _get_cents(row) + 1
+        while installments[-1][_DATE_INDEX][8:10] == "01":
+            month = _get_previous_month(installments[-1][_DATE_INDEX])
+            min_cents = _get_cents(installments[-1])
+            previous = [
+                other
+                for other in rows_by_month.get(month, [])
+                if min_cents <= _get_cents(other) <= max_cents
+            ]
+            if not previous:
+                break
+            installments.append(previous[0])
+        record = dict(zip(EXPENSE_COLUMNS, installments[-1]))
+        record[AMOUNT_COLUMN] = sum(map(_get_cents, installments)) / 100
+        record[INSTALLMENTS_COLUMN] = len(installments)
+        return record
+
+    def get_num_rows(self) -> int:
+        self._refresh()
+        return sum(len(indexed_file.row_ids) for indexed_file in self._files.values())
+
+
+search_index = SearchIndex(PATH_TO_EXPENSE_FILES_CURRENT, EXPENSE_STORE_REFRESH_SECONDS)
@@ -0,0 +1,342 @@
+import csv
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from core.backup import BackupPolicy, format_journal_timestamp, save_snapshot_if_due
+from core.config import (
+    AMOUNT_COLUMN,
+    CATEGORY_COLUMN,
+    COUNT_COLUMN,
+    CURRENCY_COLUMN,
+    DATE_COLUMN,
+    DESCRIPTION_COLUMN,
+    DEVELOPING,
+    EXPENSE_COLUMNS,
+    JOURNAL_COLUMNS,
+    JOURNAL_FILENAME,
+    MONTH_COLUMN,
+    NAME_COLUMN,
+    PATH_TO_EXPENSE_FILES_CURRENT,
+    PATH_TO_EXPENSE_FILES_CURRENT_BACKUP,
+    PATH_TO_EXPENSE_FILES_DEV,
+    PATH_TO_EXPENSE_FILES_DEV_BACKUP,
+    SQLITE_BUSY_TIMEOUT_SECONDS,
+    SQLITE_FILENAME,
+    STORAGE_BACKEND,
+)
+from core.files import append_rows_to_csv, locked_append, write_rows_to_csv
+from core.instrumentation import count, timed
+
+# Appending is plain `csv`/`sqlite3`, so adding an expense never imports pandas.
+# Only the readers import it, when they are called.
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def get_next_month(month: str) -> str:
+    year, month = int(month[:4]), int(month[5:7])
+    return f"{year + month // 12}-{month % 12 + 1:02d}"
+
+
+class ExpenseStorage(ABC):
+    # Where expenses are kept. Months are `YYYY-MM` strings and ranges of months
+    # are half-open, [start_month, end_month), with `None` meaning "until the
+    # last month".
+
+    # Stores the rows and returns where each month was written to.
+    @abstractmethod
+    def append_rows(self, rows_by_month: dict[str, list[list]]) -> dict[str, str]:
+        pass
+
+    @abstractmethod
+    def get_months(self) -> list[str]:
+        pass
+
+    @abstractmethod
+    def read_range(
+        self, start_month: str, end_month: str | None = None
+    ) -> "pd.DataFrame":
+        pass
+
+    # Amount totals and counts per (month, day, category, currency).
+    @abstractmethod
+    def aggregate_range(
+        self, start_month: str, end_month: str | None = None
+    ) -> "pd.DataFrame":
+        pass
+
+    # Changes whenever the stored expenses change.
+    @abstractmethod
+    def get_version(self) -> int:
+        pass
+
+    def read_month(self, month: str) -> "pd.DataFrame":
+        return self.read_range(month, get_next_month(month))
+
+
+class CsvStorage(ExpenseStorage):
+    # One `<prefix>_YYYY-MM.csv` file per month, plus one backup folder per
+    # month with a journal that records every appended line with the time it
+    # was added and gzip'd snapshots of the month file (see `core/backup.py`).
+    def __init__(
+        self,
+        folder_path: Path,
+        backup_path: Path,
+        prefix: str = "expense",
+        backup_policy: BackupPolicy | None = None,
+    ):
+        self.folder_path = Path(folder_path)
+        self.backup_path = Path(backup_path)
+        self.prefix = prefix
+        self.backup_policy = backup_policy or BackupPolicy()
+
+    def get_filepath(self, month: str) -> Path:
+        return self.folder_path / f"{self.prefix}_{month}.csv"
+
+    @timed
+    def append_rows(self, rows_by_month: dict[str, list[list]]) -> dict[str, str]:
+        locations = {}
+        for month, rows in sorted(rows_by_month.items()):
+            expense_filepath = self.get_filepath(month)
+            month_backup_path = self.backup_path / month
+            # The month file stays locked until the rows are journaled, and the
+            # time is taken under the lock, so journal lines are in the order
+            # the rows reached the file and a snapshot holds exactly the lines
+            # up to its time.
+            with locked_append(expense_filepath) as file:
+                timestamp = datetime.now()
+                write_rows_to_csv(file, rows, EXPENSE_COLUMNS)
+                journal_rows = [
+                    [format_journal_timestamp(timestamp), *row] for row in rows
+                ]
+                append_rows_to_csv(
+                    month_backup_path / JOURNAL_FILENAME, journal_rows, JOURNAL_COLUMNS
+                )
+                save_snapshot_if_due(
+                    expense_filepath, month_backup_path, timestamp, self.backup_policy
+                )
+            locations[month] = str(expense_filepath)
+            count("storage.rows_appended", len(rows))
+        return locations
+
+    def get_months(self) -> list[str]:
+        start = len(self.prefix) + 1
+        return sorted(
+            p.stem[start:] for p in self.folder_path.glob(f"{self.prefix}_*.csv")
+        )
+
+    def read_range(
+        self, start_month: str, end_month: str | None = None
+    ) -> "pd.DataFrame":
+        from core.utils import create_expense_df, read_expense_csv
+
+        months = [
+            month
+            for month in self.get_months()
+            if start_month <= month and (end_month is None or month < end_month)
+        ]
+        dfs = {month: read_expense_csv(self.get_filepath(month)) for month in months}
+        return create_expense_df(dfs, months)
+
+    def aggregate_range(
+        self, start_month: str, end_month: str | None = None
+    ) -> "pd.DataFrame":
+        from core.aggregates import build_aggregate_cube
+
+        return build_aggregate_cube(self.read_range(start_month, end_month))
+
+    def get_version(self) -> int:
+        filepaths = self.folder_path.glob(f"{self.prefix}_*.csv")
+        return hash(tuple(sorted((str(p), os.stat(p).st_mtime_ns) for p in filepaths)))
+
+
+_SQL_COLUMNS = {
+    NAME_COLUMN: "TEXT NOT NULL",
+    CATEGORY_COLUMN: "TEXT NOT NULL",
+    AMOUNT_COLUMN: "REAL NOT NULL",
+    CURRENCY_COLUMN: "TEXT NOT NULL",
+    DESCRIPTION_COLUMN: "TEXT NOT NULL",
+    DATE_COLUMN: "TEXT NOT NULL",
+}
+_QUOTED_COLUMNS = ", ".join(f'"{column}"' for column in EXPENSE_COLUMNS)
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS expenses (
+    id INTEGER PRIMARY KEY,
+    {", ".join(f'"{column}" {kind}' for column, kind in _SQL_COLUMNS.items())}
+);
+CREATE TABLE IF NOT EXISTS months (month TEXT PRIMARY KEY);
+CREATE INDEX IF NOT EXISTS expenses_date ON expenses ("{DATE_COLUMN}");
+CREATE INDEX IF NOT EXISTS expenses_currency_date
+    ON expenses ("{CURRENCY_COLUMN}", "{DATE_COLUMN}");
+CREATE INDEX IF NOT EXISTS expenses_category_date
+    ON expenses ("{CATEGORY_COLUMN}", "{DATE_COLUMN}");
+"""
+
+
+class SqliteStorage(ExpenseStorage):
+    # All expenses in one SQLite table, indexed by date so that reading or
+    # aggregating a range of months only touches the rows of that range.
+    # Dates are stored as `YYYY-MM-DD` text, so comparing them with `YYYY-MM`
+    # bounds selects whole months.
+    def __init__(self, filepath: Path):
+        self.filepath = Path(filepath)
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            os.makedirs(self.filepath.parent, exist_ok=True)
+        connection = sqlite3.connect(self.filepath, timeout=SQLITE_BUSY_TIMEOUT_SECONDS)
+        if not self._initialized:
+            connection.executescript(_SCHEMA)
+            self._initialized = True
+        return connection
+
+    def _get_bounds(self, start_month: str, end_month: str | None) -> tuple[str, str]:
+        return start_month, "9999" if end_month is None else end_month
+
+    @timed
+    def append_rows(self, rows_by_month: dict[str, list[list]]) -> dict[str, str]:
+        connection = self._connect()
+        try:
+            # One transaction for the whole batch.
+            with connection:
+                connection.executemany(
+                    f"INSERT INTO expenses ({_QUOTED_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)",
+                    [row for rows in rows_by_month.values() for row in rows],
+                )
+                connection.executemany(
+                    "INSERT OR IGNORE INTO months (month) VALUES (?)",
+                    [(month,) for month in rows_by_month],
+                )
+        finally:
+            connection.close()
+        return {month: f"{self.filepath} ({month})" for month in rows_by_month}
+
+    def get_months(self) -> list[str]:
+        connection = self._connect()
+        try:
+            rows = connection.execute("SELECT month FROM months ORDER BY month")
+            return [month for (month,) in rows]
+        finally:
+            connection.close()
+
+    def read_range(
+        self, start_month: str, end_month: str | None = None
+    ) -> "pd.DataFrame":
+        import pandas as pd
+
+        from core.utils import apply_expense_dtypes
+
+        connection = self._connect()
+        try:
+            df = pd.read_sql_query(
+                f'SELECT {_QUOTED_COLUMNS} FROM expenses WHERE "{DATE_COLUMN}" >= ? '
+                f'AND "{DATE_COLUMN}" < ? ORDER BY "{DATE_COLUMN}", id',
+                connection,
+                params=self._get_bounds(start_month, end_month),
+            )
+        finally:
+            connection.close()
+        return apply_expense_dtypes(df)
+
+    def aggregate_range(
+        self, start_month: str, end_month: str | None = None
+    ) -> "pd.DataFrame":
+        import pandas as pd
+
+        from core.utils import apply_expense_dtypes
+
+        connection = self._connect()
+        try:
+            cube = pd.read_sql_query(
+                f'SELECT substr("{DATE_COLUMN}", 1, 7) AS "{MONTH_COLUMN}", '
+                f'"{DATE_COLUMN}", "{CATEGORY_COLUMN}", "{CURRENCY_COLUMN}", '
+                f'SUM("{AMOUNT_COLUMN}") AS "{AMOUNT_COLUMN}", '
+                f'COUNT(*) AS "{COUNT_COLUMN}" FROM expenses '
+                f'WHERE "{DATE_COLUMN}" >= ? AND "{DATE_COLUMN}" < ? '
+                f'GROUP BY "{DATE_COLUMN}", "{CATEGORY_COLUMN}", "{CURRENCY_COLUMN}" '
+                f'ORDER BY "{DATE_COLUMN}", "{CATEGORY_COLUMN}"',
+                connection,
+                params=self._get_bounds(start_month, end_month),
+            )
+        finally:
+            connection.close()
+        return apply_expense_dtypes(cube)
+
+    def get_version(self) -> int:
+        # Expenses are only ever inserted, so the highest id identifies the data.
+        connection = self._connect()
+        try:
+            (version,) = connection.execute("SELECT MAX(id) FROM expenses").fetchone()
+            return version or 0
+        finally:
+            connection.close()
+
+    def is_empty(self) -> bool:
+        return self.get_version() == 0
+
+
+def get_csv_storage() -> CsvStorage:
+    if DEVELOPING is False:
+        return CsvStorage(
+            PATH_TO_EXPENSE_FILES_CURRENT, PATH_TO_EXPENSE_FILES_CURRENT_BACKUP
+        )
+    return CsvStorage(PATH_TO_EXPENSE_FILES_DEV, PATH_TO_EXPENSE_FILES_DEV_BACKUP, "dev")
+
+
+def get_sqlite_storage() -> SqliteStorage:
+    folder_path = (
+        PATH_TO_EXPENSE_FILES_DEV if DEVELOPING else PATH_TO_EXPENSE_FILES_CURRENT
+    )
+    return SqliteStorage(folder_path / SQLITE_FILENAME)
+
+
+def get_storage() -> ExpenseStorage:
+    if STORAGE_BACKEND == "sqlite":
+        return get_sqlite_storage()
+    return get_csv_storage()
+
+
+def import_csv_storage(
+    csv_storage: CsvStorage, sqlite_storage: SqliteStorage, batch_size: int = 100_000
+) -> int:
+    # Copies every month file into the database, a few large transactions at a
+    # time. Returns the number of imported expenses.
+    num_rows = 0
+    rows_by_month = {}
+    batch_rows = 0
+    for month in csv_storage.get_months():
+        filepath = csv_storage.get_filepath(month)
+        with open(filepath, newline="") as file:
+            reader = csv.reader(file)
+            columns = next(reader, None)
+            # An empty month file has no expenses to import.
+            if columns is None:
+                continue
+            missing = [column for column in EXPENSE_COLUMNS if column not in columns]
+            if missing:
+                raise ValueError(
+                    f"{filepath} is missing the columns: {', '.join(missing)}."
+                )
+            indexes = [columns.index(column) for column in EXPENSE_COLUMNS]
+            amount_index = columns.index(AMOUNT_COLUMN)
+            rows = []
+            for row in reader:
+                if not row:
+                    continue
+                row[amount_index] = float(row[amount_index])
+                rows.append([row[index] for index in indexes])
+        rows_by_month[month] = rows
+        batch_rows += len(rows)
+        num_rows += len(rows)
+        if batch_rows >= batch_size:
+            sqlite_storage.append_rows(rows_by_month)
+            rows_by_month = {}
+            batch_rows = 0
+    if rows_by_month:
+        sqlite_storage.append_rows(rows_by_month)
+    return num_rows
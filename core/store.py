@@ -0,0 +1,341 @@
+import threading
+import time
+from bisect import bisect_left
+from dataclasses import dataclass
+from pathlib import Path
+
+import pandas as pd
+
+from core.aggregates import CUBE_KEYS, build_aggregate_cube, sum_cube
+from core.config import (
+    CATEGORY_COLUMN,
+    CURRENCY_COLUMN,
+    DATE_COLUMN,
+    EXPENSE_STORE_REFRESH_SECONDS,
+    PATH_TO_EXPENSE_FILES_CURRENT,
+    STORAGE_BACKEND,
+    SUPPORTED_CURRENCIES,
+)
+from core.files import ReadPosition, get_end_position, get_stat_key, read_appended
+from core.fx import fx_table
+from core.income import income_index
+from core.instrumentation import count, timed
+from core.loader import load_files
+from core.storage import (
+    CsvStorage,
+    ExpenseStorage,
+    get_next_month,
+    get_sqlite_storage,
+)
+from core.utils import (
+    create_expense_df,
+    parse_expense_rows,
+    read_expense_csv,
+)
+
+# Share of the rows in changed months past which the consolidated frames are
+# concatenated again.
+_MAX_CHANGED_SHARE = 0.25
+
+
+class _Consolidated:
+    # Month frames concatenated in month order, with the row offset where each
+    # month starts, so a range of months is a binary search plus a slice.
+    # Months that change afterwards (an append, a new or a deleted month file)
+    # are kept apart instead of concatenating every month again: a range
+    # without them is still a slice, and one with them is put together from
+    # slices and their frames. Once they hold `_MAX_CHANGED_SHARE` of the rows,
+    # everything is concatenated again.
+    def __init__(self, month_dfs: dict[str, pd.DataFrame]):
+        self._build(month_dfs)
+
+    def _build(self, month_dfs: dict[str, pd.DataFrame]) -> None:
+        self.months = sorted(month_dfs)
+        self.offsets = [0]
+        for month in self.months:
+            self.offsets.append(self.offsets[-1] + len(month_dfs[month]))
+        self.df = create_expense_df(month_dfs, self.months)
+        self._month_dfs = dict(month_dfs)
+        # Frame of every changed month, None for the deleted ones.
+        self._changed = {}
+        # Months of the consolidated frame and changed months, in order.
+        self._all_months = self.months
+
+    def update(self, month_dfs: dict[str, pd.DataFrame]) -> None:
+        # Month frames are replaced, never modified, when their file changes,
+        # so changed months are the ones whose frame is another object.
+        for month in self._month_dfs.keys() | month_dfs.keys():
+            df = month_dfs.get(month)
+            if df is not self._month_dfs.get(month):
+                self._changed[month] = df
+        self._month_dfs = dict(month_dfs)
+        self._all_months = sorted(self._month_dfs.keys() | self._changed.keys())
+        num_changed_rows = sum(len(df) for df in self._changed.values() if df is not None)
+        if num_changed_rows > _MAX_CHANGED_SHARE * len(self.df):
+            self._build(month_dfs)
+
+    def _slice_base(self, start_month: str, end_month: str | None) -> pd.DataFrame:
+        start = bisect_left(self.months, start_month)
+        end = (
+            len(self.months) if end_month is None else bisect_left(self.months, end_month)
+        )
+        return self.df.iloc[self.offsets[start] : self.offsets[max(start, end)]]
+
+    def slice(self, start_month: str, end_month: str | None) -> pd.DataFrame:
+        start = bisect_left(self._all_months, start_month)
+        end = (
+            len(self._all_months)
+            if end_month is None
+            else bisect_left(self._all_months, end_month)
+        )
+        months = self._all_months[start:end]
+        if not any(month in self._changed for month in months):
+            return self._slice_base(start_month, end_month)
+        # Runs of unchanged months are sliced from the consolidated frame.
+        pieces = []
+        run_start = None
+        for month in months:
+            if month not in self._changed:
+                run_start = run_start or month
+                continue
+            if run_start is not None:
+                pieces.append(self._slice_base(run_start, month))
+                run_start = None
+            if self._changed[month] is not None:
+                pieces.append(self._changed[month])
+        if run_start is not None:
+            pieces.append(self._slice_base(run_start, end_month))
+        return create_expense_df(dict(enumerate(pieces)), list(range(len(pieces))))
+
+
+@dataclass
+class _MonthFile:
+    position: ReadPosition
+    df: pd.DataFrame
+    cube: pd.DataFrame
+
+
+def _load_month_file(filepath: Path) -> _MonthFile:
+    while True:
+        stat_key = get_stat_key(filepath)
+        df = read_expense_csv(filepath)
+        # Retry if a writer appended while the file was being parsed, so the
+        # position matches exactly the rows in the frame.
+        if get_stat_key(filepath) == stat_key:
+            break
+    df = df.sort_values(DATE_COLUMN, kind="stable", ignore_index=True)
+    return _MonthFile(get_end_position(filepath, stat_key), df, build_aggregate_cube(df))
+
+
+class ExpenseStore:
+    # Process-wide cache of the month files. Each file is kept with the inode,
+    # mtime and size it had when parsed, plus the byte offset parsed up to. On
+    # access only files that changed are read again: when a file only grew,
+    # just the appended bytes are parsed and folded into its frame and
+    # aggregates; any other change parses the whole file.
+    def __init__(
+        self,
+        folder_path: Path,
+        refresh_seconds: float = EXPENSE_STORE_REFRESH_SECONDS,
+        prefix: str = "expense",
+    ):
+        self.folder_path = Path(folder_path)
+        self.refresh_seconds = refresh_seconds
+        self.prefix = prefix
+        self._files = {}
+        self._lock = threading.Lock()
+        self._refreshed_at = None
+        self.version = 0
+        # Milliseconds the last full parse of every month file took.
+        self.load_timings = {}
+        self._consolidated_version = None
+        self._rows = None
+        self._cube = None
+
+    def _get_month(self, filepath: Path) -> str:
+        return filepath.stem[len(self.prefix) + 1 :]
+
+    def _load_appended(self, filepath: Path, month_file: _MonthFile) -> bool:
+        # Parses only the lines appended after `month_file.position`. Returns
+        # False when the file was rewritten instead, so it has to be parsed
+        # again.
+        data, position, appended = read_appended(filepath, month_file.position)
+        if not appended:
+            return False
+        month_file.position = position
+        if not data:
+            return True
+        new_df = parse_expense_rows(data)
+        count("store.rows_appended", len(new_df))
+        month_file.df = create_expense_df(
+            {"old": month_file.df, "new": new_df}, ["old", "new"]
+        ).sort_values(DATE_COLUMN, kind="stable", ignore_index=True)
+        month_file.cube = sum_cube(
+            create_expense_df(
+                {"old": month_file.cube, "new": build_aggregate_cube(new_df)},
+                ["old", "new"],
+            ),
+            CUBE_KEYS,
+        ).sort_values([DATE_COLUMN, CATEGORY_COLUMN], ignore_index=True)
+        self.version += 1
+        return True
+
+    @timed
+    def _refresh(self, force: bool = False) -> None:
+        with self._lock:
+            # Listing and stat'ing every month file is cheap but grows with the
+            # history, so it happens at most once per `refresh_seconds`.
+            now = time.monotonic()
+            if (
+                not force
+                and self._refreshed_at is not None
+                and now - self._refreshed_at < self.refresh_seconds
+            ):
+                return
+            self._refreshed_at = now
+            seen = set()
+            filepaths_to_load = []
+            for filepath in self.folder_path.glob(f"{self.prefix}_*.csv"):
+                seen.add(filepath)
+                month_file = self._files.get(filepath)
+                if (
+                    month_file is not None
+                    and month_file.position.stat_key == get_stat_key(filepath)
+                ):
+                    continue
+                if month_file is None or not self._load_appended(filepath, month_file):
+                    filepaths_to_load.append(filepath)
+            # New or rewritten files (on the first refresh, every month file) are
+            # parsed concurrently.
+            count("store.files_loaded", len(filepaths_to_load))
+            month_files, timings = load_files(filepaths_to_load, _load_month_file)
+            self._files.update(month_files)
+            self.load_timings.update(timings)
+            self.version += len(month_files)
+            for filepath in set(self._files) - seen:
+                del self._files[filepath]
+                self.version += 1
+
+    def _get_files(self) -> dict[Path, _MonthFile]:
+        # A copy taken under the lock, as a refresh in another thread may add or
+        # remove files while the caller goes through them.
+        self._refresh()
+        with self._lock:
+            return dict(self._files)
+
+    def get_dfs(self) -> dict[str, pd.DataFrame]:
+        return {
+            self._get_month(filepath): month_file.df
+            for filepath, month_file in self._get_files().items()
+        }
+
+    def get_version(self) -> int:
+        # Changes whenever a month file is added, removed or modified.
+        self._refresh()
+        return self.version
+
+    def refresh(self) -> None:
+        # Picks up changes right away, for callers that know they just wrote.
+        self._refresh(force=True)
+
+    def get_dates(self) -> list[str]:
+        return sorted(self.get_dfs())
+
+    def get_month(self, month: str) -> pd.DataFrame:
+        return self.get_dfs()[month]
+
+    def get_month_cube(self, month: str) -> pd.DataFrame:
+        for filepath, month_file in self._get_files().items():
+            if self._get_month(filepath) == month:
+                return month_file.cube
+        raise KeyError(month)
+
+    def _get_consolidated(self) -> tuple[_Consolidated, _Consolidated]:
+        self._refresh()
+        with self._lock:
+            if self._consolidated_version != self.version:
+                months = {
+                    self._get_month(filepath): month_file
+                    for filepath, month_file in self._files.items()
+                }
+                month_dfs = {month: month_file.df for month, month_file in months.items()}
+                cubes = {month: month_file.cube for month, month_file in months.items()}
+                if self._rows is None:
+                    self._rows = _Consolidated(month_dfs)
+                    self._cube = _Consolidated(cubes)
+                else:
+                    self._rows.update(month_dfs)
+                    self._cube.update(cubes)
+                self._consolidated_version = self.version
+            return self._rows, self._cube
+
+    def get_range(self, start_month: str, end_month: str | None = None) -> pd.DataFrame:
+        # Expenses of the months in [start_month, end_month).
+        rows, _ = self._get_consolidated()
+        return rows.slice(start_month, end_month)
+
+    @timed
+    def get_cube(self, start_month: str, end_month: str | None = None) -> pd.DataFrame:
+        # Aggregate cells of the months in [start_month, end_month).
+        _, cube = self._get_consolidated()
+        return cube.slice(start_month, end_month)
+
+
+class DatabaseExpenseStore:
+    # Same interface as `ExpenseStore` for storages that can answer range and
+    # aggregate queries themselves, so nothing is kept in memory and every query
+    # only costs as much as the selected range.
+    def __init__(self, storage: ExpenseStorage):
+        self.storage = storage
+
+    def get_version(self) -> int:
+        return self.storage.get_version()
+
+    def refresh(self) -> None:
+        pass
+
+    def get_dates(self) -> list[str]:
+        return self.storage.get_months()
+
+    def get_month(self, month: str) -> pd.DataFrame:
+        return self.storage.read_month(month)
+
+    def get_month_cube(self, month: str) -> pd.DataFrame:
+        return self.storage.aggregate_range(month, get_next_month(month))
+
+    def get_range(self, start_month: str, end_month: str | None = None) -> pd.DataFrame:
+        return self.storage.read_range(start_month, end_month)
+
+    def get_cube(self, start_month: str, end_month: str | None = None) -> pd.DataFrame:
+        return self.storage.aggregate_range(start_month, end_month)
+
+
+def create_expense_store(storage: ExpenseStorage) -> ExpenseStore | DatabaseExpenseStore:
+    if isinstance(storage, CsvStorage):
+        return ExpenseStore(storage.folder_path, prefix=storage.prefix)
+    return DatabaseExpenseStore(storage)
+
+
+if STORAGE_BACKEND == "sqlite":
+    expense_store = DatabaseExpenseStore(get_sqlite_storage())
+else:
+    expense_store = ExpenseStore(PATH_TO_EXPENSE_FILES_CURRENT)
+
+
+def get_currencies() -> list[str]:
+    # Currencies of the incomes and of every expense.
+    dates = expense_store.get_dates()
+    currencies = set(SUPPORTED_CURRENCIES)
+    if dates:
+        currencies.update(expense_store.get_cube(dates[0])[CURRENCY_COLUMN].unique())
+    return sorted(currencies)
+
+
+def get_data_version() -> tuple[int, int, int]:
+    # Identifies the expenses, incomes and exchange rates the dashboard results
+    # are built from.
+    return (
+        expense_store.get_version(),
+        income_index.get_version(),
+        fx_table.get_version(),
+    )
@@ -0,0 +1,124 @@
+import math
+import re
+
+import pandas as pd
+
+from core.config import AMOUNT_COLUMN, DATE_COLUMN, EXPENSE_COLUMNS
+
+# One `{column} operator value` clause of a DataTable filter query. The table
+# prefixes operators with `s` or `i` for case (in)sensitive matching.
+_FILTER_PART = re.compile(
+    r"^\s*\{(?P<name>[^}]*)\}\s*(?P<case>[si]?)"
+    r"(?P<operator>contains|datestartswith|>=|<=|!=|<|>|=|ge|le|lt|gt|ne|eq)\s*"
+    r"(?P<value>.*?)\s*$"
+)
+_SYMBOLS = {">=": "ge", "<=": "le", "<": "lt", ">": "gt", "!=": "ne", "=": "eq"}
+
+
+def get_table_columns() -> list[dict]:
+    types = {AMOUNT_COLUMN: "numeric", DATE_COLUMN: "datetime"}
+    return [
+        {"name": column, "id": column, "type": types.get(column, "text")}
+        for column in EXPENSE_COLUMNS
+    ]
+
+
+def _split_filter_part(
+    filter_part: str,
+) -> tuple[str | None, str | None, str | None, bool]:
+    match = _FILTER_PART.match(filter_part)
+    if match is None:
+        return None, None, None, True
+    operator = _SYMBOLS.get(match["operator"], match["operator"])
+    value_part = match["value"]
+    if (
+        len(value_part) > 1
+        and value_part[0] == value_part[-1]
+        and value_part[0] in "'\"`"
+    ):
+        value = value_part[1:-1].replace("\\" + value_part[0], value_part[0])
+    else:
+        value = value_part
+    return match["name"], operator, value, match["case"] != "i"
+
+
+def _filter_mask(
+    column: pd.Series, operator: str, value: str, case_sensitive: bool
+) -> pd.Series:
+    if operator in ("contains", "datestartswith"):
+        if pd.api.types.is_datetime64_any_dtype(column):
+            column = column.dt.strftime("%Y-%m-%d")
+        text = column.astype(str)
+        if operator == "contains":
+            return text.str.contains(value, case=case_sensitive, regex=False)
+        return text.str.startswith(value)
+    if pd.api.types.is_datetime64_any_dtype(column):
+        value = pd.Timestamp(value)
+    elif pd.api.types.is_numeric_dtype(column):
+        value = float(value)
+    else:
+        column = column.astype(str)
+        if not case_sensitive:
+            column = column.str.lower()
+            value = value.lower()
+    return {
+        "ge": column.__ge__,
+        "le": column.__le__,
+        "lt": column.__lt__,
+        "gt": column.__gt__,
+        "ne": column.__ne__,
+        "eq": column.__eq__,
+    }[operator](value)
+
+
+def filter_df(df: pd.DataFrame, filter_query: str | None) -> pd.DataFrame:
+    if not filter_query:
+        return df
+    mask = pd.Series(True, index=df.index)
+    for filter_part in filter_query.split(" && "):
+        name, operator, value, case_sensitive = _split_filter_part(filter_part)
+        if name not in df.columns:
+            continue
+        try:
+            mask &= _filter_mask(df[name], operator, value, case_sensitive)
+        except (TypeError, ValueError):
+            # A half-typed value such as a partial date matches nothing.
+            mask &= False
+    return df[mask]
+
+
+def _get_sort_key(column: pd.Series) -> pd.Series:
+    # Categorical columns sort in the order of their categories, which follows
+    # `core/config.py`, so they are reordered to sort alphabetically like text.
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return column.cat.reorder_categories(sorted(column.cat.categories))
+    return column
+
+
+def sort_df(df: pd.DataFrame, sort_by: list[dict] | None) -> pd.DataFrame:
+    sort_by = [column for column in sort_by or [] if column["column_id"] in df.columns]
+    if not sort_by:
+        return df
+    return df.sort_values(
+        [column["column_id"] for column in sort_by],
+        ascending=[column["direction"] == "asc" for column in sort_by],
+        kind="stable",
+        key=_get_sort_key,
+    )
+
+
+def get_table_page(
+    df: pd.DataFrame,
+    page_current: int,
+    page_size: int,
+    sort_by: list[dict] | None,
+    filter_query: str | None,
+) -> tuple[pd.DataFrame, int, int]:
+    # Filters and sorts on the server and only returns the visible page, so the
+    # browser receives `page_size` rows whatever the size of the selection. The
+    # page is clamped to the last one when a filter leaves fewer pages.
+    df = sort_df(filter_df(df, filter_query), sort_by)
+    page_count = max(1, math.ceil(len(df) / page_size))
+    page_current = min(page_current or 0, page_count - 1)
+    page_df = df.iloc[page_current * page_size : (page_current + 1) * page_size]
+    return page_df, page_current, page_count
@@ -1,69 +1,124 @@
-import json
+import io
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
 
 import pandas as pd
-from dateutil.relativedelta import relativedelta
 
+from core.cache import is_cache_enabled, read_through_sidecar
 from core.config import (
+    ALL_CURRENCIES,
     AMOUNT_COLUMN,
     CATEGORY_COLUMN,
     CURRENCY_COLUMN,
     DATE_COLUMN,
-    DEFAULT_CURRENCY,
     DEFAULT_DESCRIPTION,
     DESCRIPTION_COLUMN,
+    EXPENSE_CATEGORIES,
+    EXPENSE_COLUMNS,
     NAME_COLUMN,
-    PATH_TO_INCOME_FILE,
+    REPORTING_CURRENCY,
+    SAVINGS_CATEGORY,
+    SUPPORTED_CURRENCIES,
 )
+from core.fx import get_converted_income
+from core.income import income_index
+from core.instrumentation import timed
+from core.loader import load_files
 
+# Columns whose values come from the closed sets in `core/config.py`.
+_FIXED_CATEGORIES = {
+    CATEGORY_COLUMN: EXPENSE_CATEGORIES,
+    CURRENCY_COLUMN: SUPPORTED_CURRENCIES,
+}
+_ENCODED_COLUMNS = [NAME_COLUMN, DESCRIPTION_COLUMN]
 
-def get_income(date: Optional[str] = None, currency: str = DEFAULT_CURRENCY) -> int:
-    income_dict = dict()
-    with open(PATH_TO_INCOME_FILE, "r") as file:
-        income_dict = json.load(file)
-    income_df = pd.DataFrame(income_dict)
-    date_curr = date
-    if date is None:
-        return income_df.iloc[:, -1][currency]
-    while True:
-        if date_curr in income_df:
-            break
-        date_curr = (
-            datetime.strptime(date_curr, "%Y-%m") - relativedelta(months=1)
-        ).strftime("%Y-%m")
-    date_target = date_curr
-    while date != date_curr:
-        date_curr = (
-            datetime.strptime(date_curr, "%Y-%m") + relativedelta(months=1)
-        ).strftime("%Y-%m")
-        income_df[date_curr] = income_df[date_target]
-    income_df.to_json(PATH_TO_INCOME_FILE, indent=4)
-    return income_df[date_curr][currency]
-
-
-def create_expense_df(dfs: pd.DataFrame, dates: list[str]):
-    df = pd.DataFrame()
-    for date in dates:
-        df = pd.concat([df, dfs[date]], ignore_index=True)
-    return df
 
+def _get_categorical_dtype(
+    column: pd.Series, categories: list[str]
+) -> pd.CategoricalDtype:
+    # Every month gets the same categories, so months concatenate without being
+    # encoded again. Values missing from `core/config.py`, such as the ones of
+    # older files, are kept as extra categories instead of being lost.
+    extra_categories = sorted(set(column.dropna().unique()) - set(categories))
+    return pd.CategoricalDtype([*categories, *extra_categories])
 
+
+def apply_categorical_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    # Stores the repeated strings once per frame with small integer codes per
+    # row. Names and descriptions are open sets, but the same few values come up
+    # month after month (most descriptions are the default one).
+    dtypes = {
+        column: _get_categorical_dtype(df[column], categories)
+        for column, categories in _FIXED_CATEGORIES.items()
+        if column in df
+    }
+    for column in _ENCODED_COLUMNS:
+        if column in df:
+            dtypes[column] = "category"
+    return df.astype(dtypes)
+
+
+@timed
+def create_expense_df(dfs: dict[str, pd.DataFrame], dates: list[str]) -> pd.DataFrame:
+    if not dates:
+        return pd.DataFrame(columns=EXPENSE_COLUMNS)
+    df = pd.concat([dfs[date] for date in dates], ignore_index=True)
+    # Columns whose categories differ between months concatenate to strings.
+    return apply_categorical_dtypes(df)
+
+
+def create_table_records(df: pd.DataFrame) -> list[dict]:
+    df = df.assign(**{DATE_COLUMN: df[DATE_COLUMN].dt.strftime("%Y-%m-%d")})
+    return df.to_dict("records")
+
+
+def get_month_from_filepath(filepath: Path) -> str:
+    return str(filepath.stem)[8:]
+
+
+def apply_expense_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.astype({AMOUNT_COLUMN: "float64"}).assign(
+        **{DATE_COLUMN: pd.to_datetime(df[DATE_COLUMN], format="%Y-%m-%d")}
+    )
+    return apply_categorical_dtypes(df)
+
+
+def parse_expense_rows(data: bytes) -> pd.DataFrame:
+    # Parses header-less CSV lines, such as the ones appended to a month file.
+    df = pd.read_csv(io.BytesIO(data), header=None, names=EXPENSE_COLUMNS)
+    return apply_expense_dtypes(df)
+
+
+def _parse_expense_csv(filepath: Path) -> pd.DataFrame:
+    return apply_expense_dtypes(pd.read_csv(filepath))
+
+
+@timed
+def read_expense_csv(filepath: Path) -> pd.DataFrame:
+    if not is_cache_enabled():
+        return _parse_expense_csv(filepath)
+    return read_through_sidecar(filepath, _parse_expense_csv)
+
+
+@timed
 def load_csvs_to_dict(folder_path: str) -> dict:
     path = Path(folder_path)
-    dataframes = {str(p.stem)[8:]: pd.read_csv(p) for p in path.glob("expense_*.csv")}
+    dfs, _ = load_files(sorted(path.glob("expense_*.csv")), read_expense_csv)
+    dataframes = {get_month_from_filepath(p): df for p, df in dfs.items()}
     return dataframes
 
 
+@timed
 def create_amount_left_df(
     df: pd.DataFrame, currency: str, num_months: str = 1
 ) -> pd.DataFrame:
-    spend = df.loc[df[CATEGORY_COLUMN] != "SAVINGS"][AMOUNT_COLUMN].astype(float).sum()
+    spend = df.loc[df[CATEGORY_COLUMN] != SAVINGS_CATEGORY][AMOUNT_COLUMN].sum()
     unique_dates = pd.to_datetime(df[DATE_COLUMN]).dt.strftime("%Y-%m").unique()
-    amount = 0
-    for date in unique_dates:
-        amount += get_income(date=date, currency=currency)
+    if currency == ALL_CURRENCIES:
+        amount = get_converted_income(list(unique_dates))
+        currency = REPORTING_CURRENCY
+    else:
+        amount = sum(income_index.get_many(list(unique_dates), currency))
     amount_left_df = pd.DataFrame(
         {
             NAME_COLUMN: ["Amount left"],
@@ -75,3 +130,15 @@ def create_amount_left_df(
         }
     )
     return amount_left_df
+
+
+def create_memory_report_df(dfs: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    # Bytes used by every column of every month, strings included.
+    months = sorted(dfs)
+    report_df = pd.DataFrame(
+        [dfs[month].memory_usage(index=False, deep=True) for month in months],
+        index=months,
+    )
+    report_df["Total"] = report_df.sum(axis=1)
+    report_df.insert(0, "Rows", [len(dfs[month]) for month in months])
+    return report_df
@@ -0,0 +1,12 @@
+import os
+
+from core.config import WSGI_BIND, WSGI_TIMEOUT_SECONDS, WSGI_WORKERS
+
+# Run the dashboard with `uv run --extra serve gunicorn` from the project root.
+wsgi_app = "wsgi:server"
+bind = WSGI_BIND
+workers = WSGI_WORKERS or os.cpu_count() or 1
+timeout = WSGI_TIMEOUT_SECONDS
+# The expenses are loaded once, before the workers are forked, and shared by
+# them (see `wsgi.py`).
+preload_app = True
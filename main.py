@@ -1,48 +1,350 @@
 import argparse
+import csv
+import sys
+from datetime import datetime
+from pathlib import Path
 
+from core import instrumentation
+from core.backup import restore_csv_storage
 from core.config import (
+    AMOUNT_COLUMN,
+    CATEGORY_COLUMN,
+    CURRENCY_COLUMN,
+    DATE_COLUMN,
     DEFAULT_CATEGORY,
     DEFAULT_CURRENCY,
     DEFAULT_DESCRIPTION,
+    DESCRIPTION_COLUMN,
     EXPENSE_CATEGORIES,
+    EXPENSE_COLUMNS,
+    IMPORT_DATE_FORMATS,
+    INSTALLMENTS_COLUMN,
+    NAME_COLUMN,
+    PATH_TO_EXPENSE_FILES,
+    STORAGE_BACKEND,
+)
+from core.expense import Expense, add_expenses
+from core.search import SearchIndex
+from core.storage import (
+    get_csv_storage,
+    get_sqlite_storage,
+    get_storage,
+    import_csv_storage,
 )
-from core.expense import Expense
 
 
-def main():
+def parse_installments(value: str) -> int:
+    # Accepts "3" as well as "3.0", as spreadsheets tend to write it.
+    installments = float(value)
+    if not installments.is_integer() or installments < 1:
+        raise ValueError(f"{value!r} is not a positive whole number of installments.")
+    return int(installments)
+
+
+def _read_expense(row: dict[str, str]) -> Expense:
+    if not row[NAME_COLUMN]:
+        raise ValueError("the expense has no name.")
+    category = row.get(CATEGORY_COLUMN) or DEFAULT_CATEGORY
+    if category not in EXPENSE_CATEGORIES:
+        raise ValueError(
+            f"invalid category {category!r} (choose from {', '.join(EXPENSE_CATEGORIES)})."
+        )
+    expense = Expense(
+        name=row[NAME_COLUMN],
+        amount=float(row[AMOUNT_COLUMN] or ""),
+        installments=parse_installments(row.get(INSTALLMENTS_COLUMN) or "1"),
+        category=category,
+        description=row.get(DESCRIPTION_COLUMN) or DEFAULT_DESCRIPTION,
+        currency=row.get(CURRENCY_COLUMN) or DEFAULT_CURRENCY,
+    )
+    if row.get(DATE_COLUMN):
+        expense.date = datetime.strptime(row[DATE_COLUMN], "%Y-%m-%d")
+    return expense
+
+
+def read_expenses_file(filepath: str) -> list[Expense]:
+    # A bad file raises a ValueError naming the line, so nothing is added.
+    expenses = []
+    with open(filepath, newline="") as file:
+        reader = csv.DictReader(file)
+        missing = [
+            column
+            for column in (NAME_COLUMN, AMOUNT_COLUMN)
+            if column not in (reader.fieldnames or [])
+        ]
+        if missing:
+            raise ValueError(f"missing required columns: {', '.join(missing)}.")
+        for row in reader:
+            try:
+                expenses.append(_read_expense(row))
+            except ValueError as error:
+                raise ValueError(f"line {reader.line_num}: {error}") from error
+    return expenses
+
+
+def migrate(argv: list[str]) -> None:
+    migrate_parser = argparse.ArgumentParser(
+        prog="uv run main.py migrate",
+        description='Import every month CSV file into the SQLite database. Set \
+                     `STORAGE_BACKEND = "sqlite"` in `core/config.py` afterwards \
+                     to use it.',
+    )
+    migrate_parser.parse_args(argv)
+
+    sqlite_storage = get_sqlite_storage()
+    if not sqlite_storage.is_empty():
+        migrate_parser.error(f"{sqlite_storage.filepath} already contains expenses.")
+    try:
+        num_rows = import_csv_storage(get_csv_storage(), sqlite_storage)
+    except ValueError as error:
+        migrate_parser.error(str(error))
+    print(f"==> {num_rows} expenses imported into {sqlite_storage.filepath}")
+
+
+def serve(argv: list[str]) -> None:
+    serve_parser = argparse.ArgumentParser(
+        prog="uv run main.py serve",
+        description="Keep the expenses in memory and add the expenses sent by other \
+                     `main.py` runs, until interrupted. While it runs, `main.py` \
+                     starts faster and parallel runs share their writes.",
+    )
+    serve_parser.parse_args(argv)
+
+    # Imported here because the daemon needs pandas, which adding an expense
+    # does not.
+    from core.daemon import serve as serve_daemon
+
+    serve_daemon()
+
+
+def memory(argv: list[str]) -> None:
+    memory_parser = argparse.ArgumentParser(
+        prog="uv run main.py memory",
+        description="Print how many bytes every month takes in memory, column by column.",
+    )
+    memory_parser.parse_args(argv)
+
+    from core.store import create_expense_store
+    from core.utils import create_memory_report_df
+
+    expense_store = create_expense_store(get_storage())
+    dfs = {month: expense_store.get_month(month) for month in expense_store.get_dates()}
+    report_df = create_memory_report_df(dfs)
+    print(report_df.to_string())
+    print(f"\n==> {report_df['Total'].sum() / 1024**2:.2f} MiB for {len(dfs)} months")
+
+
+def restore(argv: list[str]) -> None:
+    restore_parser = argparse.ArgumentParser(
+        prog="uv run main.py restore",
+        description="Rebuild the month files as they were at a given time, from the \
+                     backup snapshots and journals. The files are written to a new \
+                     folder unless --in-place is given.",
+    )
+    restore_parser.add_argument(
+        "--at",
+        required=True,
+        type=datetime.fromisoformat,
+        help="The time to go back to, as YYYY-MM-DD or YYYY-MM-DDTHH:MM[:SS].",
+    )
+    restore_parser.add_argument(
+        "-m",
+        "--month",
+        action="append",
+        help="[OPTIONAL] Only restore this month (YYYY-MM). May be repeated.",
+    )
+    restore_parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        help=f"[OPTIONAL] The folder to write the month files to. The default is \
+              `{PATH_TO_EXPENSE_FILES}/restored_<time>`.",
+    )
+    restore_parser.add_argument(
+        "--in-place",
+        action="store_true",
+        help="[OPTIONAL] Replace the current month files. Their current state is \
+              snapshotted first, so this can be undone with another restore.",
+    )
+    args = restore_parser.parse_args(argv)
+
+    if STORAGE_BACKEND != "csv":
+        restore_parser.error("Backups are only kept by the CSV storage.")
+    if args.in_place and args.output is not None:
+        restore_parser.error("--in-place and --output cannot be used together.")
+    output_path = None
+    if not args.in_place:
+        output_path = args.output or (
+            PATH_TO_EXPENSE_FILES / f"restored_{args.at:%Y%m%dT%H%M%S}"
+        )
+
+    storage = get_csv_storage()
+    try:
+        num_rows = restore_csv_storage(storage, args.at, args.month, output_path)
+    except ValueError as error:
+        restore_parser.error(str(error))
+    folder_path = storage.folder_path if output_path is None else output_path
+    for month, month_rows in num_rows.items():
+        if month_rows is None:
+            print(f"==> {month}: no backup, left alone")
+        else:
+            print(f"==> {month}: {month_rows} expenses written to {folder_path}")
+
+
+def parse_column(value: str) -> tuple[str, str]:
+    column, _, name = value.partition("=")
+    if column not in EXPENSE_COLUMNS or not name:
+        raise ValueError(
+            f"{value!r} is not COLUMN=NAME with COLUMN in {EXPENSE_COLUMNS}."
+        )
+    return column, name
+
+
+def import_(argv: list[str]) -> None:
+    import_parser = argparse.ArgumentParser(
+        prog="uv run main.py import",
+        description="Add the expenses of a bank or card statement, a CSV or OFX \
+                     export, to their month files. Expenses already added, by an \
+                     earlier import of an overlapping statement for instance, are \
+                     left out, so importing a statement again adds nothing.",
+    )
+    import_parser.add_argument("statement", type=Path, help="The statement file.")
+    import_parser.add_argument(
+        "--format",
+        choices=["csv", "ofx"],
+        help="[OPTIONAL] The statement format. The default is told from the file \
+              extension.",
+    )
+    import_parser.add_argument(
+        "--column",
+        action="append",
+        type=parse_column,
+        default=[],
+        help=f"[OPTIONAL] The statement column of an expense column, such as \
+              `{NAME_COLUMN}=Descrição`. May be repeated. Columns are otherwise \
+              found by the names of `IMPORT_COLUMN_NAMES` in `core/config.py`.",
+    )
+    import_parser.add_argument(
+        "--rules",
+        type=Path,
+        help="[OPTIONAL] A CSV file with `Pattern` and `Category` columns. The \
+              category of an expense is the one of the first pattern found in its \
+              name, these rules before the `IMPORT_CATEGORY_RULES` of \
+              `core/config.py`.",
+    )
+    import_parser.add_argument(
+        "-cr",
+        "--currency",
+        default=DEFAULT_CURRENCY,
+        help="[OPTIONAL] The currency of the expenses, unless the statement has a \
+              currency column. The default value is defined in the `utils/config.py` \
+              file.",
+    )
+    import_parser.add_argument(
+        "--date-format",
+        action="append",
+        help="[OPTIONAL] The date format of the statement, such as %%m/%%d/%%Y. The \
+              `IMPORT_DATE_FORMATS` of `core/config.py` are tried otherwise.",
+    )
+    import_parser.add_argument(
+        "--negative",
+        action="store_true",
+        help="[OPTIONAL] Expenses are the negative amounts, as in most bank \
+              exports. Always the case for OFX files. Rows that are not expenses \
+              are skipped.",
+    )
+    import_parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="[OPTIONAL] Only print what would be added.",
+    )
+    args = import_parser.parse_args(argv)
+
+    if STORAGE_BACKEND != "csv":
+        import_parser.error("Statements are only imported into the CSV storage.")
+    statement_format = args.format or (
+        "ofx" if args.statement.suffix.lower() in (".ofx", ".qfx") else "csv"
+    )
+
+    # Imported here, like the daemon, as adding one expense does not need it.
+    from core.importer import import_statement, load_category_rules, read_statement
+
+    try:
+        rules = load_category_rules(args.rules)
+        with open(args.statement, newline="", encoding="utf-8-sig") as file:
+            report = import_statement(
+                read_statement(file, statement_format, dict(args.column)),
+                get_csv_storage(),
+                rules,
+                currency=args.currency,
+                date_formats=args.date_format or IMPORT_DATE_FORMATS,
+                negative_expenses=args.negative or statement_format == "ofx",
+                dry_run=args.dry_run,
+            )
+    except (OSError, RuntimeError, ValueError) as error:
+        import_parser.error(f"{args.statement}: {error}")
+    verb = "would be added" if args.dry_run else "added"
+    for month in sorted(report.added | report.duplicates):
+        location = report.locations.get(month, "")
+        print(
+            f"==> {month}: {report.added[month]} expenses {verb}, "
+            f"{report.duplicates[month]} already there"
+            + (f" ({location})" if location else "")
+        )
+    if report.skipped:
+        print(f"==> {report.skipped} rows skipped, as they are not expenses")
+
+
+COMMANDS = {
+    "import": import_,
+    "memory": memory,
+    "migrate": migrate,
+    "restore": restore,
+    "serve": serve,
+}
+
+
+def run():
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        COMMANDS[sys.argv[1]](sys.argv[2:])
+        return
+
     example_str = "usage example:\nuv run main.py -n popcorn -a 3.25 -i 1 -c FOOD -d 'some_description'"
     example_installments_str = "usage example with installments (sneakers cost BRL 500):\nuv run main.py -n sneakers -a 500 -i 3 -c CLOTHES"
+    example_file_str = "usage example adding every expense listed in a CSV file:\nuv run main.py --from-file purchases.csv"
+    example_like_str = "usage example repeating the last expense named like 'coffee', for 4.50:\nuv run main.py --like coffee -a 4.50"
+    commands_str = "other commands (add -h for their options):\nuv run main.py migrate    import the CSV files into the SQLite database\nuv run main.py serve      keep the expenses in memory and write the ones other runs add\nuv run main.py memory     print the memory taken by every month\nuv run main.py restore    rebuild the month files as they were at a given time\nuv run main.py import     add the expenses of a bank or card statement"
     expense_parser = argparse.ArgumentParser(
         prog="uv run main.py",
-        description=f"{example_str}\n\n{example_installments_str}\n\nAdd expenses to CSV's file(s).",
+        description=f"{example_str}\n\n{example_installments_str}\n\n{example_file_str}\n\n{example_like_str}\n\n{commands_str}\n\nAdd expenses to CSV's file(s).",
         formatter_class=argparse.RawDescriptionHelpFormatter,
     )
     expense_parser.add_argument(
         "-n",
         "--name",
-        required=True,
+        required=False,
         type=str,
         help="The name of the expense.",
     )
     expense_parser.add_argument(
         "-a",
         "--amount",
-        required=True,
+        required=False,
         type=float,
         help="The monetary amount of the expense.",
     )
     expense_parser.add_argument(
         "-i",
         "--installments",
-        default=1,
         required=False,
-        type=float,
-        help="[OPTIONAL] The number of installments to pay. The default value is 1.",
+        type=parse_installments,
+        help="[OPTIONAL] The number of installments to pay, a positive whole number. \
+              The amount is split to the cent, the first installments taking the \
+              remaining cents. The default value is 1.",
     )
     expense_parser.add_argument(
         "-c",
         "--category",
-        default=DEFAULT_CATEGORY,
         required=False,
         choices=EXPENSE_CATEGORIES,
         type=str,
@@ -60,23 +362,104 @@ def main():
     expense_parser.add_argument(
         "-cr",
         "--currency",
-        default=DEFAULT_CURRENCY,
         type=str,
         help="[OPTIONAL] The currency of the expense. The \
               default value is defined in the `utils/config.py` file.",
     )
+    expense_parser.add_argument(
+        "--like",
+        type=str,
+        help="[OPTIONAL] Fill in the name, amount, category and currency that are \
+              not given from the most recent expense whose name or description \
+              has these words.",
+    )
+    expense_parser.add_argument(
+        "--from-file",
+        type=str,
+        help=f"[OPTIONAL] Add every expense listed in a CSV file at once. The file \
+              needs the `{NAME_COLUMN}` and `{AMOUNT_COLUMN}` columns and may have \
+              `{INSTALLMENTS_COLUMN}`, `{CATEGORY_COLUMN}`, `{DESCRIPTION_COLUMN}`, \
+              `{CURRENCY_COLUMN}` and `{DATE_COLUMN}` (YYYY-MM-DD) columns.",
+    )
+    expense_parser.add_argument(
+        "-q",
+        "--quiet",
+        action="store_true",
+        help="[OPTIONAL] Only print where the expenses were added, without the month \
+              summary. Useful when adding many expenses from a script.",
+    )
+    expense_parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="[OPTIONAL] Print how long the main steps took and how often they ran. \
+              Works with every command. With MONKEY_PROFILE=cprofile, a cProfile \
+              dump is also written to expense_files/profiles/.",
+    )
     args = expense_parser.parse_args()
 
+    if args.from_file is not None:
+        try:
+            expenses = read_expenses_file(args.from_file)
+        except (KeyError, OSError, ValueError) as error:
+            expense_parser.error(f"{args.from_file}: {error}")
+        add_expenses(expenses, args.quiet)
+        return
+
+    if args.like is not None:
+        if STORAGE_BACKEND != "csv":
+            expense_parser.error("--like only searches the CSV storage.")
+        storage = get_csv_storage()
+        match = SearchIndex(
+            storage.folder_path, prefix=storage.prefix
+        ).get_most_recent_purchase(args.like)
+        if match is None:
+            expense_parser.error(f"no expense matches {args.like!r}.")
+        installments = match[INSTALLMENTS_COLUMN]
+        print(
+            f"==> Like {match[NAME_COLUMN]} ({match[CATEGORY_COLUMN]}, "
+            f"{match[AMOUNT_COLUMN]:.2f} {match[CURRENCY_COLUMN]}"
+            f"{f' in {installments} installments' if installments > 1 else ''}) "
+            f"from {match[DATE_COLUMN]}"
+        )
+        args.name = args.name or match[NAME_COLUMN]
+        # An installment is repeated as its whole purchase, so the amount and
+        # the number of installments are only taken together.
+        if args.amount is None:
+            args.amount = match[AMOUNT_COLUMN]
+            args.installments = args.installments or installments
+        args.category = args.category or match[CATEGORY_COLUMN]
+        args.currency = args.currency or match[CURRENCY_COLUMN]
+
+    if args.name is None or args.amount is None:
+        expense_parser.error(
+            "the following arguments are required: -n/--name, -a/--amount"
+        )
+
     expense_obj = Expense(
         name=args.name,
         amount=args.amount,
-        installments=args.installments,
-        category=args.category,
-        currency=str(args.currency),
+        installments=args.installments or 1,
+        category=args.category or DEFAULT_CATEGORY,
+        currency=str(args.currency or DEFAULT_CURRENCY),
         description=args.description,
     )
 
-    expense_obj.update_expense()
+    expense_obj.update_expense(args.quiet)
+
+
+def main():
+    # `--profile` works with every command, so it is taken out before they
+    # parse their arguments.
+    if "--profile" not in sys.argv:
+        run()
+        return
+    sys.argv.remove("--profile")
+    instrumentation.enable()
+    try:
+        with instrumentation.profiled("main"):
+            run()
+    finally:
+        print(instrumentation.format_summary(), file=sys.stderr)
 
 
 if __name__ == "__main__":
@@ -1,21 +1,41 @@
+import json
+
 import dash_bootstrap_components as dbc
 import pandas as pd
 import plotly.express as px
-from dash import Input, Output, callback, dash_table, dcc, html, register_page
+from dash import (
+    Input,
+    Output,
+    State,
+    callback,
+    dash_table,
+    dcc,
+    html,
+    no_update,
+    register_page,
+)
 
+from core.aggregates import sum_cube
 from core.config import (
     AMOUNT_COLUMN,
     CATEGORY_COLUMN,
-    CURRENCY_COLUMN,
     DATE_COLUMN,
     DEFAULT_CURRENCY,
-    PATH_TO_EXPENSE_FILES_CURRENT,
-    SUPPORTED_CURRENCIES,
+    MONTH_COLUMN,
 )
+from core.figure_cache import figure_cache
+from core.fx import (
+    get_conversion_warning,
+    get_currency_options,
+    select_cube_currency,
+    select_currency,
+)
+from core.instrumentation import timed
+from core.store import expense_store, get_currencies, get_data_version
+from core.table import get_table_columns, get_table_page
 from core.utils import (
     create_amount_left_df,
-    create_expense_df,
-    load_csvs_to_dict,
+    create_table_records,
 )
 
 # Register this script as a page
@@ -27,8 +47,7 @@ register_page(
 )
 
 # Load data
-dfs = load_csvs_to_dict(PATH_TO_EXPENSE_FILES_CURRENT)
-dates = sorted(list(dfs.keys()))
+dates = expense_store.get_dates()
 
 # Layout definition
 layout = dbc.Col(
@@ -39,11 +58,12 @@ layout = dbc.Col(
             [
                 dbc.Label("Select a currency for the analysis:"),
                 dcc.Dropdown(
-                    options=SUPPORTED_CURRENCIES,
+                    options=get_currency_options(),
                     value=DEFAULT_CURRENCY,
                     id="dropdown-selection-currency-range",
                     clearable=False,
                 ),
+                html.Small(id="fx-warning-range", className="text-danger"),
                 html.Br(),
                 html.Br(),
                 dbc.Label("Select a range to analyse:"),
@@ -69,9 +89,15 @@ layout = dbc.Col(
         html.Br(),
         dash_table.DataTable(
             id="expense-table-range",
+            page_current=0,
             page_size=10,
-            filter_action="native",
-            sort_action="native",
+            page_action="custom",
+            filter_action="custom",
+            filter_query="",
+            sort_action="custom",
+            sort_mode="multi",
+            sort_by=[],
+            columns=get_table_columns(),
             style_table={"overflowX": "auto"},
             style_cell={"textAlign": "center"},
             style_header={"backgroundColor": "lightgrey", "fontWeight": "bold"},
@@ -80,42 +106,78 @@ layout = dbc.Col(
 )
 
 
+@callback(
+    Output("date-range-slider", "max"),
+    Output("date-range-slider", "marks"),
+    Output("date-range-slider", "value"),
+    Input("data-version", "data"),
+    State("date-range-slider", "value"),
+    State("date-range-slider", "max"),
+)
+@timed
+def update_dates_range(data_version, range, current_max):
+    dates = expense_store.get_dates()
+    new_max = len(dates) - 1
+    if new_max == current_max:
+        return no_update, no_update, no_update
+    start, end = range
+    # A selection reaching the newest month keeps following it.
+    if end == current_max:
+        end = new_max
+    marks = {i: date for i, date in enumerate(dates)}
+    return new_max, marks, [min(start, new_max), min(end, new_max)]
+
+
+@callback(
+    Output("dropdown-selection-currency-range", "options"),
+    Output("fx-warning-range", "children"),
+    Input("dropdown-selection-currency-range", "value"),
+    Input("data-version", "data"),
+)
+@timed
+def update_currencies_range(currency, data_version):
+    # The ALL option comes and goes with the rates file.
+    return get_currency_options(), get_conversion_warning(currency, get_currencies())
+
+
 @callback(
     Output("line-chart-range", "figure"),
     Output("bar-chart-range", "figure"),
     Output("pie-chart-range", "figure"),
-    Output("expense-table-range", "data"),
-    Output("expense-table-range", "columns"),
     Input("date-range-slider", "value"),
     Input("dropdown-selection-currency-range", "value"),
+    Input("data-version", "data"),
 )
-def update_graphs_range(range, currency):
+@timed
+def update_graphs_range(range, currency, data_version):
     start, end = range
+    key = ("graphs-range", start, end, currency, get_data_version())
+    return figure_cache.get_or_compute(
+        key, lambda: _build_graphs_range(start, end, currency)
+    )
+
+
+def _build_graphs_range(start, end, currency):
+    dates = expense_store.get_dates()
     num_months = len(dates[start:end])
 
-    df = create_expense_df(dfs, dates[start:end])
-    df = df[df[CURRENCY_COLUMN] == currency]
+    end_month = dates[end] if end < len(dates) else None
+    cube = expense_store.get_cube(dates[start], end_month)
+    cube = select_cube_currency(cube, currency)
 
     # Bar chart
-    df_bar = df.copy()
-    df_bar[DATE_COLUMN] = df_bar[DATE_COLUMN].map(lambda d: d[:7])
-    df_bar = df_bar.groupby([DATE_COLUMN, CATEGORY_COLUMN], as_index=False)[
-        AMOUNT_COLUMN
-    ].sum()
-    bar_fig = px.bar(df_bar, x=CATEGORY_COLUMN, y=AMOUNT_COLUMN, color=DATE_COLUMN)
+    df_bar = sum_cube(cube, [MONTH_COLUMN, CATEGORY_COLUMN])
+    bar_fig = px.bar(df_bar, x=CATEGORY_COLUMN, y=AMOUNT_COLUMN, color=MONTH_COLUMN)
 
     # Line chart
-    df_line = df.groupby([DATE_COLUMN, CATEGORY_COLUMN], as_index=False)[
-        AMOUNT_COLUMN
-    ].sum()
     line_fig = px.line(
-        df_line, x=DATE_COLUMN, y=AMOUNT_COLUMN, color=CATEGORY_COLUMN, markers=True
+        cube, x=DATE_COLUMN, y=AMOUNT_COLUMN, color=CATEGORY_COLUMN, markers=True
     )
 
     # Pie chart
-    amount_left_df = create_amount_left_df(df, currency, num_months)
+    amount_left_df = create_amount_left_df(cube, currency, num_months)
     df_pie = (
-        pd.concat([df, amount_left_df], ignore_index=True)
+        pd.concat([sum_cube(cube, [CATEGORY_COLUMN]), amount_left_df], ignore_index=True)
         .groupby([CATEGORY_COLUMN], as_index=False)[AMOUNT_COLUMN]
         .sum()
     )
@@ -123,8 +185,54 @@ def update_graphs_range(range, currency):
         df_pie, values=AMOUNT_COLUMN, names=CATEGORY_COLUMN, color=CATEGORY_COLUMN
     )
 
-    # Table
-    columns = [{"name": col, "id": col} for col in df.columns]
-    data = df.to_dict("records")
+    return line_fig, bar_fig, pie_fig
+
 
-    return line_fig, bar_fig, pie_fig, data, columns
+@callback(
+    Output("expense-table-range", "data"),
+    Output("expense-table-range", "page_current"),
+    Output("expense-table-range", "page_count"),
+    Input("date-range-slider", "value"),
+    Input("dropdown-selection-currency-range", "value"),
+    Input("expense-table-range", "page_current"),
+    Input("expense-table-range", "page_size"),
+    Input("expense-table-range", "sort_by"),
+    Input("expense-table-range", "filter_query"),
+    Input("data-version", "data"),
+)
+@timed
+def update_table_range(
+    range, currency, page_current, page_size, sort_by, filter_query, data_version
+):
+    start, end = range
+    key = (
+        "table-range",
+        start,
+        end,
+        currency,
+        page_current,
+        page_size,
+        json.dumps(sort_by),
+        filter_query,
+        get_data_version(),
+    )
+    return figure_cache.get_or_compute(
+        key,
+        lambda: _build_table_range(
+            start, end, currency, page_current, page_size, sort_by, filter_query
+        ),
+    )
+
+
+def _build_table_range(
+    start, end, currency, page_current, page_size, sort_by, filter_query
+):
+    dates = expense_store.get_dates()
+    end_month = dates[end] if end < len(dates) else None
+
+    df = expense_store.get_range(dates[start], end_month)
+    df = select_currency(df, currency)
+    page_df, page_current, page_count = get_table_page(
+        df, page_current, page_size, sort_by, filter_query
+    )
+    return create_table_records(page_df), page_current, page_count
@@ -0,0 +1,79 @@
+import dash_bootstrap_components as dbc
+from dash import Input, Output, callback, ctx, dash_table, dcc, html, register_page
+
+from core.config import LIVE_RELOAD_INTERVAL_MS, PROFILE_ENV_VAR
+from core.figure_cache import figure_cache
+from core.instrumentation import (
+    get_counts,
+    get_timings,
+    is_enabled,
+    is_profiling,
+    reset,
+)
+
+TIMING_COLUMNS = ["Name", "Calls", "Total ms", "Mean ms", "Max ms"]
+
+# Register this script as a page. It is left out of the navigation bar, so it
+# is only reached by its address.
+register_page(
+    __name__,
+    path="/diagnostics",
+    name="Diagnostics",
+    title="Diagnostics",
+)
+
+# Layout definition
+layout = dbc.Col(
+    [
+        html.H2("Diagnostics"),
+        html.P(id="diagnostics-status-display", className="text-muted"),
+        dbc.Button("Reset", id="diagnostics-reset-button", color="secondary"),
+        html.Br(),
+        html.Br(),
+        dash_table.DataTable(
+            id="diagnostics-timings-table",
+            columns=[{"name": column, "id": column} for column in TIMING_COLUMNS],
+            sort_action="native",
+            style_table={"overflowX": "auto"},
+            style_cell={"textAlign": "center"},
+            style_header={"backgroundColor": "lightgrey", "fontWeight": "bold"},
+        ),
+        html.Br(),
+        dash_table.DataTable(
+            id="diagnostics-counts-table",
+            columns=[{"name": column, "id": column} for column in ["Name", "Count"]],
+            style_table={"overflowX": "auto"},
+            style_cell={"textAlign": "center"},
+            style_header={"backgroundColor": "lightgrey", "fontWeight": "bold"},
+        ),
+        dcc.Interval(id="diagnostics-interval", interval=LIVE_RELOAD_INTERVAL_MS),
+    ]
+)
+
+
+# Not timed itself, so that watching the page does not change what it shows.
+@callback(
+    Output("diagnostics-status-display", "children"),
+    Output("diagnostics-timings-table", "data"),
+    Output("diagnostics-counts-table", "data"),
+    Input("diagnostics-interval", "n_intervals"),
+    Input("diagnostics-reset-button", "n_clicks"),
+)
+def update_diagnostics(n_intervals, n_clicks):
+    if ctx.triggered_id == "diagnostics-reset-button":
+        reset()
+    if not is_enabled():
+        status = (
+            f"Instrumentation is off. Start the dashboard with {PROFILE_ENV_VAR}=1 "
+            f"to time its callbacks, or {PROFILE_ENV_VAR}=cprofile to also write a "
+            "cProfile dump of every request."
+        )
+    else:
+        status = "Timings since the dashboard started or was last reset."
+        if is_profiling():
+            status += " A cProfile dump of every request is written."
+    cache_stats = figure_cache.stats()
+    counts = {f"figure_cache.{name}": value for name, value in cache_stats.items()}
+    counts.update(get_counts())
+    count_records = [{"Name": name, "Count": value} for name, value in counts.items()]
+    return status, get_timings(), count_records
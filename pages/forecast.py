@@ -0,0 +1,177 @@
+import dash_bootstrap_components as dbc
+import plotly.graph_objects as go
+from dash import Input, Output, callback, dash_table, dcc, html, register_page
+
+from core.config import (
+    AMOUNT_LEFT_COLUMN,
+    COMMITTED_COLUMN,
+    CUMULATIVE_LEFT_COLUMN,
+    DEFAULT_CURRENCY,
+    FORECAST_MAX_MONTHS,
+    FORECAST_MONTHS,
+    INCOME_COLUMN,
+    MONTH_COLUMN,
+)
+from core.figure_cache import figure_cache
+from core.forecast import forecast_index, get_current_month
+from core.fx import (
+    get_conversion_warning,
+    get_currency_options,
+    get_display_currency,
+)
+from core.instrumentation import timed
+from core.store import get_currencies, get_data_version
+
+# Register this script as a page
+register_page(
+    __name__,
+    path="/forecast",
+    name="Forecast",
+    title="Forecast",
+)
+
+FORECAST_COLUMNS = [
+    MONTH_COLUMN,
+    INCOME_COLUMN,
+    COMMITTED_COLUMN,
+    AMOUNT_LEFT_COLUMN,
+    CUMULATIVE_LEFT_COLUMN,
+]
+
+# Layout definition
+layout = dbc.Col(
+    [
+        html.H2("Forecast"),
+        html.P(
+            "Income and spend already committed (installments included) for the "
+            "coming months.",
+            className="text-muted",
+        ),
+        html.Br(),
+        dbc.Row(
+            [
+                dbc.Col(
+                    [
+                        dbc.Label("Select a currency for the forecast:"),
+                        dcc.Dropdown(
+                            options=get_currency_options(),
+                            value=DEFAULT_CURRENCY,
+                            id="dropdown-selection-currency-forecast",
+                            clearable=False,
+                        ),
+                        html.Small(id="fx-warning-forecast", className="text-danger"),
+                    ],
+                    width=5,
+                ),
+                dbc.Col(
+                    [
+                        dbc.Label("Months to project:"),
+                        dcc.Slider(
+                            1,
+                            FORECAST_MAX_MONTHS,
+                            step=1,
+                            value=FORECAST_MONTHS,
+                            marks={
+                                months: str(months)
+                                for months in [1, *range(6, FORECAST_MAX_MONTHS + 1, 6)]
+                            },
+                            id="slider-forecast-months",
+                        ),
+                    ],
+                    width=5,
+                ),
+                dbc.Col(html.Div(id="forecast-amount-left-display"), width=2),
+            ]
+        ),
+        dbc.Row([dbc.Col(dcc.Graph(id="forecast-chart"), width=12)]),
+        html.Br(),
+        dash_table.DataTable(
+            id="forecast-table",
+            columns=[{"name": column, "id": column} for column in FORECAST_COLUMNS],
+            style_table={"overflowX": "auto"},
+            style_cell={"textAlign": "center"},
+            style_header={"backgroundColor": "lightgrey", "fontWeight": "bold"},
+        ),
+    ]
+)
+
+
+@callback(
+    Output("dropdown-selection-currency-forecast", "options"),
+    Output("fx-warning-forecast", "children"),
+    Input("dropdown-selection-currency-forecast", "value"),
+    Input("data-version", "data"),
+)
+@timed
+def update_currencies_forecast(currency, data_version):
+    # The ALL option comes and goes with the rates file.
+    return get_currency_options(), get_conversion_warning(currency, get_currencies())
+
+
+@callback(
+    Output("forecast-chart", "figure"),
+    Output("forecast-amount-left-display", "children"),
+    Output("forecast-table", "data"),
+    Input("dropdown-selection-currency-forecast", "value"),
+    Input("slider-forecast-months", "value"),
+    Input("data-version", "data"),
+)
+@timed
+def update_forecast(currency, num_months, data_version):
+    start_month = get_current_month()
+    key = ("forecast", start_month, num_months, currency, get_data_version())
+    return figure_cache.get_or_compute(
+        key, lambda: _build_forecast(start_month, num_months, currency)
+    )
+
+
+def _build_forecast(start_month, num_months, currency):
+    table = forecast_index.get_table()
+    projection_df = table.get_projection(start_month, num_months, currency)
+    display_currency = get_display_currency(currency)
+
+    # Income and committed spend per month, with the amount left accumulated
+    # since the current month
+    fig = go.Figure(
+        [
+            go.Bar(
+                x=projection_df[MONTH_COLUMN],
+                y=projection_df[INCOME_COLUMN],
+                name=INCOME_COLUMN,
+            ),
+            go.Bar(
+                x=projection_df[MONTH_COLUMN],
+                y=projection_df[COMMITTED_COLUMN],
+                name=COMMITTED_COLUMN,
+            ),
+            go.Scatter(
+                x=projection_df[MONTH_COLUMN],
+                y=projection_df[CUMULATIVE_LEFT_COLUMN],
+                name=CUMULATIVE_LEFT_COLUMN,
+                mode="lines+markers",
+            ),
+        ],
+        layout={"barmode": "group", "yaxis": {"title": display_currency}},
+    )
+
+    amount_left = table.get_amount_left(start_month, num_months, currency)
+    amount_left_color = "success" if amount_left > 0 else "danger"
+    amount_left_icon = "+" if amount_left > 0 else ""
+    amount_left_display = dbc.Card(
+        dbc.CardBody(
+            [
+                html.H4(
+                    f"{amount_left_icon}{amount_left:.2f} {display_currency}",
+                    className=f"text-{amount_left_color} text-center mb-1",
+                ),
+                html.P(
+                    f"Left over the next {num_months} months",
+                    className="text-muted text-center mb-0",
+                ),
+            ]
+        ),
+        className=f"border-{amount_left_color}",
+    )
+
+    records = projection_df.round(2).to_dict("records")
+    return fig, amount_left_display, records
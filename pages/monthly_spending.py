@@ -1,21 +1,42 @@
+import json
+
 import dash_bootstrap_components as dbc
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from dash import Input, Output, callback, dash_table, dcc, html, register_page
+from dash import (
+    Input,
+    Output,
+    State,
+    callback,
+    dash_table,
+    dcc,
+    html,
+    no_update,
+    register_page,
+)
 
+from core.aggregates import sum_cube
 from core.config import (
     AMOUNT_COLUMN,
     CATEGORY_COLUMN,
-    CURRENCY_COLUMN,
     DATE_COLUMN,
     DEFAULT_CURRENCY,
-    PATH_TO_EXPENSE_FILES_CURRENT,
-    SUPPORTED_CURRENCIES,
 )
+from core.figure_cache import figure_cache
+from core.fx import (
+    get_conversion_warning,
+    get_currency_options,
+    get_display_currency,
+    select_cube_currency,
+    select_currency,
+)
+from core.instrumentation import timed
+from core.store import expense_store, get_currencies, get_data_version
+from core.table import get_table_columns, get_table_page
 from core.utils import (
     create_amount_left_df,
-    load_csvs_to_dict,
+    create_table_records,
 )
 
 # Register as a Dash page
@@ -27,8 +48,7 @@ register_page(
 )
 
 # Load data
-dfs = load_csvs_to_dict(PATH_TO_EXPENSE_FILES_CURRENT)
-dates = sorted(list(dfs.keys()))
+dates = expense_store.get_dates()
 
 # Layout definition
 layout = dbc.Col(
@@ -62,11 +82,12 @@ layout = dbc.Col(
                     [
                         dbc.Label("Select a currency for the analysis:"),
                         dcc.Dropdown(
-                            options=SUPPORTED_CURRENCIES,
+                            options=get_currency_options(),
                             value=DEFAULT_CURRENCY,
                             id="dropdown-selection-currency-month",
                             clearable=False,
                         ),
+                        html.Small(id="fx-warning-month", className="text-danger"),
                     ],
                     width=5,
                     style={"display": "flex", "flexDirection": "column", "justifyContent": "center"},
@@ -85,9 +106,15 @@ layout = dbc.Col(
         html.Br(),
         dash_table.DataTable(
             id="expense-table-month",
+            page_current=0,
             page_size=10,
-            filter_action="native",
-            sort_action="native",
+            page_action="custom",
+            filter_action="custom",
+            filter_query="",
+            sort_action="custom",
+            sort_mode="multi",
+            sort_by=[],
+            columns=get_table_columns(),
             style_table={"overflowX": "auto"},
             style_cell={"textAlign": "center"},
             style_header={"backgroundColor": "lightgrey", "fontWeight": "bold"},
@@ -96,48 +123,72 @@ layout = dbc.Col(
 )
 
 
+@callback(
+    Output("dropdown-selection-date", "options"),
+    Output("dropdown-selection-date", "value"),
+    Input("data-version", "data"),
+    State("dropdown-selection-date", "value"),
+)
+@timed
+def update_dates_month(data_version, date):
+    dates = expense_store.get_dates()
+    if date in dates:
+        return dates, no_update
+    return dates, dates[0] if len(dates) > 0 else None
+
+
+@callback(
+    Output("dropdown-selection-currency-month", "options"),
+    Output("fx-warning-month", "children"),
+    Input("dropdown-selection-currency-month", "value"),
+    Input("data-version", "data"),
+)
+@timed
+def update_currencies_month(currency, data_version):
+    # The ALL option comes and goes with the rates file.
+    return get_currency_options(), get_conversion_warning(currency, get_currencies())
+
+
 @callback(
     Output("line-chart-month", "figure"),
     Output("bar-chart-month", "figure"),
     Output("pie-chart-month", "figure"),
-    Output("expense-table-month", "data"),
-    Output("expense-table-month", "columns"),
     Output("amount-left-display", "children"),
     Input("dropdown-selection-date", "value"),
     Input("dropdown-selection-currency-month", "value"),
+    Input("data-version", "data"),
 )
-def update_graphs_month(date, currency):
+@timed
+def update_graphs_month(date, currency, data_version):
     if date is None:
         empty_fig = go.Figure(
             layout={"title": "Please select a file from the dropdown above."}
         )
-        return empty_fig, empty_fig, empty_fig, [], [], html.Div()
+        return empty_fig, empty_fig, empty_fig, html.Div()
+
+    key = ("graphs-month", date, currency, get_data_version())
+    return figure_cache.get_or_compute(key, lambda: _build_graphs_month(date, currency))
 
-    df = dfs[date].copy()
-    df = df[df[CURRENCY_COLUMN] == currency]
+
+def _build_graphs_month(date, currency):
+    cube = expense_store.get_month_cube(date)
+    cube = select_cube_currency(cube, currency)
 
     # Bar chart
-    df_bar = df.copy()
-    df_bar[DATE_COLUMN] = df_bar[DATE_COLUMN].map(lambda d: d[:10])
-    df_bar = df_bar.groupby([DATE_COLUMN, CATEGORY_COLUMN], as_index=False)[
-        AMOUNT_COLUMN
-    ].sum()
+    df_bar = cube.assign(**{DATE_COLUMN: cube[DATE_COLUMN].dt.strftime("%Y-%m-%d")})
     bar_fig = px.bar(df_bar, x=CATEGORY_COLUMN, y=AMOUNT_COLUMN, color=DATE_COLUMN)
 
     # Line chart
-    df_line = df.groupby([DATE_COLUMN, CATEGORY_COLUMN], as_index=False)[
-        AMOUNT_COLUMN
-    ].sum()
     line_fig = px.line(
-        df_line, x=DATE_COLUMN, y=AMOUNT_COLUMN, color=CATEGORY_COLUMN, markers=True
+        cube, x=DATE_COLUMN, y=AMOUNT_COLUMN, color=CATEGORY_COLUMN, markers=True
     )
 
     # Get amount left information
-    amount_left_df = create_amount_left_df(df, currency)
-    
+    amount_left_df = create_amount_left_df(cube, currency)
+
     # Pie chart
     df_pie = (
-        pd.concat([df, amount_left_df], ignore_index=True)
+        pd.concat([sum_cube(cube, [CATEGORY_COLUMN]), amount_left_df], ignore_index=True)
         .groupby([CATEGORY_COLUMN], as_index=False)[AMOUNT_COLUMN]
         .sum()
     )
@@ -155,7 +206,7 @@ def update_graphs_month(date, currency):
     amount_left_display = dbc.Card(
         dbc.CardBody([
             html.H4(
-                f"{amount_left_icon}{total_amount_left:.2f} {currency}",
+                f"{amount_left_icon}{total_amount_left:.2f} {get_display_currency(currency)}",
                 className=f"text-{amount_left_color} text-center mb-1"
             ),
             html.P(
@@ -166,8 +217,50 @@ def update_graphs_month(date, currency):
         className=f"border-{amount_left_color}",
     )
 
-    # Table
-    columns = [{"name": col, "id": col} for col in df.columns]
-    data = df.to_dict("records")
+    return line_fig, bar_fig, pie_fig, amount_left_display
+
 
-    return line_fig, bar_fig, pie_fig, data, columns, amount_left_display
\ No newline at end of file
+@callback(
+    Output("expense-table-month", "data"),
+    Output("expense-table-month", "page_current"),
+    Output("expense-table-month", "page_count"),
+    Input("dropdown-selection-date", "value"),
+    Input("dropdown-selection-currency-month", "value"),
+    Input("expense-table-month", "page_current"),
+    Input("expense-table-month", "page_size"),
+    Input("expense-table-month", "sort_by"),
+    Input("expense-table-month", "filter_query"),
+    Input("data-version", "data"),
+)
+@timed
+def update_table_month(
+    date, currency, page_current, page_size, sort_by, filter_query, data_version
+):
+    if date is None:
+        return [], 0, 1
+
+    key = (
+        "table-month",
+        date,
+        currency,
+        page_current,
+        page_size,
+        json.dumps(sort_by),
+        filter_query,
+        get_data_version(),
+    )
+    return figure_cache.get_or_compute(
+        key,
+        lambda: _build_table_month(
+            date, currency, page_current, page_size, sort_by, filter_query
+        ),
+    )
+
+
+def _build_table_month(date, currency, page_current, page_size, sort_by, filter_query):
+    df = expense_store.get_month(date)
+    df = select_currency(df, currency)
+    page_df, page_current, page_count = get_table_page(
+        df, page_current, page_size, sort_by, filter_query
+    )
+    return create_table_records(page_df), page_current, page_count
\ No newline at end of file
@@ -0,0 +1,59 @@
+import dash_bootstrap_components as dbc
+from dash import Input, Output, callback, dash_table, html, register_page
+
+from core.config import EXPENSE_COLUMNS, SEARCH_MAX_RESULTS
+from core.instrumentation import timed
+from core.search import search_index
+
+# Register this script as a page
+register_page(
+    __name__,
+    path="/search",
+    name="Search",
+    title="Search",
+)
+
+# Layout definition
+layout = dbc.Col(
+    [
+        html.H2("Search"),
+        html.P(
+            "Find expenses of every month by the words of their name or description.",
+            className="text-muted",
+        ),
+        html.Br(),
+        dbc.Input(
+            id="search-input",
+            type="search",
+            placeholder="Search expenses...",
+            autoFocus=True,
+        ),
+        html.Br(),
+        html.Div(id="search-count-display", className="text-muted"),
+        dash_table.DataTable(
+            id="search-table",
+            columns=[{"name": column, "id": column} for column in EXPENSE_COLUMNS],
+            style_table={"overflowX": "auto"},
+            style_cell={"textAlign": "center"},
+            style_header={"backgroundColor": "lightgrey", "fontWeight": "bold"},
+        ),
+    ]
+)
+
+
+@callback(
+    Output("search-table", "data"),
+    Output("search-count-display", "children"),
+    Input("search-input", "value"),
+    Input("data-version", "data"),
+)
+@timed
+def update_search(query, data_version):
+    # The index answers as the user types, so it is queried without the figure
+    # cache.
+    if not query:
+        return [], ""
+    records, num_matches = search_index.search(query, SEARCH_MAX_RESULTS)
+    if num_matches > len(records):
+        return records, f"The {len(records)} most recent of {num_matches} expenses"
+    return records, f"{num_matches} expenses"
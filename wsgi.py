@@ -0,0 +1,28 @@
+import gc
+
+from app import app
+from core.forecast import forecast_index
+from core.search import search_index
+from core.store import ExpenseStore, expense_store
+
+
+# Parses the month files and builds the consolidated frames, the forecast table
+# and the search index. With `preload_app` (see `gunicorn.conf.py`) this runs
+# once, in the process that forks the workers, so they all start from the same
+# memory, shared copy-on-write, instead of each parsing every month file.
+def preload() -> None:
+    dates = expense_store.get_dates()
+    # A database store keeps nothing in memory to share.
+    if isinstance(expense_store, ExpenseStore) and dates:
+        expense_store.get_range(dates[0])
+        expense_store.get_cube(dates[0])
+    forecast_index.get_table()
+    search_index.refresh()
+    # The garbage collector writes to every object it tracks, which would copy
+    # the pages they are on into each worker; what is loaded by now lives as
+    # long as the server, so it is left out of collections.
+    gc.freeze()
+
+
+preload()
+server = app.server